@@ -0,0 +1,244 @@
+"""
+Load-test the inventory API against a locally started server.
+
+The run goes like this:
+
+1. Seed a fresh database with ``--products`` products and ``--transactions``
+   transactions. SQLite uses a temporary file. For PostgreSQL, point the
+   ``INVENTORY_DB_*`` variables at a scratch database.
+2. Count the queries per request for each endpoint in-process, using
+   Django's test client.
+3. Start the server (gunicorn sync or async workers, or runserver) and drive
+   each endpoint with ``--concurrency`` clients, recording throughput and
+   p50/p95/p99 latency.
+
+Results are written as JSON to ``--output``. With ``--baseline`` they are
+compared against an earlier results file using the per-endpoint limits in
+``--thresholds``, and the script exits non-zero on a regression:
+
+    python benchmarks/api_load.py --output before.json
+    python benchmarks/api_load.py --output after.json --baseline before.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from servers import BACKEND_DIR, free_port, latency_summary, start_server, stop_server, wait_until_listening
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+
+
+def setup_django(database_name):
+    if database_name:
+        os.environ['INVENTORY_DB_NAME'] = database_name
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trackerapp.settings')
+    sys.path.insert(0, BACKEND_DIR)
+    import django
+    django.setup()
+
+
+def seed(products, transactions, seed_value):
+    """Migrate and load a deterministic dataset with the synthetic data generator."""
+    from django.core.management import call_command
+    from inventory.models import Product
+    from inventory.synthetic import generate
+
+    call_command('migrate', verbosity=0)
+    generate(products=products, transactions=transactions, seed=seed_value)
+    return list(Product.objects.values_list('id', flat=True))
+
+
+def build_requests(product_ids, transaction_ids, rng):
+    """Each endpoint as ``name -> callable returning (method, path, body)``."""
+    def create():
+        body = {
+            'type': 'IN',
+            'reference': 'BENCH-LOAD',
+            'details': [{'product_id': rng.choice(product_ids), 'quantity': 1, 'unit_price': '1.00'}],
+        }
+        return 'POST', '/transactions/', json.dumps(body)
+
+    return {
+        'products_list': lambda: ('GET', '/products/', None),
+        'inventory': lambda: ('GET', '/inventory/', None),
+        'transactions_list': lambda: ('GET', '/transactions/', None),
+        'transactions_create': create,
+        'transaction_detail': lambda: ('GET', f'/transactions/{rng.choice(transaction_ids)}/', None),
+    }
+
+
+def count_queries(endpoints, samples=5):
+    """Mean queries per request for each endpoint, measured after one warm-up request."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    counts = {}
+    for name, make_request in endpoints.items():
+        measured = []
+        for attempt in range(samples + 1):
+            method, path, body = make_request()
+            with CaptureQueriesContext(connection) as ctx:
+                if method == 'POST':
+                    response = client.post(path, body, content_type='application/json')
+                else:
+                    response = client.get(path)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {path} returned {response.status_code}")
+            if attempt:
+                measured.append(len(ctx.captured_queries))
+        counts[name] = round(sum(measured) / len(measured), 2)
+    return counts
+
+
+def timed_request(port, method, path, body, timeout):
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        connection.close()
+    if response.status >= 400:
+        return None
+    return time.perf_counter() - started
+
+
+def drive(port, make_request, requests, concurrency, timeout):
+    def one(_):
+        method, path, body = make_request()
+        return timed_request(port, method, path, body, timeout)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(min(requests, concurrency))))  # warm up workers and caches
+        started = time.perf_counter()
+        latencies = list(pool.map(one, range(requests)))
+    return latency_summary(latencies, time.perf_counter() - started)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, thresholds):
+    """Return a list of human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        limits = {**thresholds.get('default', {}), **thresholds.get('endpoints', {}).get(name, {})}
+        max_queries = limits.get('max_queries_per_request')
+        if max_queries is not None and current['queries_per_request'] > max_queries:
+            regressions.append(f"{name}: {current['queries_per_request']} queries/request > {max_queries}")
+
+        previous = baseline.get('endpoints', {}).get(name) if baseline else None
+        if not previous:
+            continue
+        if current['queries_per_request'] > previous['queries_per_request']:
+            regressions.append(
+                f"{name}: queries/request rose from {previous['queries_per_request']} "
+                f"to {current['queries_per_request']}"
+            )
+        p95_limit = limits.get('max_p95_increase')
+        if p95_limit is not None and previous['p95_ms'] and current['p95_ms'] is not None:
+            if current['p95_ms'] > previous['p95_ms'] * (1 + p95_limit):
+                regressions.append(f"{name}: p95 {current['p95_ms']}ms vs {previous['p95_ms']}ms")
+        throughput_limit = limits.get('max_throughput_drop')
+        if throughput_limit is not None and previous['requests_per_s']:
+            if (current['requests_per_s'] or 0) < previous['requests_per_s'] * (1 - throughput_limit):
+                regressions.append(
+                    f"{name}: {current['requests_per_s']} req/s vs {previous['requests_per_s']} req/s"
+                )
+        error_limit = limits.get('max_errors', 0)
+        if current['errors'] > error_limit:
+            regressions.append(f"{name}: {current['errors']} failed requests")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--server', choices=['sync', 'async', 'runserver'], default='sync')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=300, help="Timed requests per endpoint.")
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--endpoints', nargs='+', help="Only run these endpoints.")
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help="Earlier results file to compare against.")
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS)
+    options = parser.parse_args()
+
+    scratch = None
+    database_name = os.environ.get('INVENTORY_DB_NAME')
+    if os.environ.get('INVENTORY_DB_ENGINE', 'sqlite') == 'sqlite':
+        scratch = tempfile.TemporaryDirectory()
+        database_name = os.path.join(scratch.name, 'bench.sqlite3')
+    setup_django(database_name)
+
+    from inventory.models import StockTransaction
+
+    product_ids = seed(options.products, options.transactions, options.seed)
+    transaction_ids = list(StockTransaction.objects.values_list('id', flat=True))
+    endpoints = build_requests(product_ids, transaction_ids, random.Random(options.seed))
+    if options.endpoints:
+        endpoints = {name: endpoints[name] for name in options.endpoints}
+    queries = count_queries(endpoints)
+
+    port = free_port()
+    server = start_server(options.server, port, options.workers, env=os.environ.copy())
+    try:
+        wait_until_listening(port)
+        measured = {
+            name: {**drive(port, make_request, options.requests, options.concurrency, options.timeout),
+                   'queries_per_request': queries[name]}
+            for name, make_request in endpoints.items()
+        }
+    finally:
+        stop_server(server)
+        if scratch is not None:
+            scratch.cleanup()
+
+    results = {
+        'revision': git_revision(),
+        'server': options.server,
+        'workers': options.workers,
+        'concurrency': options.concurrency,
+        'dataset': {'products': options.products, 'transactions': options.transactions, 'seed': options.seed},
+        'endpoints': measured,
+    }
+    with open(options.output, 'w') as output:
+        json.dump(results, output, indent=2)
+    print(json.dumps(results['endpoints'], indent=2))
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    with open(options.thresholds) as thresholds_file:
+        thresholds = json.load(thresholds_file)
+    regressions = compare(results, baseline, thresholds)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
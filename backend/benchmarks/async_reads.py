@@ -0,0 +1,121 @@
+"""
+Compare the sync (WSGI) and async (ASGI) deployments while slow clients hold
+connections open.
+
+Each deployment is started with gunicorn on a free local port, then:
+
+* ``--slow-clients`` connections trickle their request headers one byte at a
+  time, tying up whatever is serving them (a whole sync worker each);
+* ``--requests`` ordinary GETs are issued ``--concurrency`` at a time and timed.
+
+Requests per second and p50/p99 latency are printed per deployment, with the
+number of requests that errored or timed out. Run from ``backend/``:
+
+    python benchmarks/async_reads.py --path /async/inventory/ --slow-clients 50
+
+The sync deployment is always measured on the sync URL (the ``async/`` prefix
+is stripped), so both serve the same payload.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from servers import free_port, latency_summary, start_server, stop_server, wait_until_listening
+
+
+def request_bytes(path):
+    return f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode()
+
+
+async def slow_client(port, path, stop):
+    """Hold a connection open by sending the request one byte per second."""
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        return
+    try:
+        for byte in request_bytes(path)[:-2]:
+            if stop.is_set():
+                break
+            writer.write(bytes([byte]))
+            await writer.drain()
+            await asyncio.sleep(1)
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def timed_request(port, path, timeout):
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        writer.write(request_bytes(path))
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        return None
+    if not response.startswith(b'HTTP/1.1 200'):
+        return None
+    return time.perf_counter() - started
+
+
+async def run_load(port, path, requests, concurrency, slow_clients, timeout):
+    stop = asyncio.Event()
+    slow = [asyncio.create_task(slow_client(port, path, stop)) for _ in range(slow_clients)]
+    # Give the slow clients time to occupy their connections first.
+    await asyncio.sleep(1)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await timed_request(port, path, timeout)
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+
+    return latency_summary(latencies, elapsed)
+
+
+def benchmark(deployment, options):
+    path = options.path
+    if deployment == 'sync' and path.startswith('/async/'):
+        path = path[len('/async'):]
+    port = free_port()
+    server = start_server(deployment, port, options.workers)
+    try:
+        wait_until_listening(port)
+        result = asyncio.run(run_load(
+            port, path, options.requests, options.concurrency, options.slow_clients, options.timeout,
+        ))
+    finally:
+        stop_server(server)
+    return {'deployment': deployment, 'path': path, 'slow_clients': options.slow_clients, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--path', default='/async/inventory/')
+    parser.add_argument('--deployments', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--slow-clients', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=10.0, help="Per-request timeout in seconds.")
+    options = parser.parse_args()
+
+    results = [benchmark(deployment, options) for deployment in options.deployments]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
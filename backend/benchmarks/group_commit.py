@@ -0,0 +1,113 @@
+"""
+Compare one commit per transaction with the group-commit writer.
+
+``--writers`` threads record one-line OUT transactions on random products
+through TransactionSerializer, as the transactions/ endpoint does, for
+``--duration`` seconds. This runs once with INVENTORY_GROUP_COMMIT off and
+once with it on. For each writer count it prints committed transactions per
+second and p50/p99 latency, plus the mean batch size with group commit:
+
+    python benchmarks/group_commit.py --writers 1 8 32 --window-ms 2
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_load import setup_django
+from servers import latency_summary
+
+
+def run_writers(product_ids, writers, duration):
+    from django.db import connections
+    from rest_framework.exceptions import ValidationError
+
+    from inventory.serializers import TransactionSerializer
+
+    stop = threading.Event()
+
+    def write(seed):
+        rng = random.Random(seed)
+        latencies = []
+        try:
+            while not stop.is_set():
+                serializer = TransactionSerializer(data={
+                    'type': 'OUT', 'reference': 'BENCH-GROUP',
+                    'details': [{'product_id': rng.choice(product_ids), 'quantity': 1, 'unit_price': '1.00'}],
+                })
+                started = time.perf_counter()
+                try:
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+                    latencies.append(time.perf_counter() - started)
+                except ValidationError:
+                    latencies.append(None)
+        finally:
+            connections.close_all()
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        started = time.perf_counter()
+        futures = [pool.submit(write, seed) for seed in range(writers)]
+        time.sleep(duration)
+        stop.set()
+        latencies = [latency for future in futures for latency in future.result()]
+        elapsed = time.perf_counter() - started
+    return {'writers': writers, **latency_summary(latencies, elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=3.0, help="Seconds per writer count.")
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    parser.add_argument('--max-batch', type=int, default=200)
+    options = parser.parse_args()
+
+    scratch = None
+    database_name = os.environ.get('INVENTORY_DB_NAME')
+    if os.environ.get('INVENTORY_DB_ENGINE', 'sqlite') == 'sqlite':
+        scratch = tempfile.TemporaryDirectory()
+        database_name = os.path.join(scratch.name, 'group.sqlite3')
+    setup_django(database_name)
+
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+    from inventory.group_commit import get_group_writer
+    from inventory.models import Product
+
+    call_command('migrate', verbosity=0)
+    product_ids = [product.id for product in Product.objects.bulk_create([
+        Product(name=f"Group commit {index}", sku=f"BENCH-GC-{index:05d}", current_stock=10_000_000)
+        for index in range(options.products)
+    ])]
+    results = {}
+    try:
+        for mode, enabled in (('per_request', False), ('group_commit', True)):
+            runs = []
+            with override_settings(INVENTORY_GROUP_COMMIT=enabled,
+                                   INVENTORY_GROUP_COMMIT_WINDOW_MS=options.window_ms,
+                                   INVENTORY_GROUP_COMMIT_MAX_BATCH=options.max_batch):
+                for writers in options.writers:
+                    get_group_writer.cache_clear()
+                    writer = get_group_writer()
+                    run = run_writers(product_ids, writers, options.duration)
+                    if enabled:
+                        run['mean_batch'] = round(writer.entries / writer.batches, 1) if writer.batches else None
+                    writer.close()
+                    runs.append(run)
+            results[mode] = runs
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
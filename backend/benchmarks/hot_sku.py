@@ -0,0 +1,114 @@
+"""
+Measure how OUT throughput on a single hot SKU scales with concurrent writers.
+
+One product is given plenty of stock. Then, for each ``--writers`` count,
+that many threads record one-unit OUT transactions through the normal write
+path for ``--duration`` seconds. This runs twice:
+
+* ``counter``: the product keeps a single stock counter, so every writer
+  locks the product row for its whole transaction;
+* ``locations``: the stock is split over ``--bins`` bins (see
+  ``manage.py split_stock``), so writers claim different bins and only
+  serialize on the short tail that updates the product total.
+
+Prints committed writes per second and the speedup over one writer for
+both. SQLite allows a single writer at a time, so it scales flat in both
+modes. Point ``INVENTORY_DB_*`` at a scratch PostgreSQL database with
+``INVENTORY_DB_ENGINE=postgresql`` to see row-level locking at work:
+
+    python benchmarks/hot_sku.py --writers 1 2 4 8 16 --bins 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_load import setup_django
+
+
+def run_writers(product_id, writers, duration):
+    """Committed and rejected OUT transactions per second for ``writers`` threads."""
+    from django.db import connections
+    from rest_framework.exceptions import ValidationError
+
+    from inventory.stock import create_stock_transaction
+
+    stop = threading.Event()
+
+    def write():
+        committed = failed = 0
+        try:
+            while not stop.is_set():
+                try:
+                    create_stock_transaction(
+                        {'type': 'OUT', 'reference': 'BENCH-HOT'},
+                        [{'product': product_id, 'quantity': 1, 'unit_price': 1}],
+                    )
+                    committed += 1
+                except ValidationError:
+                    failed += 1
+        finally:
+            connections.close_all()
+        return committed, failed
+
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        started = time.perf_counter()
+        futures = [pool.submit(write) for _ in range(writers)]
+        time.sleep(duration)
+        stop.set()
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+    committed = sum(result[0] for result in results)
+    return {
+        'writers': writers,
+        'writes_per_s': round(committed / elapsed, 1),
+        'rejected': sum(result[1] for result in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--bins', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=3.0, help="Seconds per writer count.")
+    parser.add_argument('--stock', type=int, default=1_000_000)
+    options = parser.parse_args()
+
+    scratch = None
+    database_name = os.environ.get('INVENTORY_DB_NAME')
+    if os.environ.get('INVENTORY_DB_ENGINE', 'sqlite') == 'sqlite':
+        scratch = tempfile.TemporaryDirectory()
+        database_name = os.path.join(scratch.name, 'hot.sqlite3')
+    setup_django(database_name)
+
+    from django.core.management import call_command
+    from inventory.locations import merge_stock, split_stock
+    from inventory.models import Product
+
+    call_command('migrate', verbosity=0)
+    product, _ = Product.objects.get_or_create(sku='BENCH-HOT', defaults={'name': 'Benchmark hot SKU'})
+    results = {}
+    try:
+        for mode in ('counter', 'locations'):
+            Product.objects.filter(pk=product.pk).update(current_stock=options.stock)
+            if mode == 'locations':
+                split_stock(product, options.bins)
+            else:
+                merge_stock(product)
+            runs = [run_writers(product.pk, writers, options.duration) for writers in options.writers]
+            single = runs[0]['writes_per_s'] or None
+            for run in runs:
+                run['speedup'] = round(run['writes_per_s'] / single, 2) if single else None
+            results[mode] = runs
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+
+    print(json.dumps({'bins': options.bins, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
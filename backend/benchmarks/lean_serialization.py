@@ -0,0 +1,88 @@
+"""
+Time the transaction list representations on the same rows, in-process.
+
+Seeds ``--transactions`` transactions (10k by default) into a temporary
+SQLite database. Each representation is then built for all of them and
+rendered to JSON:
+
+* ``nested``: TransactionSerializer with prefetched details and products,
+  the default output;
+* ``expand``: the values() fast path producing the same payload;
+* ``compact``: product ids plus a side-loaded ``products`` map;
+* ``sparse``: ``?fields=id,type,date,total_items,total_value``.
+
+Prints the best of ``--repeat`` runs in milliseconds, the queries and the
+response size:
+
+    python benchmarks/lean_serialization.py --transactions 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from api_load import seed, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        setup_django(os.path.join(scratch, 'lean.sqlite3'))
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.renderers import JSONRenderer
+
+        from inventory.lean import lean_transactions, parse_lean_options
+        from inventory.models import StockTransaction
+        from inventory.serializers import TransactionSerializer
+
+        seed(options.products, options.transactions, options.seed)
+        renderer = JSONRenderer()
+
+        def nested():
+            queryset = StockTransaction.objects.prefetch_related('details__product').order_by('-date', '-id')
+            return TransactionSerializer(queryset, many=True).data
+
+        def lean(params):
+            def build():
+                lean_options = parse_lean_options(params)
+                rows = list(StockTransaction.objects.order_by('-date', '-id').values(*lean_options.columns))
+                data, products = lean_transactions(rows, lean_options)
+                return {'results': data, 'products': products} if products is not None else data
+            return build
+
+        variants = {
+            'nested': nested,
+            'expand': lean({'expand': 'product'}),
+            'compact': lean({'view': 'compact'}),
+            'sparse': lean({'fields': 'id,type,date,total_items,total_value'}),
+        }
+        results = {}
+        for name, build in variants.items():
+            timings = []
+            for _ in range(options.repeat):
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    body = renderer.render(build())
+                    timings.append(time.perf_counter() - started)
+            results[name] = {
+                'ms': round(min(timings) * 1000, 1),
+                'queries': len(ctx.captured_queries),
+                'bytes': len(body),
+            }
+        baseline = results['nested']['ms']
+        for result in results.values():
+            result['speedup'] = round(baseline / result['ms'], 2) if result['ms'] else None
+
+    print(json.dumps({'transactions': options.transactions, 'products': options.products, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Shared helpers for the benchmark scripts: local servers and latency statistics."""
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'sync': ['-m', 'gunicorn', 'trackerapp.wsgi:application'],
+    'async': ['-m', 'gunicorn', 'trackerapp.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+    'runserver': ['manage.py', 'runserver', '--noreload'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(server, port, workers=2, env=None):
+    """Start ``server`` (a key of ``SERVERS``) on ``127.0.0.1:port`` from ``backend/``."""
+    command = [sys.executable, *SERVERS[server]]
+    if server == 'runserver':
+        command.append(f'127.0.0.1:{port}')
+    else:
+        command += ['--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL)
+
+
+def wait_until_listening(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list, or None when it is empty."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary(latencies, elapsed):
+    """Throughput and p50/p95/p99 in milliseconds; ``None`` entries count as errors."""
+    ok = sorted(latency for latency in latencies if latency is not None)
+
+    def ms(fraction):
+        value = percentile(ok, fraction)
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        'requests': len(latencies),
+        'errors': len(latencies) - len(ok),
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(ok) / elapsed, 1) if elapsed else None,
+        'p50_ms': ms(0.50),
+        'p95_ms': ms(0.95),
+        'p99_ms': ms(0.99),
+    }
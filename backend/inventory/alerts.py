@@ -0,0 +1,165 @@
+import json
+import logging
+from datetime import timedelta
+from urllib import request as urllib_request
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import StockAlert
+
+logger = logging.getLogger('inventory.alerts')
+
+DEFAULT_SINKS = ['inventory.alerts.LogSink']
+MAX_ATTEMPTS = 5
+
+
+def alert_payload(alert):
+    return {
+        'id': alert.id,
+        'kind': alert.kind,
+        'product_id': alert.product_id,
+        'sku': alert.product.sku,
+        'name': alert.product.name,
+        'stock': alert.stock,
+        'threshold': alert.threshold,
+        'transaction_id': alert.transaction_id,
+        'created_at': alert.created_at.isoformat(),
+        'repeats': getattr(alert, 'repeats', 0),
+    }
+
+
+class LogSink:
+    """Writes each alert as a warning on the ``inventory.alerts`` logger."""
+
+    def send(self, payloads):
+        for payload in payloads:
+            logger.warning("Stock alert %s for %s (%s): stock %s, threshold %s",
+                           payload['kind'], payload['name'], payload['sku'], payload['stock'], payload['threshold'])
+
+
+class WebhookSink:
+    """
+    POSTs a batch of alerts as JSON to ``INVENTORY_ALERT_WEBHOOK_URL``. Point it
+    at a local listener (e.g. ``python -m http.server``) to stub it out.
+    """
+
+    def __init__(self, url=None, timeout=5):
+        self.url = url or getattr(settings, 'INVENTORY_ALERT_WEBHOOK_URL', None)
+        self.timeout = timeout
+
+    def send(self, payloads):
+        if not self.url:
+            return
+        body = json.dumps({'alerts': payloads}).encode('utf-8')
+        outgoing = urllib_request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib_request.urlopen(outgoing, timeout=self.timeout):
+            pass
+
+
+def get_sinks():
+    return [import_string(path)() for path in getattr(settings, 'INVENTORY_ALERT_SINKS', DEFAULT_SINKS)]
+
+
+def dedupe_window():
+    return timedelta(seconds=getattr(settings, 'INVENTORY_ALERT_DEDUPE_SECONDS', 15 * 60))
+
+
+def dedupe(alerts):
+    """
+    Collapse a batch to the latest alert per (product, kind), counting the
+    repeats, and drop those already sent for the same crossing within the
+    dedupe window. Returns ``(to_send, suppressed)``.
+    """
+    latest = {}
+    suppressed = []
+    for alert in alerts:
+        key = (alert.product_id, alert.kind)
+        if key in latest:
+            suppressed.append(latest[key])
+            alert.repeats = latest[key].repeats + 1
+        else:
+            alert.repeats = 0
+        latest[key] = alert
+
+    recently_sent = set(
+        StockAlert.objects.filter(
+            status=StockAlert.SENT,
+            processed_at__gte=timezone.now() - dedupe_window(),
+            product_id__in={product_id for product_id, _ in latest},
+        ).values_list('product_id', 'kind')
+    )
+    to_send = []
+    for key, alert in latest.items():
+        (suppressed if key in recently_sent else to_send).append(alert)
+    return to_send, suppressed
+
+
+def claim_window():
+    return timedelta(seconds=getattr(settings, 'INVENTORY_ALERT_CLAIM_SECONDS', 60))
+
+
+def claim_alerts(batch_size):
+    """
+    Claim up to ``batch_size`` pending alerts for one delivery and commit:
+    ``claimed_until`` keeps other workers off them while the sinks run, and
+    lets them retry the batch if this worker dies first.
+    """
+    now = timezone.now()
+    with db_transaction.atomic():
+        alerts = list(
+            StockAlert.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now), status=StockAlert.PENDING)
+            .select_related('product')
+            .order_by('id')[:batch_size]
+        )
+        for alert in alerts:
+            alert.attempts += 1
+            alert.claimed_until = now + claim_window()
+        StockAlert.objects.bulk_update(alerts, ['attempts', 'claimed_until'])
+    return alerts
+
+
+def process_alerts(batch_size=500, sinks=None):
+    """
+    Drain one batch of pending alerts to the sinks. Rows are claimed with
+    SKIP LOCKED where the database supports it, so several workers can run.
+    The sinks are called outside any transaction, so a slow webhook never
+    holds locks that stock writes wait on; the outcome is recorded after.
+    A failing sink leaves the batch pending for a retry, up to MAX_ATTEMPTS.
+    Returns the number of alerts settled (0 after a failed delivery, so a
+    polling worker backs off before retrying).
+    """
+    sinks = get_sinks() if sinks is None else sinks
+    alerts = claim_alerts(batch_size)
+    if not alerts:
+        return 0
+
+    to_send, suppressed = dedupe(alerts)
+    try:
+        payloads = [alert_payload(alert) for alert in to_send]
+        if payloads:
+            for sink in sinks:
+                sink.send(payloads)
+    except Exception:
+        logger.exception("Delivering %d stock alerts failed", len(to_send))
+        now = timezone.now()
+        for alert in alerts:
+            alert.claimed_until = None
+            if alert.attempts >= MAX_ATTEMPTS:
+                alert.status, alert.processed_at = StockAlert.FAILED, now
+        StockAlert.objects.bulk_update(alerts, ['claimed_until', 'status', 'processed_at'])
+        return 0
+
+    now = timezone.now()
+    for alert in to_send:
+        alert.status, alert.processed_at = StockAlert.SENT, now
+    for alert in suppressed:
+        alert.status, alert.processed_at = StockAlert.SUPPRESSED, now
+    for alert in alerts:
+        alert.claimed_until = None
+    StockAlert.objects.bulk_update(alerts, ['status', 'processed_at', 'claimed_until'])
+    return len(alerts)
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.core.checks import Tags, register
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    from .search import install_search_index
+    install_search_index(connections[using])
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .checks import check_shared_caches
+        register(check_shared_caches, Tags.caches)
+        post_migrate.connect(ensure_search_index, sender=self)
@@ -0,0 +1,243 @@
+import gzip
+import json
+import os
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from .ledger import opening_balances
+from .models import OpeningBalance, StockAlert, StockDetail, StockTransaction
+from .summary import invalidate_inventory_summary
+
+DEFAULT_ARCHIVE_CHUNK_SIZE = 2000
+TRANSACTION_FIELDS = ('id', 'type', 'date', 'reference', 'notes', 'total_items', 'total_value')
+
+_datetime = serializers.DateTimeField().to_representation
+
+
+@dataclass
+class ArchiveReport:
+    transactions: int = 0
+    details: int = 0
+    files: list = field(default_factory=list)
+
+
+def archive_root(root=None):
+    return Path(root or settings.INVENTORY_ARCHIVE_DIR)
+
+
+def partition_of(date):
+    """Monthly partition (``YYYY-MM``, in TIME_ZONE) holding a transaction dated ``date``."""
+    return timezone.localtime(date).strftime('%Y-%m')
+
+
+def archive_horizon():
+    """Date of the newest archived transaction, or ``None`` while nothing is archived."""
+    return OpeningBalance.objects.aggregate(latest=Max('as_of'))['latest']
+
+
+def _write_partition(path, records):
+    """Write ``records`` as gzip NDJSON through a temporary file, so ``path`` is either complete or absent."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.partial')
+    with open(partial, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as stream:
+            for record in records:
+                stream.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+
+
+def _fold_opening_balances(details, transaction_types, as_of):
+    deltas = {}
+    for detail in details:
+        sign = -1 if transaction_types[detail['transaction_id']] == 'OUT' else 1
+        deltas[detail['product_id']] = deltas.get(detail['product_id'], 0) + sign * detail['quantity']
+    current = opening_balances(product_ids=list(deltas))
+    OpeningBalance.objects.bulk_create(
+        [OpeningBalance(product_id=product_id, quantity=current.get(product_id, 0) + delta, as_of=as_of)
+         for product_id, delta in deltas.items()],
+        update_conflicts=True, unique_fields=['product'], update_fields=['quantity', 'as_of'],
+    )
+
+
+def _id_range(path):
+    first, _, last = path.name.split('.', 1)[0].partition('-')
+    return int(first), int(last)
+
+
+def _drop_stale_partitions(directory, low, high):
+    """
+    Remove files in ``directory`` overlapping transaction ids ``low..high``
+    that were never committed. A chunk's rows are deleted in the same DB
+    transaction that follows its file, so a file is stale exactly when its
+    transactions are still in the ledger.
+    """
+    if not directory.is_dir():
+        return
+    for path in directory.glob('*.ndjson.gz'):
+        first, last = _id_range(path)
+        if first > high or last < low:
+            continue
+        ids = [record['id'] for record in read_partition(path)]
+        if StockTransaction.objects.filter(id__in=ids).exists():
+            path.unlink()
+
+
+def archive_ledger(before, chunk_size=DEFAULT_ARCHIVE_CHUNK_SIZE, root=None, progress=None):
+    """
+    Move every transaction dated before ``before`` out of the database into
+    gzip NDJSON files under ``root/YYYY-MM/``, oldest first, at most
+    ``chunk_size`` transactions per file. Each line is one transaction with
+    its detail lines.
+
+    Each chunk runs in its own DB transaction. Its net movement is first
+    folded into OpeningBalance, then its file is written and synced, and
+    only then are its rows deleted. A run interrupted between writing a file
+    and committing leaves a file whose transactions are all still in the
+    ledger; the next run removes it before writing the chunk that overlaps
+    it, whatever its chunk size, so no row is ever archived twice.
+    """
+    root = archive_root(root)
+    report = ArchiveReport()
+    while True:
+        with db_transaction.atomic():
+            headers = list(
+                StockTransaction.objects.filter(date__lt=before).order_by('date', 'id')
+                .values(*TRANSACTION_FIELDS)[:chunk_size]
+            )
+            if not headers:
+                return report
+            partition = partition_of(headers[0]['date'])
+            headers = [header for header in headers if partition_of(header['date']) == partition]
+            ids = [header['id'] for header in headers]
+            details = list(
+                StockDetail.objects.filter(transaction_id__in=ids).order_by('id')
+                .values('id', 'transaction_id', 'product_id', 'product__sku', 'quantity', 'unit_price')
+            )
+
+            _fold_opening_balances(details, {header['id']: header['type'] for header in headers},
+                                   max(header['date'] for header in headers))
+            lines = {}
+            for detail in details:
+                lines.setdefault(detail['transaction_id'], []).append({
+                    'id': detail['id'], 'product_id': detail['product_id'], 'sku': detail['product__sku'],
+                    'quantity': detail['quantity'], 'unit_price': f"{detail['unit_price']:f}",
+                })
+            path = root / partition / f"{min(ids):012d}-{max(ids):012d}.ndjson.gz"
+            _drop_stale_partitions(path.parent, min(ids), max(ids))
+            _write_partition(path, (
+                {**header, 'date': _datetime(header['date']), 'total_value': f"{header['total_value']:f}",
+                 'details': lines.get(header['id'], [])}
+                for header in headers
+            ))
+
+            # Clear the dependents with one statement each, so deleting the headers has nothing left to cascade.
+            StockAlert.objects.filter(transaction_id__in=ids).update(transaction=None)
+            StockDetail.objects.filter(transaction_id__in=ids).delete()
+            StockTransaction.objects.filter(id__in=ids).delete()
+            # The cached summary lists recent transactions, which may include these.
+            db_transaction.on_commit(invalidate_inventory_summary)
+        report.transactions += len(headers)
+        report.details += len(details)
+        report.files.append(str(path))
+        if progress is not None:
+            progress(report)
+
+
+def partition_files(since=None, until=None, root=None):
+    """Archive files whose month may hold transactions in ``[since, until)``, oldest first."""
+    root = archive_root(root)
+    if not root.is_dir():
+        return []
+    first = partition_of(since) if since is not None else None
+    last = partition_of(until) if until is not None else None
+    files = []
+    for month in sorted(entry.name for entry in root.iterdir() if entry.is_dir()):
+        if (first is None or month >= first) and (last is None or month <= last):
+            files.extend(sorted((root / month).glob('*.ndjson.gz')))
+    return files
+
+
+def read_partition(path):
+    with gzip.open(path, 'rt') as stream:
+        for line in stream:
+            record = json.loads(line)
+            record['date'] = parse_datetime(record['date'])
+            yield record
+
+
+def archived_transactions(since=None, until=None, root=None):
+    """Archived transactions dated in ``[since, until)`` in ledger order, read one file at a time."""
+    for path in partition_files(since, until, root):
+        for record in read_partition(path):
+            if (since is None or record['date'] >= since) and (until is None or record['date'] < until):
+                yield record
+
+
+def archived_rows(since=None, until=None, after_id=None, root=None):
+    """Archived details as ``export.LEDGER_FIELDS`` tuples, for the ledger export."""
+    for record in archived_transactions(since, until, root):
+        for line in record['details']:
+            if after_id is None or line['id'] > after_id:
+                yield (line['id'], record['id'], record['date'], record['type'], record['reference'],
+                       line['product_id'], line['sku'], line['quantity'], Decimal(line['unit_price']))
+
+
+def archived_lines(root=None):
+    """``(product_id, type, date, quantity, unit_price)`` per archived detail, in ledger order."""
+    for record in archived_transactions(root=root):
+        for line in record['details']:
+            yield line['product_id'], record['type'], record['date'], line['quantity'], Decimal(line['unit_price'])
+
+
+def archived_balances(after=None, until=None, product_ids=None, root=None):
+    """Net movement per product over archived transactions dated in ``(after, until]``, like ``ledger_balances``."""
+    wanted = set(product_ids) if product_ids is not None else None
+    balances = {}
+    for record in archived_transactions(after, None, root):
+        if after is not None and record['date'] <= after:
+            continue
+        if until is not None and record['date'] > until:
+            break
+        sign = -1 if record['type'] == 'OUT' else 1
+        for line in record['details']:
+            if wanted is None or line['product_id'] in wanted:
+                balances[line['product_id']] = balances.get(line['product_id'], 0) + sign * line['quantity']
+    return balances
+
+
+def archived_page(since, until, cursor, page_size, root=None):
+    """
+    A page of archived transactions in ``(-date, -id)`` order after
+    ``cursor`` (a decoded ledger cursor), plus the next cursor position.
+    Months are read newest first and only as far as the page needs.
+    """
+    page = []
+    for path_group in _months_newest_first(partition_files(since, until, root)):
+        records = [record for path in path_group for record in read_partition(path)]
+        records.sort(key=lambda record: (record['date'], record['id']), reverse=True)
+        for record in records:
+            if (since is not None and record['date'] < since) or (until is not None and record['date'] >= until):
+                continue
+            if cursor is not None and (record['date'], record['id']) >= cursor:
+                continue
+            page.append(record)
+            if len(page) > page_size:
+                return page[:page_size], page[page_size - 1]
+    return page, None
+
+
+def _months_newest_first(files):
+    months = {}
+    for path in files:
+        months.setdefault(path.parent.name, []).append(path)
+    return [months[month] for month in sorted(months, reverse=True)]
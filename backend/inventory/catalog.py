@@ -0,0 +1,183 @@
+import csv
+import json
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from rest_framework import serializers
+
+from .models import Product
+from .product_cache import product_cache
+from .signals import products_changed
+
+CATALOG_FORMATS = ('csv', 'json')
+UPDATABLE_FIELDS = ('name', 'description', 'min_stock', 'max_stock')
+MAX_REPORTED_ERRORS = 100
+
+
+class CatalogRowSerializer(serializers.Serializer):
+    # Uniqueness of name/sku is checked per chunk in one query, not per row.
+    sku = serializers.CharField(max_length=50)
+    name = serializers.CharField(max_length=100)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    min_stock = serializers.IntegerField(required=False, min_value=0)
+    max_stock = serializers.IntegerField(required=False, min_value=0)
+
+
+def iter_json_objects(stream, read_size=65536):
+    """
+    Incrementally decode a JSON array of objects, or whitespace/newline
+    separated objects (NDJSON), from a text stream without reading it whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer, eof, in_array = '', False, False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if buffer.startswith('[') and not in_array:
+            buffer, in_array = buffer[1:], True
+            continue
+        if buffer.startswith(']') and in_array:
+            return
+        if buffer:
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                if not isinstance(value, dict):
+                    raise json.JSONDecodeError("Expected a JSON object", buffer, 0)
+                yield value
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            return
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_catalog_rows(stream, catalog_format):
+    """Yield ``(line_or_index, row_dict)`` pairs from a CSV or JSON text stream."""
+    if catalog_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty CSV cells mean "not provided" so updates keep the stored value.
+            yield reader.line_num, {key: value for key, value in row.items() if key and value != ''}
+    else:
+        yield from enumerate(iter_json_objects(stream), start=1)
+
+
+class CatalogImport:
+    """
+    Upserts products matched on ``sku`` in chunks with
+    ``bulk_create(update_conflicts=True, unique_fields=['sku'])``.
+
+    Each row only overwrites the fields it provides, so rows are grouped by
+    their provided fields within a chunk. With ``dry_run`` every row is still
+    validated and classified as an insert or update, but nothing is written.
+
+    Each chunk commits on its own. If the input stops parsing partway, the
+    rows read before the error are still imported and the report's
+    ``parse_error`` gives the last line read and the error, so the caller
+    knows how much of the catalog went in.
+    """
+
+    def __init__(self, chunk_size=1000, dry_run=False):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors = []
+        self.parse_error = None
+        self.seen_skus = set()
+        self.seen_names = set()
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def run(self, rows):
+        chunk, last_line = [], None
+        try:
+            for line, row in rows:
+                last_line = line
+                chunk.append((line, row))
+                if len(chunk) >= self.chunk_size:
+                    self.import_chunk(chunk)
+                    chunk = []
+        except (ValueError, csv.Error) as exc:
+            self.parse_error = {'after_line': last_line, 'detail': str(exc)}
+        if chunk:
+            self.import_chunk(chunk)
+        if self.inserted or self.updated:
+            products_changed()
+        return self.report()
+
+    def report(self):
+        return {
+            'dry_run': self.dry_run,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'parse_error': self.parse_error,
+        }
+
+    def import_chunk(self, chunk):
+        valid = []
+        for line, row in chunk:
+            serializer = CatalogRowSerializer(data=row)
+            if not serializer.is_valid():
+                self.reject(line, serializer.errors)
+                continue
+            data = serializer.validated_data
+            if data['sku'] in self.seen_skus:
+                self.reject(line, {'sku': ['Duplicate SKU in input.']})
+                continue
+            if data['name'] in self.seen_names:
+                self.reject(line, {'name': ['Duplicate name in input.']})
+                continue
+            self.seen_skus.add(data['sku'])
+            self.seen_names.add(data['name'])
+            valid.append((line, data))
+        if not valid:
+            return
+
+        skus = [data['sku'] for _, data in valid]
+        names = [data['name'] for _, data in valid]
+        matches = list(Product.objects.filter(Q(sku__in=skus) | Q(name__in=names)).values_list('name', 'sku', 'id'))
+        existing = {name: sku for name, sku, _ in matches}
+        existing_ids = {sku: product_id for _, sku, product_id in matches}
+
+        groups = {}
+        for line, data in valid:
+            owner = existing.get(data['name'])
+            if owner is not None and owner != data['sku']:
+                self.reject(line, {'name': [f"Name is already used by SKU {owner}."]})
+                continue
+            if data['sku'] in existing_ids:
+                self.updated += 1
+            else:
+                self.inserted += 1
+            provided = tuple(field for field in UPDATABLE_FIELDS if field in data)
+            groups.setdefault(provided, []).append(Product(**data))
+
+        if self.dry_run:
+            return
+        with db_transaction.atomic():
+            for provided, products in groups.items():
+                Product.objects.bulk_create(
+                    products,
+                    update_conflicts=True,
+                    unique_fields=['sku'],
+                    update_fields=[*provided, 'updated_at'],
+                )
+            written_skus = [product.sku for products in groups.values() for product in products]
+            stale_ids = [existing_ids[sku] for sku in written_skus if sku in existing_ids]
+            db_transaction.on_commit(lambda: product_cache.invalidate(stale_ids, written_skus))
+
+
+def import_catalog(stream, catalog_format, chunk_size=1000, dry_run=False):
+    return CatalogImport(chunk_size=chunk_size, dry_run=dry_run).run(iter_catalog_rows(stream, catalog_format))
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning
+
+from .summary import summary_timeout
+
+
+def _process_local(alias):
+    return isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def check_shared_caches(app_configs, **kwargs):
+    """
+    The product cache, the inventory version behind list ETags and the cached
+    summary are only invalidated in the process that wrote. On a per-process
+    backend, other workers serve stale products, a wrong 304 or old totals.
+    """
+    warnings = []
+    alias = getattr(settings, 'INVENTORY_PRODUCT_CACHE', None)
+    if alias and _process_local(alias):
+        warnings.append(Warning(
+            f"INVENTORY_PRODUCT_CACHE uses the process-local cache '{alias}'.",
+            hint="Point it at a shared cache (file, database, Redis) unless a single process serves the API.",
+            id='inventory.W001',
+        ))
+    held = [name for name, enabled in (
+        ('the list ETag version (INVENTORY_CONDITIONAL_GET)', getattr(settings, 'INVENTORY_CONDITIONAL_GET', False)),
+        ('the inventory summary', summary_timeout() != 0),
+    ) if enabled]
+    if held and _process_local('default'):
+        warnings.append(Warning(
+            f"The process-local default cache holds {' and '.join(held)}.",
+            hint="Configure a shared default cache (file, database, Redis) unless a single process serves the API; "
+                 "INVENTORY_SUMMARY_CACHE_TIMEOUT = 0 turns the summary cache off.",
+            id='inventory.W002',
+        ))
+    return warnings
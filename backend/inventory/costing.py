@@ -0,0 +1,170 @@
+from collections import defaultdict, deque
+from decimal import Decimal
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+from .archive import archived_lines
+from .models import CostLayer, ProductCost, StockDetail
+
+ZERO = Decimal('0.0000')
+VALUE_QUANTUM = Decimal('0.0001')
+
+
+def cost_layers_enabled():
+    return getattr(settings, 'INVENTORY_COST_LAYERS', False)
+
+
+class CostTracker:
+    """
+    Advances the cost state of products in memory, line by line in ledger
+    order, then writes it back with a fixed number of queries:
+
+    * weighted average: an IN adds ``quantity * unit_price`` to the value, an
+      OUT removes its share ``value * quantity / on hand``;
+    * FIFO (with ``layers``): an IN appends a CostLayer, an OUT consumes the
+      oldest layers. Only layers of products with an OUT are ever loaded.
+
+    ``products`` are the locked rows of the current write (their ``cost`` is
+    updated in place, so later chunks on the same rows see it); other
+    products start from an empty state.
+    """
+
+    def __init__(self, products=None, layers=None):
+        self.products = products or {}
+        self.layers = cost_layers_enabled() if layers is None else layers
+        self.costs = {}
+        self.open_layers = defaultdict(deque)
+        self.new_layers = []
+        self.consumed = {}
+        self.exhausted = []
+
+    def cost(self, product_id):
+        cost = self.costs.get(product_id)
+        if cost is None:
+            product = self.products.get(product_id)
+            try:
+                cost = product.cost if product is not None else None
+            except ProductCost.DoesNotExist:
+                cost = None
+            if cost is None:
+                # A product without a cost row has no history, so its FIFO value is known to be zero.
+                cost = ProductCost(product_id=product_id, fifo_value=ZERO if self.layers else None)
+                if product is not None:
+                    product.cost = cost
+            elif not self.layers:
+                # Layers are no longer maintained, so a stored FIFO value would go stale.
+                cost.fifo_value = None
+            self.costs[product_id] = cost
+        return cost
+
+    def load_layers(self, product_ids):
+        """Read the open layers of ``product_ids``, oldest first, before any of them is issued."""
+        if not self.layers or not product_ids:
+            return
+        for layer in CostLayer.objects.filter(product_id__in=set(product_ids)).order_by('product_id', 'id'):
+            self.open_layers[layer.product_id].append(layer)
+
+    def receive(self, product_id, quantity, unit_cost, received_at):
+        cost = self.cost(product_id)
+        value = quantity * unit_cost
+        cost.quantity += quantity
+        cost.value += value
+        if self.layers and cost.fifo_value is not None:
+            cost.fifo_value += value
+            layer = CostLayer(product_id=product_id, received_at=received_at, quantity=quantity,
+                              remaining=quantity, unit_cost=unit_cost)
+            self.open_layers[product_id].append(layer)
+            self.new_layers.append(layer)
+
+    def issue(self, product_id, quantity):
+        cost = self.cost(product_id)
+        if quantity >= cost.quantity:
+            cost.value = ZERO
+        else:
+            cost.value -= (cost.value * quantity / cost.quantity).quantize(VALUE_QUANTUM)
+        cost.quantity -= quantity
+        if not self.layers or cost.fifo_value is None:
+            return
+
+        layers = self.open_layers[product_id]
+        while quantity and layers:
+            layer = layers[0]
+            taken = min(quantity, layer.remaining)
+            layer.remaining -= taken
+            cost.fifo_value -= taken * layer.unit_cost
+            quantity -= taken
+            if layer.remaining:
+                if layer.pk is not None:
+                    self.consumed[layer.pk] = layer
+            else:
+                layers.popleft()
+                if layer.pk is not None:
+                    self.consumed.pop(layer.pk, None)
+                    self.exhausted.append(layer.pk)
+        if not layers:
+            cost.fifo_value = ZERO
+
+    def apply(self, transaction_instance, details):
+        """Advance the state by one transaction's StockDetail lines."""
+        for detail in details:
+            if transaction_instance.type == 'IN':
+                self.receive(detail.product_id, detail.quantity, Decimal(detail.unit_price), transaction_instance.date)
+            else:
+                self.issue(detail.product_id, detail.quantity)
+
+    def save(self, batch_size=None):
+        """Upsert every touched ProductCost and write the layer changes."""
+        if self.costs:
+            ProductCost.objects.bulk_create(
+                list(self.costs.values()), batch_size=batch_size, update_conflicts=True,
+                unique_fields=['product'], update_fields=['quantity', 'value', 'fifo_value'],
+            )
+        if self.exhausted:
+            CostLayer.objects.filter(id__in=self.exhausted).delete()
+        if self.consumed:
+            CostLayer.objects.bulk_update(list(self.consumed.values()), ['remaining'], batch_size=batch_size)
+        new_layers = [layer for layer in self.new_layers if layer.remaining]
+        if new_layers:
+            CostLayer.objects.bulk_create(new_layers, batch_size=batch_size)
+        self.consumed, self.exhausted, self.new_layers = {}, [], []
+
+
+def record_costs(pairs, products):
+    """Advance the locked ``products``' cost state by newly written ``(transaction, details)`` pairs."""
+    pairs = list(pairs)
+    tracker = CostTracker(products)
+    tracker.load_layers(
+        detail.product_id for transaction_instance, details in pairs
+        if transaction_instance.type == 'OUT' for detail in details
+    )
+    for transaction_instance, details in pairs:
+        tracker.apply(transaction_instance, details)
+    tracker.save()
+
+
+def rebuild_costs(chunk_size=2000):
+    """
+    Recompute every product's cost state with one streaming pass over the
+    ledger in (date, id) order and replace the stored state with it. Run it
+    while no transactions are being written; returns the products costed.
+    Archived transactions are read back from their partition files first.
+    """
+    tracker = CostTracker()
+    lines = chain(archived_lines(), (
+        StockDetail.objects.order_by('transaction__date', 'transaction_id', 'id')
+        .values_list('product_id', 'transaction__type', 'transaction__date', 'quantity', 'unit_price')
+        .iterator(chunk_size=chunk_size)
+    ))
+    for product_id, transaction_type, date, quantity, unit_price in lines:
+        if transaction_type == 'IN':
+            tracker.receive(product_id, quantity, unit_price, date)
+        else:
+            tracker.issue(product_id, quantity)
+
+    with db_transaction.atomic():
+        CostLayer.objects.all().delete()
+        ProductCost.objects.all().delete()
+        tracker.save(batch_size=chunk_size)
+    return len(tracker.costs)
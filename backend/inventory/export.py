@@ -0,0 +1,87 @@
+import csv
+import json
+from itertools import chain, islice
+
+from asgiref.sync import sync_to_async
+
+from .archive import archived_rows
+from .models import StockDetail
+
+LEDGER_COLUMNS = (
+    'detail_id', 'transaction_id', 'date', 'type', 'reference',
+    'product_id', 'sku', 'quantity', 'unit_price',
+)
+LEDGER_FIELDS = (
+    'id', 'transaction_id', 'transaction__date', 'transaction__type', 'transaction__reference',
+    'product_id', 'product__sku', 'quantity', 'unit_price',
+)
+# Lines joined into one chunk per thread hop when streaming over ASGI.
+ASYNC_EXPORT_CHUNK_LINES = 500
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def ledger_rows(since=None, until=None, after_id=None, chunk_size=2000, archived=False):
+    """
+    Yield one tuple per StockDetail in id order, joined with its transaction
+    and product SKU. Rows are read as ``values_list`` tuples through a
+    server-side iterator, so memory stays flat however large the ledger is.
+    ``after_id`` resumes an incremental export after the last detail seen.
+    ``archived`` first streams the archived rows in the range from their
+    partition files, one file at a time.
+    """
+    queryset = StockDetail.objects.order_by('id')
+    if since is not None:
+        queryset = queryset.filter(transaction__date__gte=since)
+    if until is not None:
+        queryset = queryset.filter(transaction__date__lt=until)
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id)
+    rows = queryset.values_list(*LEDGER_FIELDS).iterator(chunk_size=chunk_size)
+    return chain(archived_rows(since, until, after_id), rows) if archived else rows
+
+
+def _plain(row):
+    detail_id, transaction_id, date, type, reference, product_id, sku, quantity, unit_price = row
+    return (detail_id, transaction_id, date.isoformat(), type, reference,
+            product_id, sku, quantity, str(unit_price))
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(LEDGER_COLUMNS)
+    for row in rows:
+        yield writer.writerow(_plain(row))
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(LEDGER_COLUMNS, _plain(row)))) + '\n'
+
+
+def export_lines(rows, export_format):
+    return csv_lines(rows) if export_format == 'csv' else ndjson_lines(rows)
+
+
+async def async_export_lines(lines, chunk_lines=ASYNC_EXPORT_CHUNK_LINES):
+    """
+    ``lines`` as an async iterator for ASGI responses, which would otherwise
+    read a sync iterator to the end before sending anything. Each chunk of
+    ``chunk_lines`` lines is pulled on the thread-sensitive executor, so the
+    server-side cursor keeps to one connection and memory stays flat.
+    """
+    lines = iter(lines)
+    read_chunk = sync_to_async(lambda: ''.join(islice(lines, chunk_lines)))
+    try:
+        while chunk := await read_chunk():
+            yield chunk
+    finally:
+        if hasattr(lines, 'close'):
+            await sync_to_async(lines.close)()
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """One connected client: a bounded asyncio queue fed from any thread."""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        # Runs on the subscriber's loop. A client too slow to keep up is told
+        # to resync from a fresh snapshot instead of blocking the publisher.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class BroadcastHub:
+    """
+    In-process fan-out of change events to every subscribed SSE client.
+    ``deliver`` may be called from any thread, e.g. a sync view's on_commit.
+
+    Writers publish from their own threads after commit, so two commits on
+    one product can arrive in either order. Each product level carries the
+    ``stock_version`` written under the row lock, and a level older than
+    the last one delivered for that product is dropped.
+    """
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.sequence = 0
+        self.versions = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def deliver(self, event):
+        with self._lock:
+            products = [product for product in event['products']
+                        if product['version'] >= self.versions.get(product['id'], 0)]
+            if not products:
+                return
+            self.versions.update((product['id'], product['version']) for product in products)
+            event = {**event, 'products': products}
+            self.sequence += 1
+            event = {**event, 'seq': self.sequence}
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it will unsubscribe itself.
+                pass
+
+
+hub = BroadcastHub()
+
+
+class LocalFeedBackend:
+    """
+    Delivers published events to this process's hub only. Swap it through
+    ``INVENTORY_FEED_BACKEND`` for a backend that relays between workers
+    (e.g. Redis pub/sub or Postgres LISTEN/NOTIFY) and calls ``hub.deliver``
+    on every worker.
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, events):
+        for event in events:
+            self.hub.deliver(event)
+
+
+@lru_cache(maxsize=None)
+def get_feed_backend():
+    path = getattr(settings, 'INVENTORY_FEED_BACKEND', 'inventory.feed.LocalFeedBackend')
+    return import_string(path)(hub)
+
+
+def change_event(transaction_instance, stock_levels):
+    """
+    A compact delta: the transaction id and, for each product it moved, the
+    new ``current_stock`` and the ``stock_version`` written with it, from
+    ``{product_id: (current_stock, stock_version)}``.
+    """
+    return {
+        'type': 'delta',
+        'transaction_id': transaction_instance.id if transaction_instance is not None else None,
+        'products': [
+            {'id': product_id, 'current_stock': stock, 'version': version}
+            for product_id, (stock, version) in stock_levels.items()
+        ],
+    }
+
+
+def publish_changes(events):
+    get_feed_backend().publish(events)
+
+
+def sse_frame(event_type, data, event_id=None):
+    lines = [f"event: {event_type}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(load_snapshot, feed_hub=hub, heartbeat=HEARTBEAT_SECONDS):
+    """
+    Yield SSE frames: one ``snapshot`` of every product's stock, then a
+    ``delta`` per committed change. The subscription starts before the
+    snapshot is read, so no change is missed; deltas carry absolute stock
+    levels and the snapshot and deltas carry versions, so the client can
+    skip a delta already covered by the snapshot.
+    """
+    subscription = feed_hub.subscribe()
+    try:
+        yield sse_frame('snapshot', {'products': await load_snapshot()}, feed_hub.sequence)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if subscription.overflowed:
+                subscription.overflowed = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                yield sse_frame('snapshot', {'products': await load_snapshot()}, feed_hub.sequence)
+                continue
+            yield sse_frame(event['type'], event, event['seq'])
+    finally:
+        feed_hub.unsubscribe(subscription)
@@ -0,0 +1,64 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import StockTransaction
+
+
+def is_date_only(value):
+    try:
+        return parse_date(value) is not None
+    except ValueError:
+        return False
+
+
+def parse_bound(value, end_of_day=False):
+    """
+    Parse an ISO datetime or date query parameter into an aware datetime.
+    A bare date means the start of that day, or the start of the next day
+    when ``end_of_day`` is set, so ``until=2025-03-01`` includes March 1st.
+    """
+    if is_date_only(value):
+        day = parse_date(value)
+        if end_of_day:
+            day += timedelta(days=1)
+        parsed = datetime.combine(day, time.min)
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class TransactionFilterBackend(BaseFilterBackend):
+    """
+    ``?since=`` (inclusive) and ``?until=`` (exclusive) date bounds plus exact
+    ``?type=`` and ``?reference=`` filters, each served by a ledger index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        errors = {}
+        for name, lookup, end_of_day in (('since', 'date__gte', False), ('until', 'date__lt', True)):
+            if params.get(name):
+                try:
+                    queryset = queryset.filter(**{lookup: parse_bound(params[name], end_of_day)})
+                except ValueError:
+                    errors[name] = ['Expected an ISO 8601 date or datetime.']
+
+        transaction_type = params.get('type')
+        if transaction_type:
+            if transaction_type not in dict(StockTransaction.TRANSACTION_TYPE_CHOICES):
+                errors['type'] = ['Expected IN or OUT.']
+            queryset = queryset.filter(type=transaction_type)
+        if params.get('reference'):
+            queryset = queryset.filter(reference=params['reference'])
+
+        if errors:
+            raise ValidationError(errors)
+        return queryset
@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from .stock import create_stock_transaction, create_stock_transactions
+
+_STOP = object()
+
+
+class GroupCommitTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The transaction writer did not answer in time; the transaction may still be recorded."
+    default_code = 'group_commit_timeout'
+
+
+def group_commit_enabled():
+    """Group commit is opt-in, and skipped when the caller already holds a transaction it expects to join."""
+    return getattr(settings, 'INVENTORY_GROUP_COMMIT', False) and not connection.in_atomic_block
+
+
+class GroupCommitWriter:
+    """
+    Coalesces concurrent transactions into shared DB transactions. Request
+    threads ``submit()`` and block until the commit holding their entry is
+    durable. A daemon thread takes the first queued entry, gathers whatever
+    else arrives within ``window`` seconds (up to ``max_batch``) and records
+    them with ``create_stock_transactions``: one lock of their products, one
+    commit, and the usual validation for each entry, so a shortfall fails
+    only the request that caused it.
+
+    A request waits at most ``timeout`` seconds. If the thread never took
+    its entry (stalled or dead), the request writes the entry itself;
+    if the entry is in a batch that has not finished, it raises
+    ``GroupCommitTimeout`` (503).
+    """
+
+    def __init__(self, window=0.002, max_batch=200, timeout=45):
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.batches = 0
+        self.entries = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, validated_data, details_data):
+        """Queue one transaction and return its instance once committed, or raise its ValidationError."""
+        future = Future()
+        self._ensure_running()
+        self._queue.put(((validated_data, details_data), future))
+        try:
+            instance, errors = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            if future.cancel():
+                # Still queued, so the writer will skip it: write it on this thread instead.
+                return create_stock_transaction(validated_data, details_data)
+            try:
+                instance, errors = future.result(timeout=0)
+            except FutureTimeout:
+                raise GroupCommitTimeout()
+        if errors is not None:
+            raise serializers.ValidationError(errors)
+        return instance
+
+    def close(self):
+        """Stop the writer thread once the entries queued so far are written."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='inventory-group-commit', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while batch[-1] is not _STOP and len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._collect()
+                stopping = batch[-1] is _STOP
+                if stopping:
+                    batch.pop()
+                if batch:
+                    close_old_connections()
+                    self.write(batch)
+                if stopping:
+                    return
+        finally:
+            connections.close_all()
+
+    def write(self, batch):
+        """Record ``(entry, future)`` pairs in one DB transaction and resolve each future with its outcome."""
+        # Entries whose request gave up waiting were cancelled and are written by that request.
+        batch = [(entry, future) for entry, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            outcomes = create_stock_transactions([entry for entry, _ in batch])
+        except Exception:
+            # A database error aborts the shared transaction; retry each entry
+            # alone so it fails only the request that caused it.
+            for entry, future in batch:
+                self._write_one(entry, future)
+        else:
+            for (_, future), outcome in zip(batch, outcomes):
+                future.set_result(outcome)
+        self.batches += 1
+        self.entries += len(batch)
+
+    def _write_one(self, entry, future):
+        try:
+            future.set_result((create_stock_transaction(*entry), None))
+        except serializers.ValidationError as exc:
+            future.set_result((None, exc.detail))
+        except Exception as exc:
+            future.set_exception(exc)
+
+
+@lru_cache(maxsize=None)
+def get_group_writer():
+    return GroupCommitWriter(
+        window=getattr(settings, 'INVENTORY_GROUP_COMMIT_WINDOW_MS', 2) / 1000,
+        max_batch=getattr(settings, 'INVENTORY_GROUP_COMMIT_MAX_BATCH', 200),
+        timeout=getattr(settings, 'INVENTORY_GROUP_COMMIT_TIMEOUT', 45),
+    )
@@ -0,0 +1,215 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger('inventory.requests')
+
+MAX_TRACE_QUERIES = 50
+
+_current = ContextVar('inventory_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Query and serializer timings collected for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.statements = Counter()
+        self.recorded = []
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.sql_time += duration
+        self.statements[sql] += 1
+        if len(self.recorded) < MAX_TRACE_QUERIES:
+            self.recorded.append({'sql': sql, 'ms': round(duration * 1000, 2)})
+
+    def duplicates(self, threshold):
+        """Statements run ``threshold`` or more times with different parameters: the N+1 signature."""
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+
+def record_query(execute, sql, params, many, context):
+    """``execute_wrapper`` installed on every connection; a pass-through outside instrumented requests."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+class TimedSerializerMixin:
+    """
+    Counts ``.data`` towards the request's serializer time while the
+    middleware is collecting; a plain ``.data`` otherwise. Nested serializers
+    only call ``to_representation``, so each top-level serialization is timed
+    once. Queries it triggers count in both totals.
+    """
+
+    @property
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return super().data
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            metrics.serializing = False
+            metrics.serialize_time += time.perf_counter() - started
+
+
+class TimedListSerializer(TimedSerializerMixin, ListSerializer):
+    """``list_serializer_class`` for timed serializers, so ``many=True`` responses are timed too."""
+
+
+def _add_recorder(sender=None, connection=None, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def add_recorders():
+    for connection in connections.all(initialized_only=True):
+        _add_recorder(connection=connection)
+
+
+_install_lock = threading.Lock()
+_installed = False
+
+
+def install():
+    """Hook query timing in; done once, the first time the middleware is enabled."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        connection_created.connect(_add_recorder, dispatch_uid='inventory-record-query')
+        _installed = True
+
+
+class TraceBuffer:
+    """The most recent sampled slow-request traces, bounded, newest first."""
+
+    def __init__(self, size):
+        self._traces = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        with self._lock:
+            self._traces.appendleft(trace)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._traces)
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+traces = TraceBuffer(getattr(settings, 'INVENTORY_TRACE_BUFFER_SIZE', 100))
+
+
+def server_timing(metrics, total, duplicates):
+    entries = [
+        f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.queries} queries"',
+        f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ]
+    if duplicates:
+        entries.append(f'n-plus-one;desc="{len(duplicates)} repeated statements"')
+    return ', '.join(entries)
+
+
+def finish(request, response, metrics):
+    total = time.perf_counter() - metrics.started
+    duplicates = metrics.duplicates(getattr(settings, 'INVENTORY_DUPLICATE_QUERY_THRESHOLD', 3))
+    response['Server-Timing'] = server_timing(metrics, total, duplicates)
+
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 2),
+        'queries': metrics.queries,
+        'sql_ms': round(metrics.sql_time * 1000, 2),
+        'serialize_ms': round(metrics.serialize_time * 1000, 2),
+        'duplicate_statements': len(duplicates),
+    }
+    slow = record['total_ms'] >= getattr(settings, 'INVENTORY_SLOW_REQUEST_MS', 500)
+    logger.log(logging.WARNING if slow or duplicates else logging.INFO, json.dumps(record))
+
+    if slow and random.random() < getattr(settings, 'INVENTORY_TRACE_SAMPLE_RATE', 1.0):
+        traces.add({
+            **record,
+            'at': timezone.now().isoformat(),
+            'duplicates': [{'sql': sql, 'count': count} for sql, count in duplicates.items()],
+            'query_log': metrics.recorded,
+        })
+    return response
+
+
+class RequestTimingMiddleware:
+    """
+    Per-request SQL count and time, duplicate statement (N+1) detection and
+    time in serializers using ``TimedSerializerMixin``, reported as a ``Server-Timing`` header and a JSON
+    log line on ``inventory.requests``, with sampled slow requests kept in
+    ``traces``. Streaming bodies are timed up to the response being returned.
+
+    Enabled with ``INVENTORY_INSTRUMENTATION``; when off the middleware
+    removes itself from the stack and installs no hooks.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INVENTORY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        add_recorders()
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        # The async ORM runs queries on the thread-sensitive executor, whose
+        # connections may predate the connection_created hook.
+        await sync_to_async(add_recorders)()
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return finish(request, response, metrics)
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .models import Product, StockDetail
+from .serializers import ProductSerializer, TransactionSerializer
+
+TRANSACTION_FIELDS = tuple(TransactionSerializer.Meta.fields)
+DETAIL_FIELDS = ('id', 'product_id', 'quantity', 'unit_price')
+PRODUCT_FIELDS = tuple(ProductSerializer.Meta.fields)
+EXPANDABLE = ('product',)
+
+_datetime = serializers.DateTimeField().to_representation
+
+
+def _decimal(value):
+    # values() already quantizes to the field's decimal places, as DRF would.
+    return f"{value:f}"
+
+
+@dataclass
+class LeanOptions:
+    fields: tuple
+    expand_product: bool
+    side_load: bool
+
+    @property
+    def columns(self):
+        """Transaction columns to read: the requested ones plus what cursors and details need."""
+        return ['id', 'date', *(field for field in self.fields if field not in ('id', 'date', 'details'))]
+
+
+def parse_lean_options(query_params):
+    """
+    Options for the lean transaction listing, or ``None`` when the request
+    asks for the default nested representation:
+
+    * ``?fields=id,type,details`` keeps only those transaction fields; detail
+      lines then carry ``product_id`` instead of a nested product;
+    * ``?expand=product`` nests the product in each line again;
+    * ``?view=compact`` adds a ``products`` map next to ``results`` holding
+      each referenced product once.
+    """
+    fields_param = query_params.get('fields')
+    expand_param = query_params.get('expand')
+    compact = query_params.get('view') == 'compact'
+    if fields_param is None and expand_param is None and not compact:
+        return None
+
+    errors = {}
+    fields = TRANSACTION_FIELDS
+    if fields_param is not None:
+        fields = tuple(dict.fromkeys(field.strip() for field in fields_param.split(',') if field.strip()))
+        unknown = [field for field in fields if field not in TRANSACTION_FIELDS]
+        if unknown or not fields:
+            errors['fields'] = [f"Choose from: {', '.join(TRANSACTION_FIELDS)}."]
+    expand = [name.strip() for name in (expand_param or '').split(',') if name.strip()]
+    if any(name not in EXPANDABLE for name in expand):
+        errors['expand'] = [f"Choose from: {', '.join(EXPANDABLE)}."]
+    if errors:
+        raise ValidationError(errors)
+    return LeanOptions(fields=fields, expand_product='product' in expand, side_load=compact)
+
+
+def lean_transactions(rows, options):
+    """
+    Render transaction ``values()`` rows straight to response data, without
+    model or serializer instances: one query for all their detail lines and
+    one for the products they reference. Returns ``(data, products)``, where
+    ``products`` is the side-loaded map or ``None``.
+    """
+    details_by_transaction = {}
+    product_ids = set()
+    if 'details' in options.fields and rows:
+        details = (
+            StockDetail.objects.filter(transaction_id__in=[row['id'] for row in rows])
+            .order_by('id').values_list('transaction_id', *DETAIL_FIELDS)
+        )
+        for transaction_id, detail_id, product_id, quantity, unit_price in details:
+            details_by_transaction.setdefault(transaction_id, []).append(
+                {'id': detail_id, 'product_id': product_id, 'quantity': quantity, 'unit_price': _decimal(unit_price)}
+            )
+            product_ids.add(product_id)
+
+    products = {}
+    if product_ids and (options.expand_product or options.side_load):
+        products = {product['id']: product for product in Product.objects.filter(id__in=product_ids).values(*PRODUCT_FIELDS)}
+
+    data = []
+    for row in rows:
+        item = {}
+        for field in options.fields:
+            if field == 'details':
+                lines = details_by_transaction.get(row['id'], [])
+                if options.expand_product:
+                    lines = [
+                        {'id': line['id'], 'product': products.get(line['product_id']),
+                         'quantity': line['quantity'], 'unit_price': line['unit_price']}
+                        for line in lines
+                    ]
+                item['details'] = lines
+            elif field == 'date':
+                item['date'] = _datetime(row['date'])
+            elif field == 'total_value':
+                item['total_value'] = _decimal(row['total_value'])
+            else:
+                item[field] = row[field]
+        data.append(item)
+
+    side_loaded = {str(product_id): products[product_id] for product_id in sorted(products)} if options.side_load else None
+    return data, side_loaded
@@ -0,0 +1,45 @@
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import OpeningBalance, StockDetail
+
+
+def signed_quantity(prefix=''):
+    """``quantity`` for IN lines and ``-quantity`` for OUT lines of a StockDetail query."""
+    return Case(
+        When(**{f'{prefix}transaction__type': 'OUT'}, then=-F(f'{prefix}quantity')),
+        default=F(f'{prefix}quantity'),
+    )
+
+
+def opening_balances(product_ids=None, id_range=None):
+    """Archived net movement per product id (see ``archive.archive_ledger``)."""
+    balances = OpeningBalance.objects.all()
+    if product_ids is not None:
+        balances = balances.filter(product_id__in=product_ids)
+    if id_range is not None:
+        balances = balances.filter(product_id__gte=id_range[0], product_id__lt=id_range[1])
+    return dict(balances.values_list('product_id', 'quantity'))
+
+
+def ledger_balances(after=None, until=None, product_ids=None, id_range=None, with_opening=False):
+    """
+    Net movement per product id over details whose transaction date is in
+    ``(after, until]``, computed with one grouped aggregate. ``id_range`` is an
+    optional half-open ``(low, high)`` product id range. ``with_opening`` adds
+    the opening balances of archived transactions, for whole-ledger totals.
+    """
+    queryset = StockDetail.objects.all()
+    if id_range is not None:
+        queryset = queryset.filter(product_id__gte=id_range[0], product_id__lt=id_range[1])
+    if after is not None:
+        queryset = queryset.filter(transaction__date__gt=after)
+    if until is not None:
+        queryset = queryset.filter(transaction__date__lte=until)
+    if product_ids is not None:
+        queryset = queryset.filter(product_id__in=product_ids)
+    rows = queryset.values('product_id').annotate(balance=Coalesce(Sum(signed_quantity()), Value(0)))
+    balances = opening_balances(product_ids, id_range) if with_opening else {}
+    for row in rows:
+        balances[row['product_id']] = balances.get(row['product_id'], 0) + row['balance']
+    return balances
@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from rest_framework import serializers
+
+from .models import Product, StockLocation
+
+
+class _Contended(Exception):
+    pass
+
+
+class LocationAllocator:
+    """
+    Moves the stock of location-tracked products between their locked
+    StockLocation rows: an OUT draws from the fullest bins first, an IN goes
+    to the emptiest bin. Changes are kept in memory until ``apply()``.
+    """
+
+    def __init__(self, bins=()):
+        self.bins = defaultdict(list)
+        for location in bins:
+            self.bins[location.product_id].append(location)
+        self.deltas = {}
+
+    @classmethod
+    def lock_all(cls, product_ids):
+        """Lock every bin of ``product_ids``, in (product, id) order, waiting for other writers."""
+        return cls(StockLocation.objects.select_for_update().filter(
+            product_id__in=set(product_ids)).order_by('product_id', 'id'))
+
+    @classmethod
+    def claim(cls, transaction_type, deltas):
+        """
+        Lock only the bins one transaction needs, skipping bins other writers
+        hold: the fullest free bins until an OUT is covered, or the emptiest
+        free bin for an IN. If that is not enough, the partial claim is rolled
+        back to its savepoint (releasing its locks) and every bin of the
+        products is locked in order instead, so claims cannot deadlock.
+        """
+        allocator = cls()
+        try:
+            with db_transaction.atomic():
+                for product_id, delta in sorted(deltas.items()):
+                    allocator._claim_free(product_id, -delta if transaction_type == 'OUT' else None)
+        except _Contended:
+            allocator = cls.lock_all(deltas)
+        return allocator
+
+    def _claim_free(self, product_id, wanted):
+        held = []
+        while True:
+            free = StockLocation.objects.select_for_update(skip_locked=True).filter(product_id=product_id)
+            if wanted is not None:
+                free = free.filter(quantity__gt=0).order_by('-quantity', 'id')
+            else:
+                free = free.order_by('quantity', 'id')
+            location = free.exclude(id__in=[location.id for location in held]).first()
+            if location is None:
+                raise _Contended
+            held.append(location)
+            if wanted is None or sum(location.quantity for location in held) >= wanted:
+                self.bins[product_id].extend(held)
+                return
+
+    def allocate(self, transaction_type, deltas, products):
+        """
+        Spread the stock ``deltas`` of location-tracked products over their
+        bins. Raises ValidationError before changing anything if a product is
+        short or has no bins.
+        """
+        for product_id, delta in deltas.items():
+            product = products[product_id]
+            if not self.bins[product_id]:
+                raise serializers.ValidationError(f"Product '{product.name}' has no stock locations.")
+            available = sum(location.quantity for location in self.bins[product_id])
+            if transaction_type == 'OUT' and available < -delta:
+                raise serializers.ValidationError(f"Insufficient stock for product '{product.name}'. "
+                                                  f"Available: {available}, Requested: {-delta}.")
+
+        for product_id, delta in deltas.items():
+            locations = self.bins[product_id]
+            if delta > 0:
+                self._move(min(locations, key=lambda location: (location.quantity, location.id)), delta)
+                continue
+            wanted = -delta
+            for location in sorted(locations, key=lambda location: (-location.quantity, location.id)):
+                taken = min(wanted, location.quantity)
+                if taken:
+                    self._move(location, -taken)
+                    wanted -= taken
+                if not wanted:
+                    break
+
+    def _move(self, location, delta):
+        location.quantity += delta
+        self.deltas[location.id] = self.deltas.get(location.id, 0) + delta
+
+    def apply(self):
+        """Write the bin changes with one UPDATE."""
+        if not self.deltas:
+            return
+        StockLocation.objects.filter(id__in=self.deltas).update(
+            quantity=F('quantity') + Case(
+                *[When(id=location_id, then=Value(delta)) for location_id, delta in self.deltas.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+        self.deltas = {}
+
+
+def split_stock(product, bins, prefix='BIN'):
+    """
+    Track ``product`` by location: replace its bins with ``bins`` new ones
+    named ``{prefix}-01``... and spread its current stock evenly over them.
+    """
+    with db_transaction.atomic():
+        # Bins before the product row, the order writers take them in.
+        LocationAllocator.lock_all([product.pk])
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        StockLocation.objects.filter(product=product).delete()
+        share, extra = divmod(product.current_stock, bins)
+        StockLocation.objects.bulk_create([
+            StockLocation(product=product, code=f"{prefix}-{index + 1:02d}", quantity=share + (index < extra))
+            for index in range(bins)
+        ])
+        Product.objects.filter(pk=product.pk).update(stock_by_location=True)
+
+
+def merge_stock(product):
+    """Stop tracking ``product`` by location; ``current_stock`` already holds the total."""
+    with db_transaction.atomic():
+        LocationAllocator.lock_all([product.pk])
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        StockLocation.objects.filter(product=product).delete()
+        Product.objects.filter(pk=product.pk).update(stock_by_location=False)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.archive import DEFAULT_ARCHIVE_CHUNK_SIZE, archive_ledger
+from inventory.filters import parse_bound
+from inventory.snapshots import default_snapshot_time
+
+
+class Command(BaseCommand):
+    help = ("Move transactions dated before --before out of the database into monthly gzip NDJSON files, "
+            "folding their movement into per-product opening balances.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True,
+                            help="ISO date or datetime, exclusive. Must not be later than the start of today.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_ARCHIVE_CHUNK_SIZE,
+                            help="Transactions per partition file and DB transaction.")
+        parser.add_argument('--dir', help="Archive directory. Defaults to the INVENTORY_ARCHIVE_DIR setting.")
+
+    def handle(self, *args, **options):
+        try:
+            before = parse_bound(options['before'])
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+        if before > default_snapshot_time():
+            raise CommandError("--before must not be later than the start of today; only closed days are archived.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+
+        def progress(report):
+            self.stdout.write(f"{report.transactions} transactions archived into {len(report.files)} files")
+
+        report = archive_ledger(before, options['chunk_size'], options['dir'],
+                                progress=progress if options['verbosity'] > 1 else None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {report.transactions} transactions ({report.details} details) into {len(report.files)} files."
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.export import EXPORT_FORMATS, export_lines, ledger_rows
+from inventory.filters import parse_bound
+
+
+class Command(BaseCommand):
+    help = "Stream the StockDetail ledger as CSV or NDJSON with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--since', help="ISO date or datetime, inclusive.")
+        parser.add_argument('--until', help="ISO date or datetime, exclusive (a bare date includes that day).")
+        parser.add_argument('--after-id', type=int, help="Only export details with a larger id (incremental export).")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--archived', action='store_true', help="Include archived transactions in the range.")
+        parser.add_argument('--output', help="File to write to. Defaults to stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_bound(options['since']) if options['since'] else None
+            until = parse_bound(options['until'], end_of_day=True) if options['until'] else None
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+
+        rows = ledger_rows(since, until, options['after_id'], options['chunk_size'], options['archived'])
+        lines = export_lines(rows, options['export_format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.filters import parse_bound
+from inventory.models import Product
+from inventory.synthetic import clear_inventory, generate
+
+
+class Command(BaseCommand):
+    help = ("Generate a deterministic synthetic catalog and ledger for benchmarks, "
+            "e.g. --products 100000 --transactions 2000000.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help="Number of SKUs.")
+        parser.add_argument('--transactions', type=int, default=10000)
+        parser.add_argument('--min-lines', type=int, default=1, help="Fewest detail lines per transaction.")
+        parser.add_argument('--max-lines', type=int, default=5, help="Most detail lines per transaction.")
+        parser.add_argument('--out-ratio', type=float, default=0.4, help="Share of OUT transactions (0-1).")
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help="Zipf exponent of SKU popularity; 0 picks products uniformly.")
+        parser.add_argument('--days', type=int, default=365, help="Days of history to spread transactions over.")
+        parser.add_argument('--end', help="ISO datetime or date the history ends at. Defaults to now.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per bulk_create.")
+        parser.add_argument('--clear', action='store_true',
+                            help="Delete all existing products, transactions, snapshots and alerts first.")
+
+    def handle(self, *args, **options):
+        if not 1 <= options['min_lines'] <= options['max_lines']:
+            raise CommandError("Need 1 <= --min-lines <= --max-lines.")
+        if not 0 <= options['out_ratio'] <= 1:
+            raise CommandError("--out-ratio must be between 0 and 1.")
+        try:
+            end = parse_bound(options['end']) if options['end'] else None
+        except ValueError as exc:
+            raise CommandError(f"Invalid --end value: {exc}")
+
+        if options['clear']:
+            clear_inventory()
+        elif Product.objects.filter(sku__startswith=f"SYN-{options['seed']}-").exists():
+            raise CommandError(f"Data for seed {options['seed']} already exists; pass --clear or another --seed.")
+
+        def progress(report):
+            self.stdout.write(f"  {report.transactions} transactions, {report.details} details "
+                              f"({report.rows_per_second:,.0f} rows/s)")
+
+        report = generate(
+            products=options['products'],
+            transactions=options['transactions'],
+            min_lines=options['min_lines'],
+            max_lines=options['max_lines'],
+            out_ratio=options['out_ratio'],
+            skew=options['skew'],
+            days=options['days'],
+            end=end,
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        phases = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in report.phases.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {report.products} products, {report.transactions} transactions and "
+            f"{report.details} details in {report.elapsed:.1f}s ({report.rows_per_second:,.0f} rows/s; {phases})."
+        ))
@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.catalog import CATALOG_FORMATS, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Bulk upsert products from a CSV or JSON/NDJSON catalog file, matching rows on SKU."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='catalog_format', choices=CATALOG_FORMATS,
+                            help="Defaults to the file extension (.csv, otherwise json).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Validate the whole file without writing.")
+
+    def handle(self, *args, **options):
+        catalog_format = options['catalog_format'] or ('csv' if options['path'].endswith('.csv') else 'json')
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as stream:
+                report = import_catalog(stream, catalog_format, options['chunk_size'], options['dry_run'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        prefix = "Dry run: would have " if report['dry_run'] else ""
+        summary = f"{prefix}inserted {report['inserted']}, updated {report['updated']}, rejected {report['rejected']}."
+        if report['parse_error'] is not None:
+            raise CommandError(f"Could not parse catalog after line {report['parse_error']['after_line']}: "
+                               f"{report['parse_error']['detail']}. Rows before it were imported: {summary}")
+        self.stdout.write(self.style.SUCCESS(summary))
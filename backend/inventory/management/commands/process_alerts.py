@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.alerts import process_alerts
+
+
+class Command(BaseCommand):
+    help = "Drain pending stock alerts from the outbox to the configured sinks (INVENTORY_ALERT_SINKS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain what is pending and exit.")
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = process_alerts(options['batch_size'])
+                total += processed
+                if processed:
+                    self.stdout.write(f"Processed {processed} alerts.")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} alerts processed."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from inventory.costing import cost_layers_enabled, rebuild_costs
+
+
+class Command(BaseCommand):
+    help = "Recompute every product's cost state from the ledger in one streaming pass (pause writes while it runs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        costed = rebuild_costs(chunk_size=options['chunk_size'])
+        method = 'FIFO and weighted-average' if cost_layers_enabled() else 'weighted-average'
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {method} cost state for {costed} products."))
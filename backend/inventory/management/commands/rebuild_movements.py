@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventory.rollups import rebuild_movements
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyProductMovement rollup from the ledger, a chunk of days per transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First ISO date to rebuild. Defaults to the oldest transaction.")
+        parser.add_argument('--until', help="Last ISO date to rebuild, inclusive. Defaults to yesterday.")
+        parser.add_argument('--include-today', action='store_true',
+                            help="Rebuild through today; only safe while no transactions are being written.")
+        parser.add_argument('--chunk-days', type=int, default=31)
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_date(options['since']) if options['since'] else None
+            until = parse_date(options['until']) if options['until'] else None
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+        if (options['since'] and since is None) or (options['until'] and until is None):
+            raise CommandError("--since and --until must be ISO dates.")
+        if until is None:
+            until = timezone.localdate() - timedelta(days=0 if options['include_today'] else 1)
+        if options['chunk_days'] < 1:
+            raise CommandError("--chunk-days must be at least 1.")
+
+        written = rebuild_movements(since, until, options['chunk_days'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily movements through {until.isoformat()}: {written} rows."))
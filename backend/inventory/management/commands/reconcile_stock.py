@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from inventory.reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = "Compare Product.current_stock with the ledger balance (IN minus OUT) and optionally repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help="Reset drifted products to their ledger balance.")
+        parser.add_argument('--incremental', action='store_true',
+                            help="Only check products touched since the last completed run.")
+        parser.add_argument('--workers', type=int, default=1, help="Processes to spread product id ranges over.")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Product ids per unit of work.")
+
+    def handle(self, *args, **options):
+        run, drifts = reconcile(
+            incremental=options['incremental'],
+            fix=options['repair'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        for drift in drifts:
+            self.stdout.write(
+                f"{drift.sku} (id {drift.product_id}): stored {drift.stored}, "
+                f"ledger {drift.ledger}, drift {drift.difference:+d}"
+            )
+        mode = "incremental" if run.incremental else "full"
+        summary = f"{mode} run checked {run.checked} products, {run.drifted} drifted, {run.repaired} repaired."
+        self.stdout.write(self.style.WARNING(summary) if run.drifted else self.style.SUCCESS(summary))
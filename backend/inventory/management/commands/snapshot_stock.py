@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.filters import parse_bound
+from inventory.snapshots import default_snapshot_time, take_snapshot
+
+
+class Command(BaseCommand):
+    help = "Record the ledger balance of every product at a point in time (run daily, e.g. from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--at', help="ISO datetime or date of the snapshot. Defaults to the start of today.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            taken_at = parse_bound(options['at']) if options['at'] else default_snapshot_time()
+        except ValueError as exc:
+            raise CommandError(f"Invalid --at value: {exc}")
+        written = take_snapshot(taken_at, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Snapshot at {taken_at.isoformat()}: {written} products."))
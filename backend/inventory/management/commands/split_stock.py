@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.locations import merge_stock, split_stock
+from inventory.models import Product
+
+
+class Command(BaseCommand):
+    help = "Hold the stock of hot products in several bins so concurrent OUT transactions lock different rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('skus', nargs='+', metavar='SKU')
+        parser.add_argument('--bins', type=int, default=4, help="Bins to spread each product's stock over.")
+        parser.add_argument('--merge', action='store_true', help="Go back to a single stock counter per product.")
+
+    def handle(self, *args, **options):
+        if options['bins'] < 1:
+            raise CommandError("--bins must be at least 1.")
+        products = {product.sku: product for product in Product.objects.filter(sku__in=options['skus'])}
+        unknown = [sku for sku in options['skus'] if sku not in products]
+        if unknown:
+            raise CommandError(f"Unknown SKU: {', '.join(unknown)}")
+        for product in products.values():
+            if options['merge']:
+                merge_stock(product)
+            else:
+                split_stock(product, options['bins'])
+        action = "Merged" if options['merge'] else f"Split into {options['bins']} bins:"
+        self.stdout.write(self.style.SUCCESS(f"{action} {', '.join(products)}"))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_alter_stocktransaction_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='stocktransaction',
+            options={'ordering': ['-date', '-id'], 'verbose_name': 'Stock Transaction', 'verbose_name_plural': 'Stock Transactions'},
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['date', 'id'], name='stocktxn_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['type', 'date', 'id'], name='stocktxn_type_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['reference', 'date', 'id'], name='stocktxn_ref_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:05
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    StockTransaction = apps.get_model('inventory', 'StockTransaction')
+    StockDetail = apps.get_model('inventory', 'StockDetail')
+    per_transaction = StockDetail.objects.filter(transaction=OuterRef('pk')).values('transaction')
+    StockTransaction.objects.update(
+        total_items=Coalesce(Subquery(per_transaction.annotate(total=Sum('quantity')).values('total')), 0),
+        total_value=Coalesce(Subquery(per_transaction.annotate(total=Sum(ExpressionWrapper(
+            F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2)
+        ))).values('total')), 0, output_field=DecimalField(max_digits=14, decimal_places=2)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_alter_stocktransaction_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocktransaction',
+            name='total_items',
+            field=models.IntegerField(default=0, help_text='Sum of detail quantities, set when the transaction is recorded'),
+        ),
+        migrations.AddField(
+            model_name='stocktransaction',
+            name='total_value',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of quantity x unit price over the details, set when the transaction is recorded', max_digits=14),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('incremental', models.BooleanField(default=False)),
+                ('last_detail_id', models.BigIntegerField(default=0, help_text='Highest StockDetail id that existed when the run started')),
+                ('checked', models.IntegerField(default=0)),
+                ('drifted', models.IntegerField(default=0)),
+                ('repaired', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Reconciliation Run',
+                'verbose_name_plural': 'Reconciliation Runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
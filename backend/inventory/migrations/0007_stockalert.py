@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_reconciliationrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('BELOW_MIN', 'Below minimum stock'), ('ABOVE_MAX', 'Above maximum stock')], max_length=10)),
+                ('stock', models.IntegerField(help_text='Stock level right after the transaction')),
+                ('threshold', models.IntegerField(help_text='The min_stock or max_stock that was crossed')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('SUPPRESSED', 'Suppressed as duplicate'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='inventory.product')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alerts', to='inventory.stocktransaction')),
+            ],
+            options={
+                'verbose_name': 'Stock Alert',
+                'verbose_name_plural': 'Stock Alerts',
+                'indexes': [models.Index(fields=['status', 'id'], name='stockalert_status_id_idx'), models.Index(fields=['product', 'kind', 'processed_at'], name='stockalert_product_kind_idx')],
+            },
+        ),
+    ]
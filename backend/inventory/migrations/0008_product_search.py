@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:22
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# The DDL is copied here rather than imported from inventory.search, so this
+# migration keeps doing what it did when it was written. search.py re-runs its
+# own copy after every migrate to restore triggers SQLite drops on rebuilds.
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS inventory_product_search USING fts5(
+        sku, name, content='inventory_product', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS inventory_product_search_ai AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO inventory_product_search(rowid, sku, name) VALUES (new.id, new.sku, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS inventory_product_search_ad AFTER DELETE ON inventory_product BEGIN
+        INSERT INTO inventory_product_search(inventory_product_search, rowid, sku, name)
+        VALUES ('delete', old.id, old.sku, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS inventory_product_search_au AFTER UPDATE OF sku, name ON inventory_product BEGIN
+        INSERT INTO inventory_product_search(inventory_product_search, rowid, sku, name)
+        VALUES ('delete', old.id, old.sku, old.name);
+        INSERT INTO inventory_product_search(rowid, sku, name) VALUES (new.id, new.sku, new.name);
+    END""",
+    "INSERT INTO inventory_product_search(inventory_product_search) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS inventory_product_search_ai",
+    "DROP TRIGGER IF EXISTS inventory_product_search_ad",
+    "DROP TRIGGER IF EXISTS inventory_product_search_au",
+    "DROP TABLE IF EXISTS inventory_product_search",
+]
+POSTGRESQL_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS product_sku_trgm_idx ON inventory_product USING gin (LOWER(sku) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON inventory_product USING gin (LOWER(name) gin_trgm_ops)",
+]
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS product_sku_trgm_idx",
+    "DROP INDEX IF EXISTS product_name_trgm_idx",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement, params=None)
+
+
+def install_substring_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DDL, 'postgresql': POSTGRESQL_DDL})
+
+
+def drop_substring_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_stockalert'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Lower('sku'), name='product_sku_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='product_name_lower_idx'),
+        ),
+        migrations.RunPython(install_substring_index, drop_substring_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_movements(apps, schema_editor):
+    # Large ledgers can skip this and run ``manage.py rebuild_movements`` instead.
+    StockDetail = apps.get_model('inventory', 'StockDetail')
+    DailyProductMovement = apps.get_model('inventory', 'DailyProductMovement')
+    value = F('quantity') * F('unit_price')
+    money = DecimalField(max_digits=16, decimal_places=2)
+    inward, outward = Q(transaction__type='IN'), Q(transaction__type='OUT')
+    rows = (
+        StockDetail.objects.values('product_id', day=TruncDate('transaction__date'))
+        .annotate(
+            in_qty=Sum('quantity', filter=inward, default=0),
+            out_qty=Sum('quantity', filter=outward, default=0),
+            in_value=Sum(value, filter=inward, default=0, output_field=money),
+            out_value=Sum(value, filter=outward, default=0, output_field=money),
+            txn_count=Count('id'),
+        )
+        .order_by()
+    )
+    DailyProductMovement.objects.bulk_create(
+        (DailyProductMovement(**row) for row in rows.iterator(chunk_size=2000)), batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_product_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Calendar day of the transactions, in TIME_ZONE')),
+                ('in_qty', models.IntegerField(default=0)),
+                ('out_qty', models.IntegerField(default=0)),
+                ('in_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('out_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('txn_count', models.IntegerField(default=0, help_text='Transactions that moved the product on this day')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_movements', to='inventory.product')),
+            ],
+            options={
+                'verbose_name': 'Daily Product Movement',
+                'verbose_name_plural': 'Daily Product Movements',
+                'indexes': [models.Index(fields=['day', 'product'], name='dailymovement_day_product_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='dailymovement_product_day_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_movements, migrations.RunPython.noop),
+    ]
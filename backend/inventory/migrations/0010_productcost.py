@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:39
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_costs(apps, schema_editor):
+    # Weighted average only; with INVENTORY_COST_LAYERS run `manage.py rebuild_costs` to build FIFO layers.
+    StockDetail = apps.get_model('inventory', 'StockDetail')
+    ProductCost = apps.get_model('inventory', 'ProductCost')
+    costs = {}
+    lines = (
+        StockDetail.objects.order_by('transaction__date', 'transaction_id', 'id')
+        .values_list('product_id', 'transaction__type', 'quantity', 'unit_price')
+        .iterator(chunk_size=2000)
+    )
+    for product_id, transaction_type, quantity, unit_price in lines:
+        cost = costs.setdefault(product_id, ProductCost(product_id=product_id, quantity=0, value=Decimal('0')))
+        if transaction_type == 'IN':
+            cost.value += quantity * unit_price
+        elif quantity >= cost.quantity:
+            cost.value = Decimal('0')
+        else:
+            cost.value -= (cost.value * quantity / cost.quantity).quantize(Decimal('0.0001'))
+        cost.quantity += quantity if transaction_type == 'IN' else -quantity
+    ProductCost.objects.bulk_create(costs.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_dailyproductmovement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCost',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cost', serialize=False, to='inventory.product')),
+                ('quantity', models.IntegerField(default=0, help_text='Units on hand according to the costed ledger')),
+                ('value', models.DecimalField(decimal_places=4, default=0, help_text='Value of the units on hand at weighted-average cost', max_digits=18)),
+                ('fifo_value', models.DecimalField(blank=True, decimal_places=4, help_text='Value of the remaining FIFO cost layers; empty while layers are not tracked', max_digits=18, null=True)),
+            ],
+            options={
+                'verbose_name': 'Product Cost',
+                'verbose_name_plural': 'Product Costs',
+            },
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_at', models.DateTimeField(help_text='Date of the IN transaction that created the layer')),
+                ('quantity', models.IntegerField(help_text='Units received')),
+                ('remaining', models.IntegerField(help_text='Units of this layer still on hand')),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='inventory.product')),
+            ],
+            options={
+                'verbose_name': 'Cost Layer',
+                'verbose_name_plural': 'Cost Layers',
+                'indexes': [models.Index(fields=['product', 'id'], name='costlayer_product_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_costs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_productcost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_by_location',
+            field=models.BooleanField(default=False, help_text='Stock is held in StockLocation rows and current_stock is their maintained sum'),
+        ),
+        migrations.CreateModel(
+            name='StockLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(help_text='Bin or location code, unique per product', max_length=50)),
+                ('quantity', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='locations', to='inventory.product')),
+            ],
+            options={
+                'verbose_name': 'Stock Location',
+                'verbose_name_plural': 'Stock Locations',
+                'constraints': [models.UniqueConstraint(fields=('product', 'code'), name='stocklocation_product_code_uniq')],
+            },
+        ),
+    ]
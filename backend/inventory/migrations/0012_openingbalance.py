@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_stocklocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningBalance',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='opening_balance', serialize=False, to='inventory.product')),
+                ('quantity', models.IntegerField(default=0)),
+                ('as_of', models.DateTimeField(help_text='Date of the newest archived transaction folded into the balance')),
+            ],
+            options={
+                'verbose_name': 'Opening Balance',
+                'verbose_name_plural': 'Opening Balances',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_openingbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Bumped with every current_stock write, under the row lock; orders live feed deltas'),
+        ),
+    ]
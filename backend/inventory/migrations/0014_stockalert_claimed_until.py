@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_product_stock_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockalert',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, help_text='A worker is delivering this alert until then', null=True),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models.functions import Lower
 
 class Product(models.Model):
     name = models.CharField(max_length=100, unique=True, help_text="Unique name for the product")
@@ -7,6 +10,12 @@ class Product(models.Model):
     current_stock = models.IntegerField(default=0, help_text="Current quantity in stock (managed by transactions)")
     min_stock = models.IntegerField(default=0, help_text="Minimum desired stock level for alerts")
     max_stock = models.IntegerField(default=1000, help_text="Maximum desired stock level/warehouse capacity")
+    stock_by_location = models.BooleanField(
+        default=False, help_text="Stock is held in StockLocation rows and current_stock is their maintained sum",
+    )
+    stock_version = models.PositiveBigIntegerField(
+        default=0, help_text="Bumped with every current_stock write, under the row lock; orders live feed deltas",
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -17,6 +26,11 @@ class Product(models.Model):
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
+        indexes = [
+            # Case-insensitive prefix lookups for products/search/.
+            models.Index(Lower('sku'), name='product_sku_lower_idx'),
+            models.Index(Lower('name'), name='product_name_lower_idx'),
+        ]
 
 class StockTransaction(models.Model):
     TRANSACTION_TYPE_CHOICES = [
@@ -34,7 +48,9 @@ class StockTransaction(models.Model):
                                  help_text="Optional reference number for the transaction (e.g., PO, SO)")
 
     notes = models.TextField(blank=True, null=True)
-
+    total_items = models.IntegerField(default=0, help_text="Sum of detail quantities, set when the transaction is recorded")
+    total_value = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                                      help_text="Sum of quantity x unit price over the details, set when the transaction is recorded")
 
     def __str__(self):
         return f"{self.type} Transaction on {self.date.strftime('%Y-%m-%d %H:%M')} (Ref: {self.reference or 'N/A'})"
@@ -42,7 +58,12 @@ class StockTransaction(models.Model):
     class Meta:
         verbose_name = "Stock Transaction"
         verbose_name_plural = "Stock Transactions"
-        ordering = ['-date']
+        ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['date', 'id'], name='stocktxn_date_id_idx'),
+            models.Index(fields=['type', 'date', 'id'], name='stocktxn_type_date_id_idx'),
+            models.Index(fields=['reference', 'date', 'id'], name='stocktxn_ref_date_id_idx'),
+        ]
 
 class StockDetail(models.Model):
     transaction = models.ForeignKey(StockTransaction, on_delete=models.CASCADE, related_name='details')
@@ -56,4 +77,190 @@ class StockDetail(models.Model):
     class Meta:
         verbose_name = "Stock Detail"
         verbose_name_plural = "Stock Details"
-        unique_together = ('transaction', 'product')
\ No newline at end of file
+        unique_together = ('transaction', 'product')
+
+class StockSnapshot(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='snapshots')
+    taken_at = models.DateTimeField(help_text="Ledger position of the snapshot: every detail dated at or before it is included")
+    quantity = models.IntegerField(help_text="Ledger balance (IN minus OUT) of the product at taken_at")
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.quantity}"
+
+    class Meta:
+        verbose_name = "Stock Snapshot"
+        verbose_name_plural = "Stock Snapshots"
+        unique_together = ('taken_at', 'product')
+
+
+class ReconciliationRun(models.Model):
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    incremental = models.BooleanField(default=False)
+    last_detail_id = models.BigIntegerField(default=0, help_text="Highest StockDetail id that existed when the run started")
+    checked = models.IntegerField(default=0)
+    drifted = models.IntegerField(default=0)
+    repaired = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Reconciliation {self.started_at:%Y-%m-%d %H:%M}: {self.drifted} drifted of {self.checked}"
+
+    class Meta:
+        verbose_name = "Reconciliation Run"
+        verbose_name_plural = "Reconciliation Runs"
+        ordering = ['-started_at']
+
+
+class StockAlert(models.Model):
+    """Outbox row written in the same DB transaction as the stock change that crossed a threshold."""
+    BELOW_MIN = 'BELOW_MIN'
+    ABOVE_MAX = 'ABOVE_MAX'
+    KIND_CHOICES = [
+        (BELOW_MIN, 'Below minimum stock'),
+        (ABOVE_MAX, 'Above maximum stock'),
+    ]
+
+    PENDING = 'PENDING'
+    SENT = 'SENT'
+    SUPPRESSED = 'SUPPRESSED'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (SUPPRESSED, 'Suppressed as duplicate'),
+        (FAILED, 'Failed'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='alerts')
+    transaction = models.ForeignKey(StockTransaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='alerts')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    stock = models.IntegerField(help_text="Stock level right after the transaction")
+    threshold = models.IntegerField(help_text="The min_stock or max_stock that was crossed")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    claimed_until = models.DateTimeField(null=True, blank=True,
+                                         help_text="A worker is delivering this alert until then")
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: product {self.product_id} at {self.stock} (threshold {self.threshold})"
+
+    class Meta:
+        verbose_name = "Stock Alert"
+        verbose_name_plural = "Stock Alerts"
+        indexes = [
+            models.Index(fields=['status', 'id'], name='stockalert_status_id_idx'),
+            models.Index(fields=['product', 'kind', 'processed_at'], name='stockalert_product_kind_idx'),
+        ]
+
+
+class DailyProductMovement(models.Model):
+    """
+    Per-product, per-day totals of the ledger, upserted in the same DB
+    transaction as the details they summarise. Reports read these rows
+    instead of scanning StockDetail.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_movements')
+    day = models.DateField(help_text="Calendar day of the transactions, in TIME_ZONE")
+    in_qty = models.IntegerField(default=0)
+    out_qty = models.IntegerField(default=0)
+    in_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    out_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    txn_count = models.IntegerField(default=0, help_text="Transactions that moved the product on this day")
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: +{self.in_qty} / -{self.out_qty}"
+
+    class Meta:
+        verbose_name = "Daily Product Movement"
+        verbose_name_plural = "Daily Product Movements"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='dailymovement_product_day_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'product'], name='dailymovement_day_product_idx'),
+        ]
+
+
+class ProductCost(models.Model):
+    """
+    Running cost state of a product, advanced by every transaction in the
+    same DB transaction as its stock. Valuing the warehouse reads these rows
+    instead of replaying the ledger.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='cost')
+    quantity = models.IntegerField(default=0, help_text="Units on hand according to the costed ledger")
+    value = models.DecimalField(max_digits=18, decimal_places=4, default=0,
+                                help_text="Value of the units on hand at weighted-average cost")
+    fifo_value = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True,
+                                     help_text="Value of the remaining FIFO cost layers; empty while layers are not tracked")
+
+    @property
+    def average_cost(self):
+        return (self.value / self.quantity).quantize(Decimal('0.0001')) if self.quantity > 0 else Decimal('0.0000')
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity} @ {self.average_cost}"
+
+    class Meta:
+        verbose_name = "Product Cost"
+        verbose_name_plural = "Product Costs"
+
+
+class CostLayer(models.Model):
+    """An IN line's units that have not been issued yet, consumed oldest first (FIFO)."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cost_layers')
+    received_at = models.DateTimeField(help_text="Date of the IN transaction that created the layer")
+    quantity = models.IntegerField(help_text="Units received")
+    remaining = models.IntegerField(help_text="Units of this layer still on hand")
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.product_id}: {self.remaining}/{self.quantity} @ {self.unit_cost}"
+
+    class Meta:
+        verbose_name = "Cost Layer"
+        verbose_name_plural = "Cost Layers"
+        indexes = [
+            models.Index(fields=['product', 'id'], name='costlayer_product_idx'),
+        ]
+
+
+class StockLocation(models.Model):
+    """
+    A bin or warehouse location holding part of a product's stock. Only
+    products with ``stock_by_location`` have them: OUT lines then lock just
+    the bins they draw from, so writers on one hot SKU overlap.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='locations')
+    code = models.CharField(max_length=50, help_text="Bin or location code, unique per product")
+    quantity = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.product_id}@{self.code}: {self.quantity}"
+
+    class Meta:
+        verbose_name = "Stock Location"
+        verbose_name_plural = "Stock Locations"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'code'], name='stocklocation_product_code_uniq'),
+        ]
+
+
+class OpeningBalance(models.Model):
+    """
+    Net IN minus OUT of a product's archived ledger rows. The hot ledger
+    plus this balance still gives the stock, so reconciliation and as-of
+    queries keep working once old transactions have been archived.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='opening_balance')
+    quantity = models.IntegerField(default=0)
+    as_of = models.DateTimeField(help_text="Date of the newest archived transaction folded into the balance")
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity} as of {self.as_of}"
+
+    class Meta:
+        verbose_name = "Opening Balance"
+        verbose_name_plural = "Opening Balances"
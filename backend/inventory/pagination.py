@@ -0,0 +1,115 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .archive import archived_page
+
+
+def encode_ledger_cursor(transaction_instance):
+    """Cursor after a transaction, given as a model instance or a ``values()`` row."""
+    if isinstance(transaction_instance, dict):
+        date, transaction_id = transaction_instance['date'], transaction_instance['id']
+    else:
+        date, transaction_id = transaction_instance.date, transaction_instance.id
+    position = f"{date.isoformat()}|{transaction_id}"
+    return urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+
+def decode_ledger_cursor(encoded):
+    """Return the ``(date, id)`` position of a cursor, or raise ``ValueError``."""
+    date, _, transaction_id = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').partition('|')
+    date = parse_datetime(date)
+    if date is None:
+        raise ValueError(encoded)
+    return date, int(transaction_id)
+
+
+def keyset_page(queryset, cursor, page_size):
+    """
+    Return the page of ``queryset`` after ``cursor`` in ``(-date, -id)`` order,
+    plus the cursor for the following page (``None`` on the last page).
+
+    The position is applied as ``date <= d AND (date < d OR id < i)`` so the
+    ``(date, id)`` index range scan starts at the cursor and a deep page costs
+    the same as the first one.
+    """
+    queryset = queryset.order_by('-date', '-id')
+    if cursor is not None:
+        date, transaction_id = cursor
+        queryset = queryset.filter(Q(date__lte=date), Q(date__lt=date) | Q(id__lt=transaction_id))
+    page = list(queryset[:page_size + 1])
+    if len(page) <= page_size:
+        return page, None
+    page = page[:page_size]
+    return page, encode_ledger_cursor(page[-1])
+
+
+class LedgerCursorPagination(BasePagination):
+    """Forward-only keyset pagination over the ``(date, id)`` ledger index."""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_cursor(self, request):
+        """The decoded ``?cursor=`` position, or ``None`` for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            return decode_ledger_cursor(encoded)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page, self.next_cursor = keyset_page(queryset, self.get_cursor(request), self.get_page_size(request))
+        return page
+
+    def paginate_archive(self, request, since=None, until=None):
+        """Like ``paginate_queryset``, over archived transactions read from the partition files."""
+        self.request = request
+        page, last = archived_page(since, until, self.get_cursor(request), self.get_page_size(request))
+        self.next_cursor = encode_ledger_cursor(last) if last is not None else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('first', self.get_first_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'results': schema,
+            },
+        }
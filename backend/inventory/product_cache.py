@@ -0,0 +1,97 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+
+from .models import Product
+
+PRODUCT_FIELDS = ('id', 'name', 'sku', 'description', 'current_stock', 'min_stock', 'max_stock', 'updated_at')
+
+_no_cache = DummyCache('inventory-products', {})
+
+
+def _id_key(product_id):
+    return f'product:id:{product_id}'
+
+
+def _sku_key(sku):
+    return f'product:sku:{sku}'
+
+
+class ProductCache:
+    """
+    Read-through cache of product rows (``ProductSerializer`` fields plus
+    ``updated_at``) keyed by id, with a SKU -> id index.
+
+    It sits on the ``INVENTORY_PRODUCT_CACHE`` cache alias, so eviction is the
+    backend's: locmem gives per-process LRU culling at ``MAX_ENTRIES`` plus a
+    TTL, while a file/DB/Redis cache shares entries between processes.
+    Entries are dropped on commit of product saves and stock writes; the TTL
+    bounds how long a read racing a write can leave a stale entry behind.
+
+    Invalidation only reaches the process that wrote, so the cache is off
+    (every read goes to the database) unless ``INVENTORY_PRODUCT_CACHE``
+    names an alias, and that alias must be shared when several processes
+    serve the API (see ``checks.py``).
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        alias = getattr(settings, 'INVENTORY_PRODUCT_CACHE', None)
+        return caches[alias] if alias else _no_cache
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get_many(self, product_ids):
+        """Return ``{id: product_dict}`` for the ids that exist, loading misses in one query."""
+        product_ids = set(product_ids)
+        found = self.cache.get_many([_id_key(product_id) for product_id in product_ids])
+        products = {data['id']: data for data in found.values()}
+        missing = product_ids - products.keys()
+        self._count(len(products), len(missing))
+        if missing:
+            loaded = {data['id']: data for data in Product.objects.filter(id__in=missing).values(*PRODUCT_FIELDS)}
+            self.cache.set_many({
+                **{_id_key(product_id): data for product_id, data in loaded.items()},
+                **{_sku_key(data['sku']): product_id for product_id, data in loaded.items()},
+            })
+            products.update(loaded)
+        return products
+
+    def get(self, product_id):
+        return self.get_many([product_id]).get(product_id)
+
+    def get_by_sku(self, sku):
+        product_id = self.cache.get(_sku_key(sku))
+        if product_id is not None:
+            data = self.get(product_id)
+            if data is not None and data['sku'] == sku:
+                return data
+        product_id = Product.objects.filter(sku=sku).values_list('id', flat=True).first()
+        return self.get(product_id) if product_id is not None else None
+
+    def invalidate(self, product_ids=(), skus=()):
+        self.cache.delete_many([_id_key(product_id) for product_id in product_ids] + [_sku_key(sku) for sku in skus])
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+product_cache = ProductCache()
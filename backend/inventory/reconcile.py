@@ -0,0 +1,144 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import django
+from django.db import connections, transaction as db_transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from rest_framework import serializers
+
+from .feed import change_event
+from .ledger import ledger_balances
+from .models import Product, ReconciliationRun, StockDetail
+from .stock import lock_batch, stock_written
+
+
+@dataclass
+class Drift:
+    product_id: int
+    sku: str
+    stored: int
+    ledger: int
+
+    @property
+    def difference(self):
+        return self.stored - self.ledger
+
+
+def _compare(products, balances):
+    return [
+        Drift(product_id, sku, stored, balances.get(product_id, 0))
+        for product_id, sku, stored in products
+        if stored != balances.get(product_id, 0)
+    ]
+
+
+def check_range(id_range):
+    """Drift for products with ``low <= id < high``: two grouped queries per range."""
+    low, high = id_range
+    products = Product.objects.filter(id__gte=low, id__lt=high).values_list('id', 'sku', 'current_stock')
+    return _compare(products, ledger_balances(id_range=id_range, with_opening=True))
+
+
+def check_ids(product_ids):
+    products = Product.objects.filter(id__in=product_ids).values_list('id', 'sku', 'current_stock')
+    return _compare(products, ledger_balances(product_ids=product_ids, with_opening=True))
+
+
+def full_work(chunk_size):
+    bounds = Product.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    return [(low, low + chunk_size) for low in range(bounds['low'], bounds['high'] + 1, chunk_size)]
+
+
+def incremental_work(since_run, chunk_size):
+    """Products with details newer than the previous run, or updated since it started, in id chunks."""
+    touched = set(
+        StockDetail.objects.filter(id__gt=since_run.last_detail_id).values_list('product_id', flat=True).distinct()
+    )
+    touched.update(Product.objects.filter(updated_at__gte=since_run.started_at).values_list('id', flat=True))
+    touched = sorted(touched)
+    return [touched[start:start + chunk_size] for start in range(0, len(touched), chunk_size)]
+
+
+def _init_worker():
+    django.setup()
+    connections.close_all()
+
+
+def _run_task(task):
+    return check_ids(task) if isinstance(task, list) else check_range(task)
+
+
+def find_drift(tasks, workers=1):
+    """Run the range/id-list tasks, across a process pool when ``workers`` > 1."""
+    if workers <= 1 or len(tasks) <= 1:
+        return [drift for task in tasks for drift in _run_task(task)]
+    # Forked workers must not share the parent's database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return [drift for drifts in pool.map(_run_task, tasks) for drift in drifts]
+
+
+def repair(product_ids):
+    """
+    Reset ``current_stock`` to the ledger balance for ``product_ids``. The rows
+    are locked and the balance recomputed under the lock, so a transaction
+    committed since the check is not lost. Products tracked by location get
+    their bins moved to the same total; one whose balance the bins cannot
+    hold (a negative balance) is left as it is.
+    """
+    with db_transaction.atomic():
+        products, allocator = lock_batch(product_ids)
+        balances = ledger_balances(product_ids=list(products), with_opening=True)
+        changed = []
+        for product in products.values():
+            balance = balances.get(product.id, 0)
+            if product.stock_by_location:
+                delta = balance - sum(location.quantity for location in allocator.bins[product.id])
+                if delta:
+                    try:
+                        allocator.allocate('IN' if delta > 0 else 'OUT', {product.id: delta}, products)
+                    except serializers.ValidationError:
+                        continue
+            if product.current_stock != balance:
+                product.current_stock = balance
+                product.stock_version += 1
+                product.updated_at = timezone.now()
+                changed.append(product)
+        allocator.apply()
+        Product.objects.bulk_update(changed, ['current_stock', 'stock_version', 'updated_at'])
+        if changed:
+            stock_written([change_event(None, {
+                product.id: (product.current_stock, product.stock_version) for product in changed
+            })])
+        return len(changed)
+
+
+def reconcile(incremental=False, fix=False, workers=1, chunk_size=5000):
+    """
+    Compare every product's ``current_stock`` with its ledger balance (or only
+    products touched since the last run when ``incremental``), optionally
+    repairing drift, and record the run for the next incremental pass.
+    """
+    previous = ReconciliationRun.objects.filter(finished_at__isnull=False).first()
+    run = ReconciliationRun.objects.create(
+        started_at=timezone.now(),
+        incremental=incremental and previous is not None,
+        last_detail_id=StockDetail.objects.aggregate(last=Max('id'))['last'] or 0,
+    )
+    if run.incremental:
+        tasks = incremental_work(previous, chunk_size)
+        run.checked = sum(len(task) for task in tasks)
+    else:
+        tasks = full_work(chunk_size)
+        run.checked = Product.objects.count()
+
+    drifts = find_drift(tasks, workers)
+    run.drifted = len(drifts)
+    if fix and drifts:
+        run.repaired = repair([drift.product_id for drift in drifts])
+    run.finished_at = timezone.now()
+    run.save()
+    return run, drifts
@@ -0,0 +1,154 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import Count, DecimalField, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import archive_horizon
+from .models import DailyProductMovement, Product, StockDetail, StockTransaction
+
+MOVEMENT_FIELDS = ('in_qty', 'out_qty', 'in_value', 'out_value', 'txn_count')
+# Rows per upsert statement; each row binds seven parameters.
+UPSERT_CHUNK = 1000
+
+
+def movement_day(moment):
+    return timezone.localtime(moment).date()
+
+
+def movement_totals(pairs):
+    """
+    Sum ``(transaction, details)`` pairs into
+    ``{(product_id, day): [in_qty, out_qty, in_value, out_value, txn_count]}``.
+    """
+    totals = {}
+    for transaction_instance, details in pairs:
+        day = movement_day(transaction_instance.date)
+        inward = transaction_instance.type == 'IN'
+        for detail in details:
+            row = totals.setdefault((detail.product_id, day), [0, 0, Decimal('0.00'), Decimal('0.00'), 0])
+            value = detail.quantity * Decimal(detail.unit_price)
+            if inward:
+                row[0] += detail.quantity
+                row[2] += value
+            else:
+                row[1] += detail.quantity
+                row[3] += value
+            row[4] += 1
+    return totals
+
+
+def record_movements(pairs):
+    """
+    Add newly written ``(transaction, details)`` pairs to their daily rollup
+    rows. Each chunk is a single ``INSERT ... ON CONFLICT DO UPDATE`` that
+    increments existing rows, so concurrent writers never overwrite each
+    other's totals.
+    """
+    totals = movement_totals(pairs)
+    if not totals:
+        return
+    table = connection.ops.quote_name(DailyProductMovement._meta.db_table)
+    columns = ('product_id', 'day', *MOVEMENT_FIELDS)
+    increments = ', '.join(f"{field} = {table}.{field} + excluded.{field}" for field in MOVEMENT_FIELDS)
+    rows = iter(sorted(totals.items()))
+    while chunk := list(islice(rows, UPSERT_CHUNK)):
+        params = []
+        for (product_id, day), values in chunk:
+            params.extend((product_id, connection.ops.adapt_datefield_value(day), *values))
+        placeholders = ', '.join([f"({', '.join(['%s'] * len(columns))})"] * len(chunk))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders} "
+                f"ON CONFLICT (product_id, day) DO UPDATE SET {increments}",
+                params,
+            )
+
+
+def day_bounds(first_day, last_day):
+    """Aware datetimes spanning ``first_day`` 00:00 up to (excluding) the day after ``last_day``."""
+    start = timezone.make_aware(datetime.combine(first_day, time.min))
+    stop = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    return start, stop
+
+
+def ledger_movements(first_day, last_day):
+    """Rollup rows for the days ``first_day``..``last_day`` aggregated from the ledger, as an iterator."""
+    start, stop = day_bounds(first_day, last_day)
+    value = F('quantity') * F('unit_price')
+    money = DecimalField(max_digits=16, decimal_places=2)
+    inward, outward = Q(transaction__type='IN'), Q(transaction__type='OUT')
+    rows = (
+        StockDetail.objects.filter(transaction__date__gte=start, transaction__date__lt=stop)
+        .values('product_id', day=TruncDate('transaction__date'))
+        .annotate(
+            in_qty=Sum('quantity', filter=inward, default=0),
+            out_qty=Sum('quantity', filter=outward, default=0),
+            in_value=Sum(value, filter=inward, default=0, output_field=money),
+            out_value=Sum(value, filter=outward, default=0, output_field=money),
+            txn_count=Count('id'),
+        )
+        .order_by()
+    )
+    return (DailyProductMovement(**row) for row in rows.iterator(chunk_size=2000))
+
+
+def rebuild_movements(since=None, until=None, chunk_days=31, batch_size=2000):
+    """
+    Recompute the rollup for ``since``..``until`` (default: the whole
+    ledger) from StockDetail, ``chunk_days`` days per DB transaction. Live
+    writes only touch the current day, so rebuild closed days while the
+    system runs, or today's too once writes are paused.
+
+    Days up to the archive horizon are left alone: their ledger rows are no
+    longer in StockDetail, and the rollup already holds them.
+    """
+    if since is None or until is None:
+        bounds = StockTransaction.objects.aggregate(first=Min('date'), last=Max('date'))
+        if bounds['first'] is None:
+            return 0
+        since = since or movement_day(bounds['first'])
+        until = until or movement_day(bounds['last'])
+    horizon = archive_horizon()
+    if horizon is not None:
+        since = max(since, movement_day(horizon) + timedelta(days=1))
+
+    written = 0
+    first_day = since
+    while first_day <= until:
+        last_day = min(first_day + timedelta(days=chunk_days - 1), until)
+        with db_transaction.atomic():
+            DailyProductMovement.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+            rows = ledger_movements(first_day, last_day)
+            while batch := list(islice(rows, batch_size)):
+                DailyProductMovement.objects.bulk_create(batch)
+                written += len(batch)
+        first_day = last_day + timedelta(days=1)
+    return written
+
+
+def movement_series(since, until, product_id=None):
+    """Per-day totals over all products (or one) for ``since``..``until``, read from the rollup only."""
+    rows = DailyProductMovement.objects.filter(day__gte=since, day__lte=until)
+    if product_id is not None:
+        rows = rows.filter(product_id=product_id)
+    return list(rows.values('day').annotate(**{field: Sum(field) for field in MOVEMENT_FIELDS}).order_by('day'))
+
+
+def top_movers(since, until, by='out_qty', limit=10):
+    """The ``limit`` products with the largest ``by`` total over ``since``..``until``."""
+    ranked = list(
+        DailyProductMovement.objects.filter(day__gte=since, day__lte=until)
+        .values('product_id')
+        .annotate(**{field: Sum(field) for field in MOVEMENT_FIELDS})
+        .order_by(f'-{by}', 'product_id')[:limit]
+    )
+    products = Product.objects.in_bulk([row['product_id'] for row in ranked])
+    for row in ranked:
+        product = products.get(row['product_id'])
+        row['sku'] = product.sku if product else None
+        row['name'] = product.name if product else None
+    return ranked
@@ -0,0 +1,132 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Product
+
+SEARCH_FIELDS = ('id', 'sku', 'name', 'current_stock')
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# FTS5's trigram tokenizer cannot match anything shorter than one trigram.
+MIN_SUBSTRING_LENGTH = 3
+# Upper bound for a prefix range scan on the Lower() expression indexes.
+PREFIX_END = '\U0010ffff'
+
+SQLITE_SEARCH_TABLE = 'inventory_product_search'
+
+# An external-content FTS5 table over inventory_product, kept in step by
+# triggers. The update trigger only fires for sku/name changes, so stock
+# writes never touch it.
+SQLITE_SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_SEARCH_TABLE} USING fts5(
+        sku, name, content='inventory_product', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_product_search_ai AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO {SQLITE_SEARCH_TABLE}(rowid, sku, name) VALUES (new.id, new.sku, new.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_product_search_ad AFTER DELETE ON inventory_product BEGIN
+        INSERT INTO {SQLITE_SEARCH_TABLE}({SQLITE_SEARCH_TABLE}, rowid, sku, name)
+        VALUES ('delete', old.id, old.sku, old.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS inventory_product_search_au AFTER UPDATE OF sku, name ON inventory_product BEGIN
+        INSERT INTO {SQLITE_SEARCH_TABLE}({SQLITE_SEARCH_TABLE}, rowid, sku, name)
+        VALUES ('delete', old.id, old.sku, old.name);
+        INSERT INTO {SQLITE_SEARCH_TABLE}(rowid, sku, name) VALUES (new.id, new.sku, new.name);
+    END""",
+]
+SQLITE_SEARCH_TRIGGERS = ('inventory_product_search_ai', 'inventory_product_search_ad', 'inventory_product_search_au')
+
+POSTGRESQL_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS product_sku_trgm_idx ON inventory_product USING gin (LOWER(sku) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON inventory_product USING gin (LOWER(name) gin_trgm_ops)",
+]
+
+
+def install_search_index(db_connection):
+    """
+    Create the substring index for the database vendor if it is missing:
+    FTS5 (trigram) plus sync triggers on SQLite, pg_trgm GIN indexes on
+    PostgreSQL. Idempotent. It also runs after every ``migrate``, because
+    SQLite drops the triggers whenever a migration rebuilds the product
+    table; the FTS content is rebuilt when they had to be recreated.
+    """
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                SQLITE_SEARCH_TRIGGERS,
+            )
+            complete = cursor.fetchone()[0] == len(SQLITE_SEARCH_TRIGGERS)
+            for statement in SQLITE_SEARCH_DDL:
+                cursor.execute(statement)
+            if not complete:
+                cursor.execute(f"INSERT INTO {SQLITE_SEARCH_TABLE}({SQLITE_SEARCH_TABLE}) VALUES ('rebuild')")
+        elif db_connection.vendor == 'postgresql':
+            for statement in POSTGRESQL_SEARCH_DDL:
+                cursor.execute(statement)
+
+
+def drop_search_index(db_connection):
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'sqlite':
+            for trigger in SQLITE_SEARCH_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            cursor.execute(f"DROP TABLE IF EXISTS {SQLITE_SEARCH_TABLE}")
+        elif db_connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS product_sku_trgm_idx")
+            cursor.execute("DROP INDEX IF EXISTS product_name_trgm_idx")
+
+
+def _keyed():
+    return Product.objects.alias(sku_key=Lower('sku'), name_key=Lower('name'))
+
+
+def _prefix_filter(field, term):
+    if connection.vendor == 'postgresql':
+        # pg_trgm indexes serve anchored LIKE too, without collation caveats.
+        return {f'{field}_key__startswith': term}
+    return {f'{field}_key__gte': term, f'{field}_key__lt': term + PREFIX_END}
+
+
+def _substring_ids(term, limit, exclude):
+    if connection.vendor == 'sqlite':
+        if len(term) < MIN_SUBSTRING_LENGTH:
+            return []
+        phrase = '"' + term.replace('"', '""') + '"'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SQLITE_SEARCH_TABLE} WHERE {SQLITE_SEARCH_TABLE} MATCH %s LIMIT %s",
+                [phrase, limit + len(exclude)],
+            )
+            return [product_id for product_id, in cursor.fetchall() if product_id not in exclude][:limit]
+    queryset = _keyed().filter(Q(sku_key__contains=term) | Q(name_key__contains=term)).exclude(id__in=exclude)
+    return list(queryset.values_list('id', flat=True)[:limit])
+
+
+def search_products(query, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Up to ``limit`` products whose SKU or name contains ``query``, ignoring
+    case: SKU prefix matches first, then name prefix matches, then other
+    substring matches. Each step reads at most ``limit`` rows from an index.
+    """
+    term = query.strip().lower()
+    if not term:
+        return []
+
+    results = []
+    for field in ('sku', 'name'):
+        if len(results) >= limit:
+            break
+        found = {row['id'] for row in results}
+        results.extend(
+            _keyed().filter(**_prefix_filter(field, term)).exclude(id__in=found)
+            .order_by(f'{field}_key').values(*SEARCH_FIELDS)[:limit - len(results)]
+        )
+
+    if len(results) < limit:
+        found = {row['id'] for row in results}
+        substring_ids = _substring_ids(term, limit - len(results), found)
+        rows = {row['id']: row for row in Product.objects.filter(id__in=substring_ids).values(*SEARCH_FIELDS)}
+        results.extend(rows[product_id] for product_id in substring_ids if product_id in rows)
+    return results
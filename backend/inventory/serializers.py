@@ -1,85 +1,76 @@
 from rest_framework import serializers
-from django.db import transaction as db_transaction
+from .group_commit import get_group_writer, group_commit_enabled
+from .instrumentation import TimedListSerializer, TimedSerializerMixin
 from .models import Product, StockTransaction, StockDetail
+from .product_cache import product_cache
+from .stock import create_stock_transaction
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'name', 'sku', 'description', 'current_stock', 'min_stock', 'max_stock']
         read_only_fields = ('current_stock', 'created_at', 'updated_at')
 
 class TransactionDetailSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
+    # Existence is checked for all lines at once in TransactionSerializer.validate_details.
+    product_id = serializers.IntegerField(write_only=True, source='product')
 
     class Meta:
         model = StockDetail
         fields = ['id', 'product', 'product_id', 'quantity', 'unit_price']
-        extra_kwargs = {
-            'product_id': {'write_only': True, 'source': 'product'}
-        }
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     details = TransactionDetailSerializer(many=True)
-    total_items = serializers.SerializerMethodField()
 
     class Meta:
         model = StockTransaction
-        fields = ['id', 'type', 'date', 'reference', 'total_items', 'notes', 'details']
-        read_only_fields = ('date', 'total_items',)
-
-    def get_total_items(self, obj):
-        return sum(detail.quantity for detail in obj.details.all())
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'type', 'date', 'reference', 'total_items', 'total_value', 'notes', 'details']
+        read_only_fields = ('date', 'total_items', 'total_value')
+
+    def validate_details(self, details):
+        product_ids = {detail['product'] for detail in details}
+        known = product_cache.get_many(product_ids)
+        if product_ids - known.keys():
+            # Same per-line shape as a PrimaryKeyRelatedField on each detail.
+            raise serializers.ValidationError([
+                {} if detail['product'] in known
+                else {'product_id': [f'Invalid pk "{detail["product"]}" - object does not exist.']}
+                for detail in details
+            ])
+        return details
 
     def create(self, validated_data):
         details_data = validated_data.pop('details')
-        with db_transaction.atomic():
-            transaction_instance = StockTransaction.objects.create(**validated_data)
-
-            for detail_data in details_data:
-                product_obj = detail_data['product']
-                quantity = detail_data['quantity']
-                unit_price = detail_data.get('unit_price', 0.00)
-
-                if not Product.objects.filter(id=product_obj.id).exists():
-                    raise serializers.ValidationError(f"Product with ID {product_obj.id} does not exist.")
-                if quantity <= 0:
-                    raise serializers.ValidationError("Quantity must be greater than zero for any transaction detail.")
-
-                product_to_update = Product.objects.select_for_update().get(id=product_obj.id)
-
-                if transaction_instance.type == 'IN':
-                    product_to_update.current_stock += quantity
-                    if product_to_update.current_stock > product_to_update.max_stock:
-                        print(f"Warning: Stock for {product_to_update.name} ({product_to_update.current_stock}) "
-                              f"exceeded max stock ({product_to_update.max_stock}).")
-
-                elif transaction_instance.type == 'OUT':
-                    if quantity < 0:
-                        raise serializers.ValidationError("Outward quantities must be positive.")
+        if group_commit_enabled():
+            return get_group_writer().submit(validated_data, details_data)
+        return create_stock_transaction(validated_data, details_data)
 
-                    if product_to_update.current_stock < quantity:
-                        raise serializers.ValidationError(f"Insufficient stock for product '{product_to_update.name}'. "
-                                                          f"Available: {product_to_update.current_stock}, Requested: {quantity}.")
-                    product_to_update.current_stock -= quantity
-                    if product_to_update.current_stock < product_to_update.min_stock:
-                        print(f"Warning: Stock for {product_to_update.name} ({product_to_update.current_stock}) "
-                              f"fell below min stock ({product_to_update.min_stock}).")
-                else:
-                    raise serializers.ValidationError(f"Invalid transaction type: {transaction_instance.type}")
+class TransactionSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = StockTransaction
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'type', 'date', 'reference', 'total_items', 'total_value', 'notes']
+        read_only_fields = fields
 
-                product_to_update.save()
+class InventorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'name', 'sku', 'current_stock', 'min_stock', 'max_stock']
 
-                StockDetail.objects.create(
-                    transaction=transaction_instance,
-                    product=product_to_update,
-                    quantity=quantity,
-                    unit_price=unit_price
-                )
+class BatchDetailSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(source='product')
+    quantity = serializers.IntegerField()
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
 
-            return transaction_instance
+class BatchTransactionSerializer(serializers.ModelSerializer):
+    # Product existence is checked once for the whole batch when the rows are locked.
+    details = BatchDetailSerializer(many=True)
 
-class InventorySerializer(serializers.ModelSerializer):
     class Meta:
-        model = Product
-        fields = ['id', 'name', 'sku', 'current_stock', 'min_stock', 'max_stock']
\ No newline at end of file
+        model = StockTransaction
+        fields = ['type', 'reference', 'notes', 'details']
@@ -0,0 +1,20 @@
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Product
+from .product_cache import product_cache
+from .summary import invalidate_inventory_summary
+from .version import bump_inventory_version
+
+
+def products_changed():
+    """Hooks that must run once a product write (single or bulk) has committed."""
+    db_transaction.on_commit(invalidate_inventory_summary)
+    db_transaction.on_commit(bump_inventory_version)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    products_changed()
+    db_transaction.on_commit(lambda: product_cache.invalidate([instance.pk], [instance.sku]))
@@ -0,0 +1,71 @@
+from datetime import datetime, time
+
+from django.db import transaction as db_transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .archive import archive_horizon, archived_balances
+from .ledger import ledger_balances, opening_balances
+from .models import Product, StockSnapshot
+
+
+def default_snapshot_time():
+    """Midnight at the start of the current day, so a daily run snapshots the day that just closed."""
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+
+
+def latest_snapshot_at(moment):
+    return StockSnapshot.objects.filter(taken_at__lte=moment).aggregate(latest=Max('taken_at'))['latest']
+
+
+def stock_as_of(moment, product_ids=None):
+    """
+    Ledger balance per product id at ``moment``: the nearest snapshot taken at
+    or before it plus the detail deltas dated after that snapshot. The cost is
+    bounded by the snapshot interval, not by the age of the ledger.
+
+    Once transactions have been archived, the opening balances stand in for
+    an older (or missing) snapshot at the archive horizon. Moments before the
+    horizon read the archived deltas from the partition files instead.
+
+    Returns ``(snapshot_at, balances)``; ``snapshot_at`` is ``None`` when no
+    earlier snapshot exists and the whole ledger had to be summed.
+    """
+    snapshot_at = latest_snapshot_at(moment)
+    horizon = archive_horizon()
+    balances = {}
+    if horizon is not None and horizon <= moment and (snapshot_at is None or snapshot_at < horizon):
+        balances = opening_balances(product_ids)
+        for product_id, delta in ledger_balances(until=moment, product_ids=product_ids).items():
+            balances[product_id] = balances.get(product_id, 0) + delta
+        return horizon, balances
+
+    if snapshot_at is not None:
+        snapshots = StockSnapshot.objects.filter(taken_at=snapshot_at)
+        if product_ids is not None:
+            snapshots = snapshots.filter(product_id__in=product_ids)
+        balances = dict(snapshots.values_list('product_id', 'quantity'))
+    deltas = [ledger_balances(after=snapshot_at, until=moment, product_ids=product_ids)]
+    if horizon is not None and (snapshot_at is None or snapshot_at < horizon):
+        deltas.append(archived_balances(after=snapshot_at, until=moment, product_ids=product_ids))
+    for product_deltas in deltas:
+        for product_id, delta in product_deltas.items():
+            balances[product_id] = balances.get(product_id, 0) + delta
+    return snapshot_at, balances
+
+
+def take_snapshot(taken_at, chunk_size=2000):
+    """Write one StockSnapshot row per product for ``taken_at``, replacing any existing one."""
+    with db_transaction.atomic():
+        StockSnapshot.objects.filter(taken_at=taken_at).delete()
+        _, balances = stock_as_of(taken_at)
+        product_ids = Product.objects.order_by('id').values_list('id', flat=True)
+        batch, written = [], 0
+        for product_id in product_ids.iterator(chunk_size=chunk_size):
+            batch.append(StockSnapshot(product_id=product_id, taken_at=taken_at, quantity=balances.get(product_id, 0)))
+            if len(batch) >= chunk_size:
+                StockSnapshot.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        StockSnapshot.objects.bulk_create(batch)
+        return written + len(batch)
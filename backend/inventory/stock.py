@@ -0,0 +1,315 @@
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from .costing import record_costs
+from .models import Product, StockAlert, StockTransaction, StockDetail
+from .feed import change_event, publish_changes
+from .locations import LocationAllocator
+from .product_cache import product_cache
+from .rollups import record_movements
+from .summary import invalidate_inventory_summary
+from .version import bump_inventory_version
+
+DEFAULT_BATCH_CHUNK_SIZE = 500
+
+
+def _product_id(product):
+    return product.pk if isinstance(product, Product) else int(product)
+
+
+def lock_products(product_ids, defer_located=False):
+    """
+    Lock every referenced product with a single SELECT ... FOR UPDATE.
+    Rows are locked in id order so concurrent writers cannot deadlock. Each
+    product's cost state comes along in the same query; the product lock
+    guards it too.
+
+    With ``defer_located``, products tracked by location are only read: the
+    caller claims their bins first and locks the rows with
+    ``lock_located`` at the end of the write.
+    """
+    product_ids = set(product_ids)
+    products = Product.objects.select_related('cost').select_for_update(of=('self',)).filter(id__in=product_ids)
+    if defer_located:
+        products = products.filter(stock_by_location=False)
+    products = {product.id: product for product in products.order_by('id')}
+    missing = product_ids - products.keys()
+    if defer_located and missing:
+        located = Product.objects.select_related('cost').filter(id__in=missing)
+        products.update((product.id, product) for product in located)
+    return products
+
+
+def located_deltas(deltas, products):
+    return {product_id: delta for product_id, delta in deltas.items() if products[product_id].stock_by_location}
+
+
+def lock_located(located, products):
+    """Lock the rows of location-tracked products late in the write and refresh them in ``products``."""
+    products.update(lock_products(located))
+
+
+def plan_transaction(transaction_type, details_data, products):
+    """
+    Validate the detail lines of one transaction against the locked products
+    and return the stock delta per product id. Nothing is written and the
+    in-memory products are left untouched, so a failed plan costs nothing.
+    """
+    if transaction_type not in ('IN', 'OUT'):
+        raise serializers.ValidationError(f"Invalid transaction type: {transaction_type}")
+
+    deltas = {}
+    for detail_data in details_data:
+        product_id = _product_id(detail_data['product'])
+        quantity = detail_data['quantity']
+
+        product = products.get(product_id)
+        if product is None:
+            raise serializers.ValidationError(f"Product with ID {product_id} does not exist.")
+        if quantity <= 0:
+            raise serializers.ValidationError("Quantity must be greater than zero for any transaction detail.")
+        if product_id in deltas:
+            raise serializers.ValidationError(f"Product with ID {product_id} appears more than once in this transaction.")
+
+        if transaction_type == 'OUT':
+            # Location-tracked stock is checked against the bins by LocationAllocator.
+            if not product.stock_by_location and product.current_stock < quantity:
+                raise serializers.ValidationError(f"Insufficient stock for product '{product.name}'. "
+                                                  f"Available: {product.current_stock}, Requested: {quantity}.")
+            deltas[product_id] = -quantity
+        else:
+            deltas[product_id] = quantity
+    return deltas
+
+
+def advance_stock(transaction_instance, deltas, products):
+    """
+    Move the in-memory products to their post-transaction stock levels and
+    return the unsaved StockAlert rows for any threshold that was crossed.
+    """
+    alerts = []
+    for product_id, delta in deltas.items():
+        product = products[product_id]
+        product.current_stock += delta
+        if transaction_instance.type == 'IN' and product.current_stock > product.max_stock:
+            alerts.append(StockAlert(product=product, transaction=transaction_instance, kind=StockAlert.ABOVE_MAX,
+                                     stock=product.current_stock, threshold=product.max_stock))
+        elif transaction_instance.type == 'OUT' and product.current_stock < product.min_stock:
+            alerts.append(StockAlert(product=product, transaction=transaction_instance, kind=StockAlert.BELOW_MIN,
+                                     stock=product.current_stock, threshold=product.min_stock))
+    return alerts
+
+
+def apply_deltas(deltas, products):
+    """
+    Apply per-product stock deltas with one UPDATE that only touches
+    current_stock, stock_version and updated_at, and bump the version of the
+    locked in-memory ``products`` to match.
+    """
+    if not deltas:
+        return
+    Product.objects.filter(id__in=deltas).update(
+        current_stock=F('current_stock') + Case(
+            *[When(id=product_id, then=Value(delta)) for product_id, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        stock_version=F('stock_version') + 1,
+        updated_at=timezone.now(),
+    )
+    for product_id in deltas:
+        products[product_id].stock_version += 1
+
+
+def transaction_totals(details_data):
+    """The denormalized ``total_items`` and ``total_value`` of a transaction."""
+    return {
+        'total_items': sum(detail_data['quantity'] for detail_data in details_data),
+        'total_value': sum(
+            (detail_data['quantity'] * Decimal(detail_data.get('unit_price', 0)) for detail_data in details_data),
+            Decimal('0.00'),
+        ),
+    }
+
+
+def stock_levels(deltas, products):
+    """``(current_stock, stock_version)`` per moved product, as the next ``apply_deltas`` leaves them."""
+    return {
+        product_id: (products[product_id].current_stock, products[product_id].stock_version + 1)
+        for product_id in deltas
+    }
+
+
+def stock_written(events=()):
+    """Hooks that must run once the current stock write has committed."""
+    db_transaction.on_commit(invalidate_inventory_summary)
+    db_transaction.on_commit(bump_inventory_version)
+    if events:
+        product_ids = {product['id'] for event in events for product in event['products']}
+        db_transaction.on_commit(lambda: product_cache.invalidate(product_ids))
+        db_transaction.on_commit(lambda: publish_changes(events))
+
+
+def build_details(transaction_instance, details_data, products):
+    return [
+        StockDetail(
+            transaction=transaction_instance,
+            product=products[_product_id(detail_data['product'])],
+            quantity=detail_data['quantity'],
+            unit_price=detail_data.get('unit_price', Decimal('0.00')),
+        )
+        for detail_data in details_data
+    ]
+
+
+def cache_details(transaction_instance, details):
+    """Seed the ``details`` prefetch cache so serializing the new transaction costs no queries."""
+    queryset = transaction_instance.details.all()
+    queryset._result_cache = list(details)
+    queryset._prefetch_done = True
+    transaction_instance._prefetched_objects_cache = {'details': queryset}
+
+
+def create_stock_transaction(validated_data, details_data):
+    """
+    Record one stock transaction with a constant number of queries, however
+    many detail lines it has: lock, validate in memory, insert the header,
+    apply all deltas in one UPDATE and insert all details in one bulk_create.
+
+    Products tracked by location are not locked up front. Only the bins the
+    transaction draws from are claimed, and the product rows (total, cost
+    state) are locked just before commit, so writers on one hot SKU
+    serialize only on that short tail. Every writer locks in the same order:
+    products not tracked by location, bins, then location-tracked products.
+    """
+    transaction_type = validated_data.get('type')
+    with db_transaction.atomic():
+        products = lock_products((_product_id(detail_data['product']) for detail_data in details_data),
+                                 defer_located=True)
+        deltas = plan_transaction(transaction_type, details_data, products)
+        located = located_deltas(deltas, products)
+        if located:
+            allocator = LocationAllocator.claim(transaction_type, located)
+            allocator.allocate(transaction_type, located, products)
+
+        transaction_instance = StockTransaction.objects.create(**validated_data, **transaction_totals(details_data))
+        if located:
+            lock_located(located, products)
+            allocator.apply()
+        details = StockDetail.objects.bulk_create(build_details(transaction_instance, details_data, products))
+        alerts = advance_stock(transaction_instance, deltas, products)
+        levels = stock_levels(deltas, products)
+        apply_deltas(deltas, products)
+        record_movements([(transaction_instance, details)])
+        record_costs([(transaction_instance, details)], products)
+
+        StockAlert.objects.bulk_create(alerts)
+        cache_details(transaction_instance, details)
+        stock_written([change_event(transaction_instance, levels)])
+        return transaction_instance
+
+
+def lock_batch(product_ids):
+    """
+    Lock the rows of ``product_ids`` in the order single writers take them:
+    products not tracked by location, then every bin of the location-tracked
+    ones, then their product rows. Returns ``(products, allocator)``.
+    """
+    products = lock_products(product_ids, defer_located=True)
+    located = [product_id for product_id, product in products.items() if product.stock_by_location]
+    allocator = LocationAllocator.lock_all(located)
+    if located:
+        lock_located(located, products)
+    return products, allocator
+
+
+def create_stock_transactions(entries, products=None, allocator=None):
+    """
+    Record several transactions as one set: a single lock of the union of
+    their products, one header bulk_create, one stock UPDATE and one detail
+    bulk_create. ``entries`` is a list of ``(validated_data, details_data)``.
+
+    Returns ``(instance, None)`` or ``(None, errors)`` per entry, in order. A
+    failing entry is skipped and does not change the stock later entries see.
+    Pass ``products`` and ``allocator`` from ``lock_batch`` to reuse rows
+    already locked by the caller.
+    """
+    with db_transaction.atomic():
+        if products is None:
+            products, allocator = lock_batch(
+                _product_id(detail_data['product'])
+                for _, details_data in entries
+                for detail_data in details_data
+            )
+
+        outcomes, planned, alerts, total_deltas = [], [], [], {}
+        for validated_data, details_data in entries:
+            try:
+                deltas = plan_transaction(validated_data.get('type'), details_data, products)
+                located = located_deltas(deltas, products)
+                if located:
+                    allocator.allocate(validated_data.get('type'), located, products)
+            except serializers.ValidationError as exc:
+                outcomes.append((None, exc.detail))
+                continue
+            transaction_instance = StockTransaction(**validated_data, **transaction_totals(details_data))
+            alerts.extend(advance_stock(transaction_instance, deltas, products))
+            for product_id, delta in deltas.items():
+                total_deltas[product_id] = total_deltas.get(product_id, 0) + delta
+
+            planned.append((transaction_instance, details_data, stock_levels(deltas, products)))
+            outcomes.append((transaction_instance, None))
+
+        if not planned:
+            return outcomes
+
+        StockTransaction.objects.bulk_create([transaction_instance for transaction_instance, _, _ in planned])
+        allocator.apply()
+        apply_deltas(total_deltas, products)
+        per_transaction = [
+            build_details(transaction_instance, details_data, products)
+            for transaction_instance, details_data, _ in planned
+        ]
+        StockDetail.objects.bulk_create([detail for details in per_transaction for detail in details])
+        written = list(zip((transaction_instance for transaction_instance, _, _ in planned), per_transaction))
+        record_movements(written)
+        record_costs(written, products)
+        StockAlert.objects.bulk_create(alerts)
+        for (transaction_instance, _, _), details in zip(planned, per_transaction):
+            cache_details(transaction_instance, details)
+        stock_written([change_event(transaction_instance, levels) for transaction_instance, _, levels in planned])
+        return outcomes
+
+
+def ingest_transactions(entries, atomic=True, chunk_size=DEFAULT_BATCH_CHUNK_SIZE):
+    """
+    Record a batch of transactions in chunks of ``chunk_size``.
+
+    With ``atomic`` the union of all products is locked once, every chunk runs
+    inside one database transaction and any failing entry rolls the whole
+    batch back. Otherwise each chunk commits on its own and failing entries
+    are reported and skipped.
+    """
+    chunks = [entries[start:start + chunk_size] for start in range(0, len(entries), chunk_size)]
+    outcomes = []
+    if not atomic:
+        for chunk in chunks:
+            outcomes.extend(create_stock_transactions(chunk))
+        return outcomes, True
+
+    with db_transaction.atomic():
+        products, allocator = lock_batch(
+            _product_id(detail_data['product'])
+            for _, details_data in entries
+            for detail_data in details_data
+        )
+        for chunk in chunks:
+            outcomes.extend(create_stock_transactions(chunk, products, allocator))
+        committed = all(errors is None for _, errors in outcomes)
+        if not committed:
+            db_transaction.set_rollback(True)
+    return outcomes, committed
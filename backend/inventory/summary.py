@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Product, StockTransaction
+
+SUMMARY_CACHE_KEY = 'inventory:summary'
+MAX_RECENT_TRANSACTIONS = 50
+
+
+TOTALS = {
+    'total_products': Count('id'),
+    'total_stock': Coalesce(Sum('current_stock'), 0),
+    'low_stock': Count('id', filter=Q(current_stock__lte=F('min_stock'))),
+}
+
+
+def recent_transactions():
+    return StockTransaction.objects.order_by('-date', '-id').values(
+        'id', 'type', 'date', 'reference', 'total_items', 'total_value',
+    )[:MAX_RECENT_TRANSACTIONS]
+
+
+def compute_inventory_summary():
+    totals = Product.objects.aggregate(**TOTALS)
+    return {**totals, 'recent_transactions': list(recent_transactions())}
+
+
+async def acompute_inventory_summary():
+    totals = await Product.objects.aaggregate(**TOTALS)
+    return {**totals, 'recent_transactions': [row async for row in recent_transactions()]}
+
+
+def summary_timeout():
+    return getattr(settings, 'INVENTORY_SUMMARY_CACHE_TIMEOUT', 300)
+
+
+def get_inventory_summary(recent=10):
+    """
+    Dashboard figures computed with database aggregation and cached until the
+    next stock write or product change (see ``invalidate_inventory_summary``).
+    """
+    summary = cache.get(SUMMARY_CACHE_KEY)
+    if summary is None:
+        summary = compute_inventory_summary()
+        cache.set(SUMMARY_CACHE_KEY, summary, summary_timeout())
+    return {**summary, 'recent_transactions': summary['recent_transactions'][:recent]}
+
+
+async def aget_inventory_summary(recent=10):
+    summary = await cache.aget(SUMMARY_CACHE_KEY)
+    if summary is None:
+        summary = await acompute_inventory_summary()
+        await cache.aset(SUMMARY_CACHE_KEY, summary, summary_timeout())
+    return {**summary, 'recent_transactions': summary['recent_transactions'][:recent]}
+
+
+def invalidate_inventory_summary():
+    cache.delete(SUMMARY_CACHE_KEY)
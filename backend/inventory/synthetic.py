@@ -0,0 +1,211 @@
+import random
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+
+from .costing import CostTracker
+from .feed import change_event
+from .models import (
+    CostLayer, DailyProductMovement, OpeningBalance, Product, ProductCost, StockAlert, StockDetail, StockLocation,
+    StockSnapshot, StockTransaction,
+)
+from .product_cache import product_cache
+from .rollups import record_movements
+from .signals import products_changed
+from .stock import stock_written
+
+
+@dataclass
+class GenerationReport:
+    products: int = 0
+    transactions: int = 0
+    details: int = 0
+    elapsed: float = 0.0
+    phases: dict = field(default_factory=dict)
+
+    @property
+    def rows(self):
+        return self.products + self.transactions + self.details
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class SkuPicker:
+    """
+    Draws products with Zipf-like popularity: the product at rank ``r`` has
+    weight ``1 / r ** skew`` (``skew=0`` is uniform). Ranks are shuffled over
+    the products so the hot SKUs are not simply the lowest ids.
+    """
+
+    def __init__(self, count, skew, rng):
+        self.rng = rng
+        self.by_rank = list(range(count))
+        rng.shuffle(self.by_rank)
+        self.cum_weights = list(accumulate(1 / (rank ** skew) for rank in range(1, count + 1)))
+        self.total = self.cum_weights[-1]
+
+    def pick(self):
+        return self.by_rank[bisect_left(self.cum_weights, self.rng.random() * self.total)]
+
+    def sample(self, k):
+        """``k`` distinct products (fewer only if the popular ones keep repeating)."""
+        picked = {}
+        for _ in range(k * 4):
+            picked[self.pick()] = None
+            if len(picked) == k:
+                break
+        return list(picked)
+
+
+def clear_inventory(chunk_size=5000):
+    """Delete every product and ledger row, children first."""
+    with db_transaction.atomic():
+        for model in (CostLayer, ProductCost, DailyProductMovement, OpeningBalance, StockAlert, StockSnapshot,
+                      StockLocation, StockDetail):
+            # Nothing references these rows, so each is a single DELETE that loads nothing.
+            model.objects.all().delete()
+        for model in (StockTransaction, Product):
+            # Their dependents are gone, but delete() still loads the rows it removes: bound it by id chunks.
+            while ids := list(model.objects.order_by('id').values_list('id', flat=True)[:chunk_size]):
+                model.objects.filter(id__in=ids).delete()
+        products_changed()
+    product_cache.clear()
+
+
+def generate(products=1000, transactions=10000, min_lines=1, max_lines=5, out_ratio=0.4, skew=1.0,
+             days=365, end=None, seed=0, chunk_size=5000, progress=None):
+    """
+    Write a deterministic synthetic catalog and ledger: ``products`` SKUs,
+    then ``transactions`` transactions spread evenly over the ``days`` days
+    before ``end`` (default now), with ``min_lines``..``max_lines`` distinct
+    products each, a share ``out_ratio`` of them OUT, and products drawn
+    with ``SkuPicker``.
+
+    Stock is tracked in memory while generating, so an OUT never takes more
+    than is on hand (lines with nothing to take are dropped) and the final
+    ``current_stock`` and cost state of every product are written in one
+    pass at the end.
+    Everything is inserted with chunked ``bulk_create``; each chunk commits
+    on its own. ``progress`` is called with the report after every chunk.
+    """
+    rng = random.Random(seed)
+    report = GenerationReport()
+    started = time.perf_counter()
+
+    # Only ids are kept, so a catalog of millions does not hold model instances.
+    product_ids = []
+    for start in range(0, products, chunk_size):
+        product_ids.extend(product.id for product in Product.objects.bulk_create([
+            Product(
+                name=f"Synthetic product {seed}-{index}",
+                sku=f"SYN-{seed}-{index:07d}",
+                min_stock=rng.randint(0, 20),
+                max_stock=rng.choice((100, 500, 1000, 5000)),
+            )
+            for index in range(start, min(start + chunk_size, products))
+        ], batch_size=chunk_size))
+    report.products = len(product_ids)
+    report.phases['products'] = time.perf_counter() - started
+    if not product_ids or transactions <= 0:
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    picker = SkuPicker(len(product_ids), skew, rng)
+    costs = CostTracker()
+    stock = [0] * len(product_ids)
+    prices = [Decimal(rng.randint(100, 50000)) / 100 for _ in product_ids]
+    first_date = (end or timezone.now()) - timedelta(days=days)
+    step = timedelta(days=days) / transactions
+
+    ledger_started = time.perf_counter()
+    transaction_table = connection.ops.quote_name(StockTransaction._meta.db_table)
+    for start in range(0, transactions, chunk_size):
+        headers, dates, lines = [], [], []
+        for number in range(start, min(start + chunk_size, transactions)):
+            transaction_type = 'OUT' if rng.random() < out_ratio else 'IN'
+            chosen = picker.sample(rng.randint(min_lines, max_lines))
+            transaction_lines = []
+            for index in chosen:
+                if transaction_type == 'IN':
+                    quantity = rng.randint(1, 100)
+                    stock[index] += quantity
+                else:
+                    if stock[index] <= 0:
+                        continue
+                    quantity = rng.randint(1, min(stock[index], 20))
+                    stock[index] -= quantity
+                transaction_lines.append((index, quantity, prices[index]))
+            if not transaction_lines:
+                continue
+            dates.append(first_date + step * number + timedelta(seconds=rng.random()))
+            headers.append(StockTransaction(
+                type=transaction_type,
+                reference=f"{'PO' if transaction_type == 'IN' else 'SO'}-{seed}-{number}",
+                total_items=sum(quantity for _, quantity, _ in transaction_lines),
+                total_value=sum(quantity * price for _, quantity, price in transaction_lines),
+            ))
+            lines.append(transaction_lines)
+
+        with db_transaction.atomic():
+            StockTransaction.objects.bulk_create(headers, batch_size=chunk_size)
+            # auto_now_add stamped the inserts with now(); backdate them in the same transaction with
+            # keyed UPDATEs, like the stock phase (bulk_update's CASE grows with the square of the chunk).
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {transaction_table} SET date = %s WHERE id = %s",
+                    [(connection.ops.adapt_datetimefield_value(date), header.id)
+                     for header, date in zip(headers, dates)],
+                )
+            for header, date in zip(headers, dates):
+                header.date = date
+            per_header = [
+                [StockDetail(transaction_id=header.id, product_id=product_ids[index],
+                             quantity=quantity, unit_price=price)
+                 for index, quantity, price in transaction_lines]
+                for header, transaction_lines in zip(headers, lines)
+            ]
+            details = StockDetail.objects.bulk_create(
+                [detail for header_details in per_header for detail in header_details], batch_size=chunk_size,
+            )
+            record_movements(zip(headers, per_header))
+        for header, header_details in zip(headers, per_header):
+            costs.apply(header, header_details)
+        report.transactions += len(headers)
+        report.details += len(details)
+        report.elapsed = time.perf_counter() - started
+        if progress is not None:
+            progress(report)
+    report.phases['ledger'] = time.perf_counter() - ledger_started
+
+    stock_started = time.perf_counter()
+    # One keyed UPDATE per product with a stock level: a CASE over thousands of
+    # ids per statement is far slower on large catalogs. The version bump and
+    # the change event keep cached products and feed clients in step.
+    table = connection.ops.quote_name(Product._meta.db_table)
+    stocked = [(product_id, quantity) for product_id, quantity in zip(product_ids, stock) if quantity]
+    with db_transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {table} SET current_stock = %s, stock_version = stock_version + 1 WHERE id = %s",
+                [(quantity, product_id) for product_id, quantity in stocked],
+            )
+        costs.save(batch_size=chunk_size)
+        if stocked:
+            versions = dict(Product.objects.filter(id__gte=min(product_ids), id__lte=max(product_ids))
+                            .values_list('id', 'stock_version'))
+            stock_written([change_event(None, {
+                product_id: (quantity, versions[product_id]) for product_id, quantity in stocked
+            })])
+        else:
+            products_changed()
+    report.phases['stock'] = time.perf_counter() - stock_started
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -1,3 +1,1292 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Count
+from django.contrib.auth.models import User
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer, Serializer
+from rest_framework.test import APITestCase
+
+from .alerts import WebhookSink, claim_alerts, process_alerts
+from .archive import archive_horizon, archive_ledger, partition_files, read_partition
+from .checks import check_shared_caches
+from .export import LEDGER_COLUMNS
+from .feed import BroadcastHub, event_stream
+from .group_commit import get_group_writer
+from .instrumentation import RequestMetrics, _current, traces
+from .product_cache import product_cache
+from .costing import rebuild_costs
+from .locations import split_stock
+from .rollups import rebuild_movements
+from .models import (
+    CostLayer, DailyProductMovement, OpeningBalance, Product, ProductCost, StockAlert, StockDetail, StockLocation,
+    StockSnapshot, StockTransaction,
+)
+from .serializers import ProductSerializer, TransactionSerializer
+from .summary import invalidate_inventory_summary
+from .synthetic import clear_inventory, generate
+
+
+def make_products(count, stock=0, **extra):
+    products = Product.objects.bulk_create([
+        Product(name=f"Product {i}", sku=f"SKU-{i:05d}", current_stock=stock, **extra)
+        for i in range(count)
+    ])
+    # bulk_create sends no signals, and rolled-back test data can hand out the same ids again.
+    product_cache.invalidate([product.id for product in products], [product.sku for product in products])
+    return products
+
+
+class TransactionWritePathTests(TestCase):
+    def _save(self, payload):
+        serializer = TransactionSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as ctx:
+            instance = serializer.save()
+        return instance, len(ctx.captured_queries)
+
+    def _payload(self, type, products, quantity=5):
+        return {
+            'type': type,
+            'reference': 'PO-1',
+            'details': [{'product_id': p.id, 'quantity': quantity, 'unit_price': '2.50'} for p in products],
+        }
+
+    def test_query_count_is_constant_in_line_count(self):
+        products = make_products(60)
+        _, one_line = self._save(self._payload('IN', products[:1]))
+        _, many_lines = self._save(self._payload('IN', products[1:]))
+        self.assertEqual(one_line, many_lines)
+        self.assertLessEqual(many_lines, 8)
+
+    def test_in_and_out_update_stock(self):
+        products = make_products(3, stock=10)
+        self._save(self._payload('IN', products, quantity=5))
+        instance, _ = self._save(self._payload('OUT', products, quantity=12))
+        self.assertEqual(
+            list(Product.objects.order_by('id').values_list('current_stock', flat=True)), [3, 3, 3]
+        )
+        self.assertEqual(instance.details.count(), 3)
+
+    def test_insufficient_stock_rolls_back_everything(self):
+        products = make_products(2, stock=10)
+        payload = self._payload('OUT', products, quantity=5)
+        payload['details'][1]['quantity'] = 11
+        serializer = TransactionSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaisesMessage(Exception, "Insufficient stock"):
+            serializer.save()
+        self.assertEqual(StockTransaction.objects.count(), 0)
+        self.assertEqual(StockDetail.objects.count(), 0)
+        self.assertEqual(Product.objects.get(id=products[0].id).current_stock, 10)
+
+
+class TransactionAPITests(APITestCase):
+    def test_create_returns_post_write_stock(self):
+        product = make_products(1, stock=4)[0]
+        response = self.client.post(reverse('transaction-list-create'), {
+            'type': 'OUT',
+            'details': [{'product_id': product.id, 'quantity': 3}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_items'], 3)
+        self.assertEqual(response.data['details'][0]['product']['current_stock'], 1)
+
+    def test_non_positive_quantity_is_rejected(self):
+        product = make_products(1, stock=4)[0]
+        response = self.client.post(reverse('transaction-list-create'), {
+            'type': 'IN',
+            'details': [{'product_id': product.id, 'quantity': 0}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TransactionBatchAPITests(APITestCase):
+    url = reverse('transaction-batch-create')
+
+    def setUp(self):
+        self.products = make_products(3, stock=10)
+
+    def _items(self, *quantities, type='OUT'):
+        return [
+            {'type': type, 'reference': f'SO-{i}', 'details': [{'product_id': self.products[0].id, 'quantity': q}]}
+            for i, q in enumerate(quantities)
+        ]
+
+    def test_atomic_batch_creates_everything(self):
+        response = self.client.post(self.url, self._items(3, 4), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Product.objects.get(id=self.products[0].id).current_stock, 3)
+        self.assertEqual(StockDetail.objects.count(), 2)
+
+    def test_atomic_batch_rolls_back_on_any_failure(self):
+        response = self.client.post(self.url, self._items(3, 8, 1), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r['status'] for r in response.data['results']], ['rolled_back', 'error', 'rolled_back'])
+        self.assertEqual(StockTransaction.objects.count(), 0)
+        self.assertEqual(Product.objects.get(id=self.products[0].id).current_stock, 10)
+
+    def test_best_effort_keeps_going_across_chunks(self):
+        response = self.client.post(f'{self.url}?mode=best_effort&chunk_size=2', self._items(3, 8, 1), format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'error', 'created'])
+        self.assertEqual(Product.objects.get(id=self.products[0].id).current_stock, 6)
+
+    def test_ndjson_body_and_unknown_product(self):
+        body = '{"type": "IN", "details": [{"product_id": %d, "quantity": 5}]}\n\n' \
+               '{"type": "IN", "details": [{"product_id": 999999, "quantity": 5}]}\n' % self.products[1].id
+        response = self.client.post(f'{self.url}?mode=best_effort', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 207)
+        self.assertIn('does not exist', str(response.data['results'][1]['errors']))
+        self.assertEqual(Product.objects.get(id=self.products[1].id).current_stock, 15)
+
+    def test_query_count_is_constant_in_batch_size(self):
+        def post(count):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(self.url, self._items(*[1] * count, type='IN'), format='json')
+            self.assertEqual(response.status_code, 201)
+            return len(ctx.captured_queries)
+        self.assertEqual(post(2), post(40))
+
+
+class TransactionLedgerPaginationTests(APITestCase):
+    url = reverse('transaction-list-create')
+
+    def setUp(self):
+        product = make_products(1)[0]
+        now = timezone.now()
+        for i in range(7):
+            transaction = StockTransaction.objects.create(type='IN' if i % 2 else 'OUT', reference=f'REF-{i % 3}')
+            # Pairs share a timestamp so the id tiebreaker is exercised.
+            StockTransaction.objects.filter(id=transaction.id).update(date=now - timedelta(days=i // 2))
+            StockDetail.objects.create(transaction=transaction, product=product, quantity=1)
+
+    def _walk(self, query=''):
+        ids, url = [], f'{self.url}?page_size=2{query}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_cursor_walk_matches_full_ordering(self):
+        expected = list(StockTransaction.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(self._walk(), expected)
+
+    def test_filters(self):
+        expected = list(StockTransaction.objects.filter(type='IN', reference='REF-1')
+                        .order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(self._walk('&type=IN&reference=REF-1'), expected)
+
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertEqual(len(self._walk(f'&since={since}')), 4)
+
+    def test_deep_page_query_count_matches_first_page(self):
+        first = self.client.get(f'{self.url}?page_size=2')
+        with CaptureQueriesContext(connection) as first_ctx:
+            self.client.get(f'{self.url}?page_size=2')
+        with CaptureQueriesContext(connection) as deep_ctx:
+            self.client.get(first.data['next'])
+        self.assertEqual(len(first_ctx.captured_queries), len(deep_ctx.captured_queries))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(f'{self.url}?cursor=garbage').status_code, 404)
+        self.assertEqual(self.client.get(f'{self.url}?since=yesterday').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}?type=MOVE').status_code, 400)
+
+
+class InventorySummaryTests(APITestCase):
+    url = reverse('inventory-summary')
+
+    def setUp(self):
+        cache.clear()
+        self.products = make_products(3, stock=5, min_stock=5)
+
+    def test_aggregates_and_recent_transactions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('transaction-list-create'), {
+                'type': 'IN', 'reference': 'PO-9',
+                'details': [{'product_id': p.id, 'quantity': 2} for p in self.products[:2]],
+            }, format='json')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_products'], 3)
+        self.assertEqual(response.data['total_stock'], 19)
+        self.assertEqual(response.data['low_stock'], 1)
+        self.assertEqual(response.data['recent_transactions'][0]['total_items'], 4)
+
+    def test_cached_until_stock_write(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('transaction-list-create'), {
+                'type': 'OUT', 'details': [{'product_id': self.products[0].id, 'quantity': 5}],
+            }, format='json')
+        self.assertEqual(self.client.get(self.url).data['total_stock'], 10)
+
+    def test_product_change_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='New', sku='NEW-1', current_stock=0)
+        self.assertEqual(self.client.get(self.url).data['total_products'], 4)
+
+
+class TransactionTotalsTests(APITestCase):
+    url = reverse('transaction-list-create')
+
+    def setUp(self):
+        self.products = make_products(2, stock=10)
+        self.client.post(self.url, {
+            'type': 'IN',
+            'details': [{'product_id': self.products[0].id, 'quantity': 3, 'unit_price': '1.50'},
+                        {'product_id': self.products[1].id, 'quantity': 2, 'unit_price': '4.00'}],
+        }, format='json')
+
+    def test_totals_are_stored_at_write_time(self):
+        transaction = StockTransaction.objects.get()
+        self.assertEqual(transaction.total_items, 5)
+        self.assertEqual(str(transaction.total_value), '12.50')
+
+    def test_summary_view_skips_details(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'{self.url}?view=summary')
+        item = response.data['results'][0]
+        self.assertNotIn('details', item)
+        self.assertEqual((item['total_items'], item['total_value']), (5, '12.50'))
+
+
+class LedgerExportTests(APITestCase):
+    url = reverse('ledger-export')
+
+    def setUp(self):
+        self.products = make_products(2)
+        for quantity in (1, 2, 3):
+            self.client.post(reverse('transaction-list-create'), {
+                'type': 'IN', 'reference': f'PO-{quantity}',
+                'details': [{'product_id': p.id, 'quantity': quantity, 'unit_price': '2.00'} for p in self.products],
+            }, format='json')
+
+    def test_csv_stream(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(LEDGER_COLUMNS))
+        self.assertEqual(len(lines), 7)
+
+    def test_ndjson_incremental(self):
+        after_id = StockDetail.objects.order_by('id').values_list('id', flat=True)[3]
+        response = self.client.get(f'{self.url}?output=ndjson&after_id={after_id}')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['reference'] for row in rows], ['PO-3', 'PO-3'])
+        self.assertEqual(rows[0]['unit_price'], '2.00')
+
+    async def test_asgi_stream_is_read_chunk_by_chunk(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            response = await self.async_client.get(self.url)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertTrue(response.is_async)
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(LEDGER_COLUMNS))
+        self.assertEqual(len(lines), 7)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('export_ledger', '--format', 'ndjson', '--since', '2000-01-01', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 6)
+
+
+class CatalogImportTests(APITestCase):
+    url = reverse('product-import')
+
+    def setUp(self):
+        Product.objects.create(name='Existing', sku='SKU-A', description='keep me', min_stock=1, max_stock=10)
+
+    def test_csv_upsert_counts(self):
+        body = ('sku,name,description,min_stock,max_stock\n'
+                'SKU-A,Existing renamed,,2,20\n'
+                'SKU-B,Brand new,fresh,0,5\n'
+                'SKU-B,Duplicate,,0,5\n'
+                'SKU-C,,,0,5\n')
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['inserted'], response.data['updated'], response.data['rejected']), (1, 1, 2))
+        existing = Product.objects.get(sku='SKU-A')
+        self.assertEqual((existing.name, existing.description, existing.max_stock), ('Existing renamed', 'keep me', 20))
+        self.assertTrue(Product.objects.filter(sku='SKU-B', name='Brand new').exists())
+
+    def test_json_array_dry_run_writes_nothing(self):
+        body = json.dumps([{'sku': f'NEW-{i}', 'name': f'New {i}'} for i in range(5)] + [{'sku': 'X', 'name': 'Existing'}])
+        response = self.client.post(f'{self.url}?dry_run=1', body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['inserted'], response.data['rejected']), (5, 1))
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_parse_error_reports_rows_already_imported(self):
+        body = ''.join(json.dumps({'sku': f'OK-{i}', 'name': f'Ok {i}'}) + '\n' for i in range(5)) + '{"sku": oops}\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['inserted'], response.data['parse_error']['after_line']), (5, 5))
+        self.assertIn('after line 5', response.data['detail'])
+        self.assertEqual(Product.objects.filter(sku__startswith='OK-').count(), 5)
+
+    def test_csv_error_is_a_bad_request(self):
+        body = 'sku,name\nSKU-Z,"' + 'x' * 200_000 + '"\n'
+        response = self.client.post(self.url, body, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('field larger than field limit', response.data['detail'])
+
+    def test_management_command_streams_ndjson_in_chunks(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'catalog.ndjson')
+        with open(path, 'w') as stream:
+            for i in range(25):
+                stream.write(json.dumps({'sku': f'BULK-{i}', 'name': f'Bulk {i}', 'max_stock': 50}) + '\n')
+        out = StringIO()
+        call_command('import_catalog', path, '--chunk-size', '10', stdout=out)
+        self.assertIn('inserted 25, updated 0, rejected 0', out.getvalue())
+        self.assertEqual(Product.objects.filter(sku__startswith='BULK-', max_stock=50).count(), 25)
+
+
+class StockAsOfTests(APITestCase):
+    url = reverse('inventory-as-of')
+
+    def setUp(self):
+        self.product = make_products(1)[0]
+        self.day = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=10)
+        for days, type, quantity in ((0, 'IN', 50), (1, 'OUT', 5), (2, 'OUT', 10), (4, 'IN', 7)):
+            transaction = StockTransaction.objects.create(type=type)
+            StockTransaction.objects.filter(id=transaction.id).update(date=self.day + timedelta(days=days))
+            StockDetail.objects.create(transaction=transaction, product=self.product, quantity=quantity)
+
+    def _stock(self, moment):
+        response = self.client.get(self.url, {'date': moment.isoformat(), 'product': self.product.id})
+        self.assertEqual(response.status_code, 200)
+        return response.data['snapshot_at'], response.data['results'][0]['stock']
+
+    def test_without_snapshots_replays_ledger(self):
+        self.assertEqual(self._stock(self.day + timedelta(days=1, hours=1)), (None, 45))
+
+    def test_starts_from_nearest_earlier_snapshot(self):
+        snapshot_at = self.day + timedelta(days=1, hours=6)
+        call_command('snapshot_stock', '--at', snapshot_at.isoformat(), stdout=StringIO())
+        self.assertEqual(StockSnapshot.objects.get(product=self.product).quantity, 45)
+
+        self.assertEqual(self._stock(self.day + timedelta(days=3)), (snapshot_at, 35))
+        self.assertEqual(self._stock(self.day + timedelta(days=5)), (snapshot_at, 42))
+        self.assertEqual(self._stock(self.day + timedelta(hours=1)), (None, 50))
+
+    def test_date_only_means_end_of_day(self):
+        response = self.client.get(self.url, {'date': (self.day + timedelta(days=2)).date().isoformat()})
+        self.assertEqual(response.data['results'][0]['stock'], 35)
+        self.assertEqual(self.client.get(self.url, {'date': 'soon'}).status_code, 400)
+
+
+class ReconcileStockTests(TestCase):
+    def setUp(self):
+        self.products = make_products(4)
+        serializer = TransactionSerializer(data={
+            'type': 'IN', 'details': [{'product_id': p.id, 'quantity': 10} for p in self.products],
+        })
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('reconcile_stock', '--chunk-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reports_and_repairs_drift(self):
+        Product.objects.filter(id=self.products[1].id).update(current_stock=13)
+        output = self._run()
+        self.assertIn('stored 13, ledger 10, drift +3', output)
+        self.assertEqual(Product.objects.get(id=self.products[1].id).current_stock, 13)
+
+        self.assertIn('1 drifted, 1 repaired', self._run('--repair'))
+        self.assertEqual(Product.objects.get(id=self.products[1].id).current_stock, 10)
+        self.assertIn('0 drifted', self._run())
+
+    def test_incremental_only_checks_touched_products(self):
+        self._run()
+        # Raw drift on an untouched product is not seen by an incremental run...
+        Product.objects.filter(id=self.products[0].id).update(current_stock=1)
+        StockDetail.objects.create(
+            transaction=StockTransaction.objects.create(type='IN'), product=self.products[2], quantity=5,
+        )
+        output = self._run('--incremental')
+        self.assertIn('incremental run checked 1 products, 1 drifted', output)
+        self.assertIn(self.products[2].sku, output)
+        # ...but a full run still finds it.
+        self.assertIn('2 drifted', self._run())
+
+
+class RecordingSink:
+    def __init__(self):
+        self.batches = []
+
+    def send(self, payloads):
+        self.batches.append(payloads)
+
+
+class FailingSink:
+    def send(self, payloads):
+        raise OSError("webhook down")
+
+
+class StockAlertOutboxTests(TestCase):
+    def setUp(self):
+        self.product = make_products(1, stock=20, min_stock=10, max_stock=25)[0]
+
+    def _record(self, type, quantity):
+        serializer = TransactionSerializer(data={'type': type, 'details': [{'product_id': self.product.id, 'quantity': quantity}]})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_crossings_are_written_with_the_transaction(self):
+        self._record('OUT', 5)
+        self.assertFalse(StockAlert.objects.exists())
+        transaction = self._record('OUT', 8)
+        alert = StockAlert.objects.get()
+        self.assertEqual((alert.kind, alert.stock, alert.threshold, alert.transaction_id),
+                         (StockAlert.BELOW_MIN, 7, 10, transaction.id))
+
+    def test_worker_dedupes_and_delivers(self):
+        self._record('OUT', 12)
+        self._record('OUT', 1)
+        self._record('IN', 20)
+        sink = RecordingSink()
+        self.assertEqual(process_alerts(sinks=[sink]), 3)
+        self.assertEqual(sorted((p['kind'], p['stock'], p['repeats']) for p in sink.batches[0]),
+                         [('ABOVE_MAX', 27, 0), ('BELOW_MIN', 7, 1)])
+        self.assertEqual(StockAlert.objects.filter(status=StockAlert.SUPPRESSED).count(), 1)
+
+        # A repeat crossing inside the dedupe window is suppressed, not re-sent.
+        self._record('IN', 1)
+        self.assertEqual(process_alerts(sinks=[sink]), 1)
+        self.assertEqual(len(sink.batches), 1)
+
+    def test_failing_sink_keeps_alerts_pending(self):
+        self._record('OUT', 12)
+        with self.assertLogs('inventory.alerts', 'ERROR'):
+            process_alerts(sinks=[FailingSink()])
+        alert = StockAlert.objects.get()
+        self.assertEqual((alert.status, alert.attempts), (StockAlert.PENDING, 1))
+
+    def test_sinks_run_outside_the_claim_transaction(self):
+        self._record('OUT', 12)
+        depth = len(connection.atomic_blocks)
+        seen = []
+
+        class InspectingSink:
+            def send(self, payloads):
+                seen.append((len(connection.atomic_blocks), StockAlert.objects.get().claimed_until is not None))
+
+        self.assertEqual(process_alerts(sinks=[InspectingSink()]), 1)
+        self.assertEqual(seen, [(depth, True)])
+        alert = StockAlert.objects.get()
+        self.assertEqual((alert.status, alert.claimed_until), (StockAlert.SENT, None))
+
+    def test_claimed_batch_is_retried_once_the_claim_expires(self):
+        self._record('OUT', 12)
+        claim_alerts(500)
+        sink = RecordingSink()
+        self.assertEqual(process_alerts(sinks=[sink]), 0)
+        later = timezone.now() + timedelta(seconds=61)
+        with mock.patch('inventory.alerts.timezone.now', return_value=later):
+            self.assertEqual(process_alerts(sinks=[sink]), 1)
+        self.assertEqual(StockAlert.objects.get().attempts, 2)
+
+    def test_webhook_sink_posts_json(self):
+        with mock.patch('inventory.alerts.urllib_request.urlopen') as urlopen:
+            WebhookSink(url='http://localhost:9/alerts').send([{'id': 1}])
+        sent = urlopen.call_args[0][0]
+        self.assertEqual(json.loads(sent.data), {'alerts': [{'id': 1}]})
+
+
+class InventoryFeedTests(TestCase):
+    def test_feed_needs_asgi_and_dashboard_only_subscribes_there(self):
+        self.assertEqual(self.client.get(reverse('inventory-feed')).status_code, 501)
+        self.assertIn(b'const LIVE_FEED = false', self.client.get(reverse('dashboard')).content)
+
+        async def dashboard():
+            return await self.async_client.get(reverse('dashboard'))
+
+        self.assertIn(b'const LIVE_FEED = true', asyncio.run(dashboard()).content)
+
+    def test_stream_sends_snapshot_then_deltas_published_from_other_threads(self):
+        feed_hub = BroadcastHub()
+
+        async def load_snapshot():
+            return [{'id': 1, 'current_stock': 5}]
+
+        async def consume():
+            stream = event_stream(load_snapshot, feed_hub, heartbeat=0.05)
+            frames = [await anext(stream)]
+            publisher = threading.Thread(target=feed_hub.deliver, args=(
+                {'type': 'delta', 'transaction_id': 7, 'products': [{'id': 1, 'current_stock': 3, 'version': 2}]},
+            ))
+            publisher.start()
+            frames.append(await anext(stream))
+            frames.append(await anext(stream))
+            await stream.aclose()
+            publisher.join()
+            return frames
+
+        snapshot, delta, heartbeat = asyncio.run(consume())
+        self.assertTrue(snapshot.startswith('event: snapshot\nid: 0\n'))
+        self.assertIn('event: delta\nid: 1\n', delta)
+        self.assertEqual(json.loads(delta.split('data: ')[1])['products'], [{'id': 1, 'current_stock': 3, 'version': 2}])
+        self.assertEqual(heartbeat, ': keep-alive\n\n')
+        self.assertEqual(feed_hub._subscribers, set())
+
+    def test_committed_writes_are_published(self):
+        product = make_products(1, stock=10)[0]
+        serializer = TransactionSerializer(data={'type': 'OUT', 'details': [{'product_id': product.id, 'quantity': 4}]})
+        serializer.is_valid(raise_exception=True)
+        with mock.patch('inventory.stock.publish_changes') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                instance = serializer.save()
+        publish.assert_called_once_with([
+            {'type': 'delta', 'transaction_id': instance.id,
+             'products': [{'id': product.id, 'current_stock': 6, 'version': 1}]},
+        ])
+
+    def test_hub_drops_levels_older_than_last_delivered(self):
+        feed_hub = BroadcastHub()
+        # Commits of versions 2 and 3 of product 1 published in the wrong order.
+        feed_hub.deliver({'type': 'delta', 'transaction_id': 9, 'products': [
+            {'id': 1, 'current_stock': 4, 'version': 3}, {'id': 2, 'current_stock': 8, 'version': 1},
+        ]})
+        feed_hub.deliver({'type': 'delta', 'transaction_id': 8, 'products': [{'id': 1, 'current_stock': 6, 'version': 2}]})
+        feed_hub.deliver({'type': 'delta', 'transaction_id': 10, 'products': [
+            {'id': 1, 'current_stock': 7, 'version': 2}, {'id': 2, 'current_stock': 9, 'version': 2},
+        ]})
+        self.assertEqual(feed_hub.sequence, 2)
+        self.assertEqual(feed_hub.versions, {1: 3, 2: 2})
+
+
+@override_settings(INVENTORY_PRODUCT_CACHE='products', INVENTORY_CONDITIONAL_GET=True)
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = make_products(1, stock=10)[0]
+
+    def test_list_endpoints_answer_304_without_querying(self):
+        for name in ('current-inventory', 'product-list-create'):
+            url = reverse(name)
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_stock_write_and_product_edit_change_the_etag(self):
+        url = reverse('current-inventory')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('transaction-list-create'), {
+                'type': 'IN', 'details': [{'product_id': self.product.id, 'quantity': 1}],
+            }, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('product-detail', args=[self.product.id]), {'min_stock': 3}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_product_detail_uses_updated_at(self):
+        url = reverse('product-detail', args=[self.product.id])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(id=self.product.id).save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+@override_settings(INVENTORY_PRODUCT_CACHE='products', INVENTORY_CONDITIONAL_GET=True)
+class ProductCacheTests(APITestCase):
+    def setUp(self):
+        self.products = make_products(3, stock=10)
+
+    def _post(self):
+        return self.client.post(reverse('transaction-list-create'), {
+            'type': 'IN', 'details': [{'product_id': p.id, 'quantity': 1} for p in self.products],
+        }, format='json')
+
+    def test_validation_uses_cache_and_reports_unknown_ids(self):
+        with CaptureQueriesContext(connection) as cold:
+            self._post()
+        before = product_cache.stats()['hits']
+        with CaptureQueriesContext(connection) as warm:
+            self._post()
+        # The only difference is the read-through load on the cold cache.
+        self.assertEqual(len(cold.captured_queries) - len(warm.captured_queries), 1)
+        self.assertEqual(product_cache.stats()['hits'] - before, 3)
+
+        response = self.client.post(reverse('transaction-list-create'), {
+            'type': 'IN', 'details': [{'product_id': self.products[0].id, 'quantity': 1},
+                                      {'product_id': 424242, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['details'],
+                         [{}, {'product_id': ['Invalid pk "424242" - object does not exist.']}])
+
+    def test_process_local_cache_is_flagged(self):
+        self.assertEqual([warning.id for warning in check_shared_caches(None)], ['inventory.W001', 'inventory.W002'])
+        with override_settings(INVENTORY_PRODUCT_CACHE=None, INVENTORY_CONDITIONAL_GET=False):
+            [summary] = check_shared_caches(None)
+            self.assertEqual(summary.id, 'inventory.W002')
+            self.assertIn('inventory summary', summary.msg)
+            with override_settings(INVENTORY_SUMMARY_CACHE_TIMEOUT=0):
+                self.assertEqual(check_shared_caches(None), [])
+
+    def test_detail_reads_from_cache_and_is_invalidated_by_writes(self):
+        url = reverse('product-detail', args=[self.products[0].id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data['current_stock'], 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post()
+        self.assertEqual(self.client.get(url).data['current_stock'], 11)
+        self.assertEqual(product_cache.get_by_sku(self.products[0].sku)['id'], self.products[0].id)
+
+
+@override_settings(INVENTORY_PRODUCT_CACHE='products', INVENTORY_CONDITIONAL_GET=True)
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = make_products(3, stock=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('transaction-list-create'), {
+                'type': 'IN', 'details': [{'product_id': p.id, 'quantity': 2, 'unit_price': '1.25'} for p in self.products],
+            }, format='json')
+        self.transaction_id = response.data['id']
+
+    async def _both(self, sync_name, async_name, *args):
+        sync_response = await sync_to_async(self.client.get)(reverse(sync_name, args=args))
+        async_response = await self.async_client.get(reverse(async_name, args=args))
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+        return async_response
+
+    async def test_async_views_match_sync_payloads(self):
+        await self._both('current-inventory', 'async-current-inventory')
+        await self._both('product-detail', 'async-product-detail', self.products[0].id)
+        await self._both('transaction-detail', 'async-transaction-detail', self.transaction_id)
+        await self._both('inventory-summary', 'async-inventory-summary')
+
+    async def test_async_inventory_honours_etag_and_404s(self):
+        response = await self.async_client.get(reverse('async-current-inventory'))
+        not_modified = await self.async_client.get(reverse('async-current-inventory'),
+                                                   headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        missing = await self.async_client.get(reverse('async-transaction-detail', args=[999999]))
+        self.assertEqual(missing.status_code, 404)
+
+
+class StockContentionTests(TransactionTestCase):
+    """
+    Parallel OUT transactions against one SKU on the configured database
+    profile (run with INVENTORY_DB_ENGINE=postgresql to check a local server).
+    """
+    WORKERS = 8
+    ATTEMPTS = 240
+    STOCK = 150
+    # Committed OUT transactions per second the profile must sustain under contention.
+    MIN_WRITES_PER_SECOND = 50
+
+    def _take_one(self, product_id):
+        serializer = TransactionSerializer(data={
+            'type': 'OUT', 'details': [{'product_id': product_id, 'quantity': 1, 'unit_price': '1.00'}],
+        })
+        try:
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connections.close_all()
+
+    def test_parallel_outs_never_oversell(self):
+        product = make_products(1, stock=self.STOCK)[0]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(self._take_one, [product.id] * self.ATTEMPTS))
+        elapsed = time.perf_counter() - started
+
+        product.refresh_from_db()
+        self.assertEqual(sum(results), self.STOCK)
+        self.assertEqual(product.current_stock, 0)
+        self.assertEqual(StockTransaction.objects.filter(type='OUT').count(), self.STOCK)
+        self.assertGreaterEqual(self.STOCK / elapsed, self.MIN_WRITES_PER_SECOND)
+
+    def test_parallel_outs_across_bins_never_oversell(self):
+        product = make_products(1, stock=self.STOCK)[0]
+        split_stock(product, 4)
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(self._take_one, [product.id] * self.ATTEMPTS))
+
+        product.refresh_from_db()
+        self.assertEqual(sum(results), self.STOCK)
+        self.assertEqual(product.current_stock, 0)
+        self.assertEqual(StockLocation.objects.filter(product=product, quantity=0).count(), 4)
+
+
+@override_settings(INVENTORY_INSTRUMENTATION=True)
+class RequestTimingMiddlewareTests(APITestCase):
+    def setUp(self):
+        traces.clear()
+        self.product = make_products(1, stock=5)[0]
+
+    def test_server_timing_reports_queries_and_serializer_time(self):
+        with self.assertLogs('inventory.requests', level='INFO') as logs:
+            response = self.client.get(reverse('transaction-list-create'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], reverse('transaction-list-create'))
+        self.assertGreaterEqual(record['queries'], 1)
+        self.assertIn('serialize_ms', record)
+
+    def test_only_inventory_serializers_are_timed(self):
+        self.client.get(reverse('current-inventory'))
+        self.assertEqual(BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            ProductSerializer([self.product], many=True).data
+            timed = metrics.serialize_time
+            Serializer({'name': 'x'}).data
+        finally:
+            _current.reset(token)
+        self.assertGreater(timed, 0)
+        self.assertEqual(metrics.serialize_time, timed)
+
+    @override_settings(INVENTORY_INSTRUMENTATION=False)
+    def test_disabled_adds_no_header(self):
+        response = self.client.get(reverse('current-inventory'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_repeated_statements_are_flagged(self):
+        metrics = RequestMetrics()
+        for _ in range(3):
+            metrics.add_query('SELECT * FROM inventory_product WHERE id = %s', 0.001)
+        metrics.add_query('SELECT 1', 0.001)
+        self.assertEqual(metrics.duplicates(3), {'SELECT * FROM inventory_product WHERE id = %s': 3})
+
+    @override_settings(INVENTORY_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_kept_for_staff(self):
+        staff = User.objects.create_user('ops', password='secret', is_staff=True)
+        with self.assertLogs('inventory.requests', level='WARNING'):
+            self.client.get(reverse('product-detail', args=[self.product.id]))
+            forbidden = self.client.get(reverse('request-traces'))
+            self.client.force_authenticate(staff)
+            response = self.client.get(reverse('request-traces'))
+        self.assertEqual(forbidden.status_code, 403)
+        self.assertEqual(response.status_code, 200)
+        paths = [trace['path'] for trace in response.data['traces']]
+        self.assertIn(reverse('product-detail', args=[self.product.id]), paths)
+        self.assertIn('query_log', response.data['traces'][-1])
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        Product.objects.bulk_create([
+            Product(name="Wireless Mouse", sku="ACC-MOUSE-WL"),
+            Product(name="Mouse Pad", sku="ACC-PAD-01"),
+            Product(name="Mechanical Keyboard", sku="ACC-KEY-MECH"),
+            Product(name="Monitor 27-inch", sku="DIS-MON-27"),
+        ])
+
+    def _search(self, q, **params):
+        response = self.client.get(reverse('product-search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['sku'] for row in response.data]
+
+    def test_prefix_matches_rank_before_substring_matches(self):
+        self.assertEqual(self._search('mouse'), ['ACC-PAD-01', 'ACC-MOUSE-WL'])
+        self.assertEqual(self._search('acc-m'), ['ACC-MOUSE-WL'])
+        self.assertEqual(self._search('MO'), ['DIS-MON-27', 'ACC-PAD-01'])
+
+    def test_substring_and_limit(self):
+        self.assertEqual(self._search('board'), ['ACC-KEY-MECH'])
+        self.assertEqual(len(self._search('acc', limit=2)), 2)
+        self.assertEqual(self._search(''), [])
+
+    def test_index_follows_renames_and_deletes(self):
+        product = Product.objects.get(sku="ACC-KEY-MECH")
+        product.name = "Ergonomic Keypad"
+        product.save()
+        self.assertEqual(self._search('board'), [])
+        self.assertEqual(self._search('keypad'), ['ACC-KEY-MECH'])
+        product.delete()
+        self.assertEqual(self._search('keypad'), [])
+
+
+class LeanTransactionListTests(APITestCase):
+    def setUp(self):
+        self.products = make_products(3, stock=50)
+        for quantity in (1, 2, 3):
+            self.client.post(reverse('transaction-list-create'), {
+                'type': 'IN', 'reference': f'PO-{quantity}',
+                'details': [{'product_id': p.id, 'quantity': quantity, 'unit_price': '2.50'} for p in self.products[:2]],
+            }, format='json')
+
+    def _list(self, **params):
+        response = self.client.get(reverse('transaction-list-create'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return json.loads(response.content)
+
+    def test_expand_product_matches_default_representation(self):
+        self.assertEqual(self._list(expand='product')['results'], self._list()['results'])
+
+    def test_sparse_fields_use_product_ids(self):
+        body = self._list(fields='id,reference,details')
+        first = body['results'][0]
+        self.assertEqual(set(first), {'id', 'reference', 'details'})
+        self.assertEqual(first['reference'], 'PO-3')
+        self.assertEqual(set(first['details'][0]), {'id', 'product_id', 'quantity', 'unit_price'})
+        self.assertNotIn('products', body)
+
+    def test_compact_side_loads_each_product_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            body = self._list(view='compact', page_size=2)
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(set(body['products']), {str(p.id) for p in self.products[:2]})
+        self.assertEqual(body['products'][str(self.products[0].id)]['sku'], self.products[0].sku)
+        self.assertEqual(len(body['results']), 2)
+        following = json.loads(self.client.get(body['next']).content)
+        self.assertEqual([row['reference'] for row in following['results']], ['PO-1'])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse('transaction-list-create'), {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+
+class SyntheticDataTests(TestCase):
+    def _generate(self, **options):
+        end = timezone.now()
+        report = generate(products=50, transactions=300, seed=7, end=end, chunk_size=64, **options)
+        ledger = list(StockDetail.objects.order_by('id').values_list(
+            'transaction__type', 'transaction__date', 'product__sku', 'quantity', 'unit_price',
+        ))
+        return report, ledger, end
+
+    def test_generation_is_deterministic_and_stock_matches_ledger(self):
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            report, first, _ = self._generate()
+            clear_inventory()
+            _, second, _ = self._generate()
+        self.assertEqual(first, second)
+        self.assertEqual(report.products, 50)
+        self.assertEqual(report.details, StockDetail.objects.count())
+
+        out = StringIO()
+        call_command('reconcile_stock', stdout=out)
+        self.assertIn('0 drifted', out.getvalue())
+        self.assertFalse(Product.objects.filter(current_stock__lt=0).exists())
+
+    @override_settings(INVENTORY_PRODUCT_CACHE='products')
+    def test_final_stock_refreshes_cache_and_feed_versions(self):
+        product_cache.clear()
+        warmed = []
+
+        def warm(report):
+            if not warmed:
+                warmed.append(Product.objects.order_by('id').values_list('id', flat=True).first())
+                product_cache.get(warmed[0])
+
+        with mock.patch('inventory.stock.publish_changes') as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            generate(products=20, transactions=100, seed=3, chunk_size=32, progress=warm)
+        product = Product.objects.get(id=warmed[0])
+        self.assertEqual(product_cache.get(product.id)['current_stock'], product.current_stock)
+        [event] = publish.call_args[0][0]
+        levels = {level['id']: (level['current_stock'], level['version']) for level in event['products']}
+        self.assertEqual(levels, {
+            product_id: (stock, version) for product_id, stock, version
+            in Product.objects.filter(current_stock__gt=0).values_list('id', 'current_stock', 'stock_version')
+        })
+        self.assertFalse(Product.objects.filter(current_stock__gt=0, stock_version=0).exists())
+
+    def test_skewed_popularity_and_mix(self):
+        _, _, end = self._generate(skew=1.5, out_ratio=0.3, min_lines=2, max_lines=2)
+        self.assertLess(StockTransaction.objects.earliest('date').date, end - timedelta(days=360))
+        self.assertEqual(StockTransaction._meta.get_field('date').auto_now_add, True)
+        per_product = sorted(
+            StockDetail.objects.values('product').annotate(lines=Count('id')).values_list('lines', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(per_product[0], 5 * per_product[len(per_product) // 2])
+        out_share = StockTransaction.objects.filter(type='OUT').count() / StockTransaction.objects.count()
+        self.assertLess(out_share, 0.4)
+
+
+class DailyMovementRollupTests(APITestCase):
+    def setUp(self):
+        self.products = make_products(3)
+        for type, quantity in (('IN', 10), ('IN', 4), ('OUT', 3)):
+            response = self.client.post(reverse('transaction-list-create'), {
+                'type': type,
+                'details': [{'product_id': p.id, 'quantity': quantity * (i + 1), 'unit_price': '1.50'}
+                            for i, p in enumerate(self.products)],
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+        self.today = timezone.localdate()
+
+    def _rollup(self):
+        return list(DailyProductMovement.objects.order_by('product_id', 'day').values_list(
+            'product_id', 'day', 'in_qty', 'out_qty', 'in_value', 'out_value', 'txn_count',
+        ))
+
+    def test_write_path_updates_rollup(self):
+        first = DailyProductMovement.objects.get(product=self.products[0], day=self.today)
+        self.assertEqual((first.in_qty, first.out_qty, first.txn_count), (14, 3, 3))
+        self.assertEqual((first.in_value, first.out_value), (Decimal('21.00'), Decimal('4.50')))
+        self.assertEqual(DailyProductMovement.objects.get(product=self.products[2]).in_qty, 42)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        incremental = self._rollup()
+        DailyProductMovement.objects.all().delete()
+        self.assertEqual(rebuild_movements(until=self.today, chunk_days=1), 3)
+        self.assertEqual(self._rollup(), incremental)
+
+    def test_movement_report(self):
+        response = self.client.get(reverse('movement-report'), {'product': self.products[1].id})
+        self.assertEqual(response.status_code, 200)
+        [day] = response.data['results']
+        self.assertEqual((day['day'], day['in_qty'], day['out_qty'], day['txn_count']), (self.today, 28, 6, 3))
+        self.assertEqual(
+            self.client.get(reverse('movement-report'), {'since': '2025-02-01', 'until': '2025-01-01'}).status_code, 400,
+        )
+
+    def test_top_movers_reads_rollup_only(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('top-movers'), {'by': 'in_value', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['sku'] for row in response.data['results']], ['SKU-00002', 'SKU-00001'])
+        self.assertFalse(any('inventory_stockdetail' in query['sql'] for query in ctx.captured_queries))
+        self.assertEqual(self.client.get(reverse('top-movers'), {'by': 'stock'}).status_code, 400)
+
+
+class InventoryValuationTests(APITestCase):
+    url = reverse('inventory-valuation')
+
+    def setUp(self):
+        self.product = make_products(1)[0]
+
+    def _post(self, type, *lines):
+        response = self.client.post(reverse('transaction-list-create'), {
+            'type': type,
+            'details': [{'product_id': self.product.id, 'quantity': quantity, 'unit_price': price}
+                        for quantity, price in lines],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def _movements(self):
+        self._post('IN', (10, '2.00'))
+        self._post('IN', (10, '4.00'))
+        self._post('OUT', (15, '0'))
+
+    def _state(self):
+        cost = ProductCost.objects.get(product=self.product)
+        layers = list(CostLayer.objects.order_by('id').values_list('remaining', 'unit_cost'))
+        return cost.quantity, cost.value, cost.fifo_value, layers
+
+    def test_weighted_average_cost(self):
+        self._movements()
+        cost = ProductCost.objects.get(product=self.product)
+        self.assertEqual((cost.quantity, cost.value, cost.average_cost), (5, Decimal('15.0000'), Decimal('3.0000')))
+        self.assertIsNone(cost.fifo_value)
+        self.assertFalse(CostLayer.objects.exists())
+
+    @override_settings(INVENTORY_COST_LAYERS=True)
+    def test_fifo_layers_and_rebuild(self):
+        self._movements()
+        self.assertEqual(self._state(), (5, Decimal('15.0000'), Decimal('20.0000'), [(5, Decimal('4.00'))]))
+        incremental = self._state()
+        self.assertEqual(rebuild_costs(), 1)
+        self.assertEqual(self._state(), incremental)
+
+    def test_valuation_endpoint(self):
+        self._movements()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['method'], response.data['quantity'], response.data['value']),
+                         ('average', 5, Decimal('15.0000')))
+        self.assertEqual(response.data['results'][0]['average_cost'], Decimal('3.0000'))
+        self.assertEqual(self.client.get(self.url, {'product': 'x'}).status_code, 400)
+
+
+class StockLocationTests(APITestCase):
+    url = reverse('transaction-list-create')
+
+    def setUp(self):
+        self.product, self.other = make_products(2, stock=10)
+        call_command('split_stock', self.product.sku, bins=3, stdout=StringIO())
+
+    def _bins(self):
+        return list(StockLocation.objects.filter(product=self.product).order_by('code').values_list('code', 'quantity'))
+
+    def _post(self, type, quantity, product=None):
+        return self.client.post(self.url, {
+            'type': type,
+            'details': [{'product_id': (product or self.product).id, 'quantity': quantity, 'unit_price': '1.00'}],
+        }, format='json')
+
+    def test_split_spreads_current_stock(self):
+        self.assertEqual(self._bins(), [('BIN-01', 4), ('BIN-02', 3), ('BIN-03', 3)])
+        self.assertTrue(Product.objects.get(pk=self.product.pk).stock_by_location)
+
+    def test_out_draws_from_fullest_bins_and_keeps_total(self):
+        response = self._post('OUT', 6)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['details'][0]['product']['current_stock'], 4)
+        self.assertEqual(self._bins(), [('BIN-01', 0), ('BIN-02', 1), ('BIN-03', 3)])
+        self.assertEqual(self._post('IN', 5).status_code, 201)
+        self.assertEqual(self._bins(), [('BIN-01', 5), ('BIN-02', 1), ('BIN-03', 3)])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).current_stock, 9)
+
+    def test_shortfall_is_rejected(self):
+        response = self._post('OUT', 11)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: 10', str(response.data))
+        self.assertEqual(sum(quantity for _, quantity in self._bins()), 10)
+
+    def test_batch_allocates_across_entries(self):
+        items = [{'type': 'OUT', 'details': [{'product_id': self.product.id, 'quantity': 4}]}] * 3
+        response = self.client.post(reverse('transaction-batch-create'), items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sum(quantity for _, quantity in self._bins()), 10)
+        response = self.client.post(reverse('transaction-batch-create') + '?mode=best_effort', items, format='json')
+        self.assertEqual(sum(quantity for _, quantity in self._bins()), 2)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).current_stock, 2)
+
+    def test_batch_locks_in_single_writer_order(self):
+        items = [{'type': 'IN', 'details': [{'product_id': self.product.id, 'quantity': 1},
+                                            {'product_id': self.other.id, 'quantity': 1}]}]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('transaction-batch-create'), items, format='json')
+        self.assertEqual(response.status_code, 201)
+        # Unlocated products, then bins, then located products. SQLite drops FOR UPDATE, so match the ordered reads.
+        locks = [
+            'bins' if 'FROM "inventory_stocklocation"' in sql
+            else 'unlocated' if 'NOT "inventory_product"."stock_by_location"' in sql else 'located'
+            for sql in (query['sql'] for query in ctx.captured_queries)
+            if sql.startswith('SELECT') and 'ORDER BY' in sql
+            and ('FROM "inventory_stocklocation"' in sql or 'FROM "inventory_product"' in sql)
+        ]
+        self.assertEqual(locks, ['unlocated', 'bins', 'located'])
+
+    def test_repair_moves_bins_to_ledger_balance(self):
+        # make_products sets stock without a ledger, so the balance is 0 and its bins must follow.
+        self._post('IN', 4)
+        out = StringIO()
+        call_command('reconcile_stock', '--repair', stdout=out)
+        self.assertIn('2 drifted, 2 repaired', out.getvalue())
+        self.assertEqual(Product.objects.get(pk=self.product.pk).current_stock, 4)
+        self.assertEqual(sum(quantity for _, quantity in self._bins()), 4)
+
+    def test_clear_inventory_removes_bins(self):
+        clear_inventory()
+        self.assertFalse(StockLocation.objects.exists())
+        self.assertFalse(Product.objects.exists())
+
+    def test_unlocated_products_keep_single_query_lock(self):
+        split_stock(self.other, 2)
+        call_command('split_stock', self.other.sku, merge=True, stdout=StringIO())
+        self.assertFalse(StockLocation.objects.filter(product=self.other).exists())
+        self.assertEqual(self._post('OUT', 3, self.other).status_code, 201)
+        self.assertEqual(Product.objects.get(pk=self.other.pk).current_stock, 7)
+
+
+@override_settings(INVENTORY_GROUP_COMMIT=True, INVENTORY_GROUP_COMMIT_WINDOW_MS=20)
+class GroupCommitTests(TransactionTestCase):
+    REQUESTS = 24
+    STOCK = 15
+
+    def setUp(self):
+        get_group_writer.cache_clear()
+        self.writer = get_group_writer()
+        self.addCleanup(self.writer.close)
+        self.product = make_products(1, stock=self.STOCK)[0]
+
+    def _take_one(self, _):
+        try:
+            return Client().post(reverse('transaction-list-create'), {
+                'type': 'OUT', 'details': [{'product_id': self.product.id, 'quantity': 1, 'unit_price': '1.00'}],
+            }, content_type='application/json')
+        finally:
+            connections.close_all()
+
+    def test_concurrent_posts_share_commits(self):
+        with ThreadPoolExecutor(max_workers=self.REQUESTS) as pool:
+            responses = list(pool.map(self._take_one, range(self.REQUESTS)))
+
+        created = [response for response in responses if response.status_code == 201]
+        rejected = [response for response in responses if response.status_code == 400]
+        self.assertEqual((len(created), len(rejected)), (self.STOCK, self.REQUESTS - self.STOCK))
+        self.assertIn('Insufficient stock', str(rejected[0].json()))
+        self.assertEqual(created[0].json()['details'][0]['product']['id'], self.product.id)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_stock, 0)
+        self.assertEqual(self.writer.entries, self.REQUESTS)
+        self.assertLess(self.writer.batches, self.REQUESTS)
+
+    def test_database_error_fails_only_its_request(self):
+        def flaky(entries, products=None, allocator=None):
+            raise RuntimeError('shared transaction aborted')
+
+        with mock.patch('inventory.group_commit.create_stock_transactions', flaky):
+            response = self._take_one(0)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(StockTransaction.objects.count(), 1)
+
+
+    def test_request_writes_entry_itself_when_the_writer_never_takes_it(self):
+        self.writer.timeout = 0.1
+        with mock.patch.object(self.writer, '_ensure_running'):
+            response = self._take_one(0)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(StockTransaction.objects.count(), 1)
+
+    def test_request_gets_503_when_the_writer_stalls_on_its_batch(self):
+        self.writer.timeout = 0.1
+        release = threading.Event()
+
+        def stalled(entries, products=None, allocator=None):
+            release.wait()
+            raise RuntimeError('writer gave up')
+
+        with mock.patch('inventory.group_commit.create_stock_transactions', stalled):
+            response = self._take_one(0)
+            release.set()
+        self.assertEqual(response.status_code, 503)
+
+class LedgerArchiveTests(APITestCase):
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings_override = override_settings(INVENTORY_ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.products = make_products(2)
+        self.day = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=120)
+        for days, type, quantity in ((0, 'IN', 50), (1, 'OUT', 5), (40, 'OUT', 10), (41, 'IN', 8), (120, 'OUT', 3)):
+            response = self.client.post(reverse('transaction-list-create'), {
+                'type': type, 'reference': f'REF-{days}',
+                'details': [{'product_id': p.id, 'quantity': quantity, 'unit_price': '2.00'} for p in self.products],
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+            StockTransaction.objects.filter(id=response.data['id']).update(date=self.day + timedelta(days=days))
+        self.cutoff = self.day + timedelta(days=100)
+
+    def _archive(self):
+        out = StringIO()
+        call_command('archive_ledger', '--before', self.cutoff.isoformat(), '--chunk-size', '1', stdout=out)
+        return out.getvalue()
+
+    def test_archiving_invalidates_the_summary(self):
+        invalidate_inventory_summary()
+        recent = self.client.get(reverse('inventory-summary')).data['recent_transactions']
+        self.assertEqual(len(recent), 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._archive()
+        recent = self.client.get(reverse('inventory-summary')).data['recent_transactions']
+        self.assertEqual([row['reference'] for row in recent], ['REF-120'])
+
+    def test_archive_moves_old_transactions_and_keeps_stock(self):
+        costs = list(ProductCost.objects.order_by('product_id').values_list('quantity', 'value'))
+        self.assertIn('Archived 4 transactions (8 details) into 4 files', self._archive())
+
+        self.assertEqual(list(StockTransaction.objects.values_list('reference', flat=True)), ['REF-120'])
+        self.assertEqual(StockDetail.objects.count(), 2)
+        self.assertEqual(len(partition_files()), 4)
+        self.assertEqual(archive_horizon(), self.day + timedelta(days=41))
+        self.assertEqual(OpeningBalance.objects.get(product=self.products[0]).quantity, 43)
+
+        out = StringIO()
+        call_command('reconcile_stock', stdout=out)
+        self.assertIn('0 drifted', out.getvalue())
+        rebuild_costs()
+        self.assertEqual(list(ProductCost.objects.order_by('product_id').values_list('quantity', 'value')), costs)
+        movements = DailyProductMovement.objects.count()
+        rebuild_movements(until=timezone.localdate())
+        self.assertEqual(DailyProductMovement.objects.count(), movements)
+        # Nothing older is left, so a second run writes nothing.
+        self.assertIn('Archived 0 transactions', self._archive())
+
+    def test_rerun_after_failed_commit_replaces_uncommitted_file(self):
+        with mock.patch('inventory.archive.StockAlert') as alerts:
+            alerts.objects.filter.side_effect = RuntimeError('crash before commit')
+            with self.assertRaises(RuntimeError):
+                archive_ledger(self.cutoff, chunk_size=2)
+        self.assertEqual(len(partition_files()), 1)
+        self.assertEqual(StockTransaction.objects.count(), 5)
+
+        archive_ledger(self.cutoff, chunk_size=1)
+        archived = [record['reference'] for path in partition_files() for record in read_partition(path)]
+        self.assertEqual(archived, ['REF-0', 'REF-1', 'REF-40', 'REF-41'])
+        self.assertEqual(OpeningBalance.objects.get(product=self.products[0]).quantity, 43)
+
+    def test_as_of_reads_archive_before_horizon(self):
+        self._archive()
+        url = reverse('inventory-as-of')
+        product = self.products[1].id
+        for days, basis, stock in ((1.5, None, 45), (40.5, None, 35), (60, self.day + timedelta(days=41), 43),
+                                   (121, self.day + timedelta(days=41), 40)):
+            response = self.client.get(url, {'date': (self.day + timedelta(days=days)).isoformat(), 'product': product})
+            self.assertEqual((response.data['snapshot_at'], response.data['results'][0]['stock']), (basis, stock))
+
+    def test_export_and_list_read_archived_ranges(self):
+        self._archive()
+        response = self.client.get(reverse('ledger-export'), {'output': 'ndjson', 'archived': '1'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['reference'] for row in rows[::2]], ['REF-0', 'REF-1', 'REF-40', 'REF-41', 'REF-120'])
+        self.assertEqual(rows[0]['unit_price'], '2.00')
+        self.assertEqual(len(b''.join(self.client.get(reverse('ledger-export')).streaming_content).splitlines()), 3)
+
+        url = reverse('transaction-archived')
+        references, params = [], {'page_size': 3}
+        while True:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            references += [record['reference'] for record in response.data['results']]
+            if response.data['next'] is None:
+                break
+            params['cursor'] = parse_qs(urlsplit(response.data['next']).query)['cursor'][0]
+        self.assertEqual(references, ['REF-41', 'REF-40', 'REF-1', 'REF-0'])
+
+        since = (self.day + timedelta(days=30)).date().isoformat()
+        response = self.client.get(url, {'since': since})
+        self.assertEqual([record['reference'] for record in response.data['results']], ['REF-41', 'REF-40'])
+        self.assertEqual(response.data['results'][0]['details'][0]['quantity'], 8)
+        self.assertEqual(self.client.get(url, {'cursor': 'bogus'}).status_code, 404)
 
-# Create your tests here.
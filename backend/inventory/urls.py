@@ -1,21 +1,42 @@
 from django.urls import path
+from . import views_async
 from .views_html import dashboard_view
 from .views_html import add_product_view
 from .views import (
-    ProductListCreateAPIView, ProductRetrieveUpdateDestroyAPIView,
-    TransactionListCreateAPIView, TransactionRetrieveAPIView,
-    CurrentInventoryAPIView
+    ProductListCreateAPIView, ProductRetrieveUpdateDestroyAPIView, ProductImportAPIView,
+    ProductCacheStatsAPIView, ProductSearchAPIView,
+    TransactionListCreateAPIView, TransactionBatchCreateAPIView, TransactionRetrieveAPIView, ArchivedTransactionsAPIView,
+    CurrentInventoryAPIView, InventorySummaryAPIView, LedgerExportAPIView,
+    StockAsOfAPIView, InventoryValuationAPIView, MovementReportAPIView, TopMoversAPIView, RequestTraceAPIView, inventory_feed_view,
 )
 
 urlpatterns = [
     path('products/', ProductListCreateAPIView.as_view(), name='product-list-create'),
+    path('products/import/', ProductImportAPIView.as_view(), name='product-import'),
+    path('products/search/', ProductSearchAPIView.as_view(), name='product-search'),
+    path('products/cache/stats/', ProductCacheStatsAPIView.as_view(), name='product-cache-stats'),
     path('products/<int:pk>/', ProductRetrieveUpdateDestroyAPIView.as_view(), name='product-detail'),
 
     path('transactions/', TransactionListCreateAPIView.as_view(), name='transaction-list-create'),
+    path('transactions/batch/', TransactionBatchCreateAPIView.as_view(), name='transaction-batch-create'),
+    path('transactions/archived/', ArchivedTransactionsAPIView.as_view(), name='transaction-archived'),
     path('transactions/<int:pk>/', TransactionRetrieveAPIView.as_view(), name='transaction-detail'),
     path('', dashboard_view, name='dashboard'),
     path('add-product/', add_product_view, name='add-product'),
     path('inventory/', CurrentInventoryAPIView.as_view(), name='current-inventory'),
+    path('inventory/summary/', InventorySummaryAPIView.as_view(), name='inventory-summary'),
+    path('inventory/feed/', inventory_feed_view, name='inventory-feed'),
+    path('inventory/as-of/', StockAsOfAPIView.as_view(), name='inventory-as-of'),
+    path('inventory/valuation/', InventoryValuationAPIView.as_view(), name='inventory-valuation'),
+    path('reports/movements/', MovementReportAPIView.as_view(), name='movement-report'),
+    path('reports/top-movers/', TopMoversAPIView.as_view(), name='top-movers'),
+    path('export/ledger/', LedgerExportAPIView.as_view(), name='ledger-export'),
+    path('debug/requests/', RequestTraceAPIView.as_view(), name='request-traces'),
+
+    path('async/inventory/', views_async.inventory_list_view, name='async-current-inventory'),
+    path('async/inventory/summary/', views_async.inventory_summary_view, name='async-inventory-summary'),
+    path('async/products/<int:pk>/', views_async.product_detail_view, name='async-product-detail'),
+    path('async/transactions/<int:pk>/', views_async.transaction_detail_view, name='async-transaction-detail'),
 ]
 
 # urlpatterns += [
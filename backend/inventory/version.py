@@ -0,0 +1,27 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'inventory:version'
+
+
+def get_inventory_version():
+    """
+    Monotonic counter bumped on every stock write and product change. It lives
+    in Django's cache, so configure a shared cache (file, DB, Redis) when
+    several processes serve the API. A lost counter restarts from the current
+    time in nanoseconds, which is always ahead of anything handed out before.
+    """
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def bump_inventory_version():
+    try:
+        return cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.add(VERSION_CACHE_KEY, time.time_ns(), None)
+        return cache.incr(VERSION_CACHE_KEY)
@@ -1,26 +1,451 @@
+import codecs
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.conf import settings
+from django.db.models import Sum
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import generics, status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.views import APIView
 
-from .models import Product, StockTransaction, StockDetail
-from .serializers import ProductSerializer, TransactionSerializer, InventorySerializer
+from .catalog import import_catalog
+from .costing import cost_layers_enabled
+from .export import EXPORT_FORMATS, async_export_lines, export_lines, ledger_rows
+from .feed import event_stream
+from .filters import TransactionFilterBackend, is_date_only, parse_bound
+from .instrumentation import traces
+from .lean import lean_transactions, parse_lean_options
+from .models import Product, ProductCost, StockTransaction, StockDetail
+from .pagination import LedgerCursorPagination
+from .parsers import NDJSONParser
+from .serializers import (
+    ProductSerializer, TransactionSerializer, TransactionSummarySerializer, InventorySerializer,
+    BatchTransactionSerializer,
+)
+from .product_cache import product_cache
+from .rollups import MOVEMENT_FIELDS, movement_series, top_movers
+from .search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, search_products
+from .snapshots import stock_as_of
+from .stock import DEFAULT_BATCH_CHUNK_SIZE, ingest_transactions
+from .summary import MAX_RECENT_TRANSACTIONS, get_inventory_summary
+from .version import get_inventory_version
+
+def served_over_asgi(request):
+    # Only the ASGI handler's requests carry a scope; DRF's Request proxies it through.
+    return getattr(request, 'scope', None) is not None
+
+def inventory_version_etag(request, *args, **kwargs):
+    # The version must live in a cache every process shares, so these ETags are opt-in.
+    if not getattr(settings, 'INVENTORY_CONDITIONAL_GET', False):
+        return None
+    # Read before the list query runs: a write in between makes the ETag
+    # older than the body, which only costs the client one more full response.
+    return f"inventory-{get_inventory_version()}"
+
+
+def product_updated_at(request, pk):
+    data = product_cache.get(pk)
+    return data['updated_at'] if data else None
+
+
+def product_etag(request, pk):
+    updated_at = product_updated_at(request, pk)
+    return f"product-{pk}-{updated_at.timestamp()}" if updated_at else None
 
+
+@method_decorator(condition(etag_func=inventory_version_etag), name='get')
 class ProductListCreateAPIView(generics.ListCreateAPIView):
     queryset = Product.objects.all().order_by('name')
     serializer_class = ProductSerializer
 
+@method_decorator(condition(etag_func=product_etag, last_modified_func=product_updated_at), name='get')
 class ProductRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        data = product_cache.get(self.kwargs['pk'])
+        if data is None:
+            raise NotFound()
+        return Response({field: data[field] for field in ProductSerializer.Meta.fields})
+
+class ProductCacheStatsAPIView(APIView):
+    def get(self, request):
+        return Response(product_cache.stats())
+
+class ProductSearchAPIView(APIView):
+    """
+    Typeahead over SKU and name: ``?q=`` matched case-insensitively as a
+    prefix, then as a substring (three characters or more on SQLite), top
+    ``?limit=`` (default 20, max 100) results.
+    """
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            limit = DEFAULT_SEARCH_LIMIT
+        limit = min(max(limit, 1), MAX_SEARCH_LIMIT)
+        return Response(search_products(request.query_params.get('q', ''), limit))
+
+class RequestTraceAPIView(APIView):
+    """Sampled slow-request traces from the timing middleware, newest first. Staff only."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'traces': traces.snapshot()})
+
+class ProductImportAPIView(APIView):
+    """
+    Bulk upsert of products matched on SKU. Takes a ``file`` upload or a raw
+    ``text/csv`` / JSON / NDJSON body, streamed rather than loaded whole.
+    ``?dry_run=1`` validates everything without writing.
+    """
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+            stream, is_csv = upload, upload.name.endswith('.csv') or upload.content_type == 'text/csv'
+        else:
+            # An empty body has no stream.
+            stream, is_csv = request.stream or BytesIO(), request.content_type.startswith('text/csv')
+
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        report = import_catalog(codecs.getreader('utf-8')(stream), 'csv' if is_csv else 'json', dry_run=dry_run)
+        if report['parse_error'] is not None:
+            # Chunks before the error are committed; the counts say how much went in.
+            return Response({'detail': f"Could not parse catalog after line {report['parse_error']['after_line']}: "
+                                       f"{report['parse_error']['detail']}", **report},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
 class TransactionListCreateAPIView(generics.ListCreateAPIView):
     queryset = StockTransaction.objects.all().prefetch_related('details__product')
     serializer_class = TransactionSerializer
+    pagination_class = LedgerCursorPagination
+    filter_backends = [TransactionFilterBackend]
+
+    def summary_mode(self):
+        return self.request.method == 'GET' and self.request.query_params.get('view') == 'summary'
+
+    def get_queryset(self):
+        if self.summary_mode():
+            return StockTransaction.objects.all()
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.summary_mode():
+            return TransactionSummarySerializer
+        return super().get_serializer_class()
+
+    def list(self, request, *args, **kwargs):
+        # ?fields=, ?expand= and ?view=compact are rendered from values() rows.
+        options = None if self.summary_mode() else parse_lean_options(request.query_params)
+        if options is None:
+            return super().list(request, *args, **kwargs)
+        rows = self.paginate_queryset(self.filter_queryset(StockTransaction.objects.values(*options.columns)))
+        data, products = lean_transactions(rows, options)
+        response = self.get_paginated_response(data)
+        if products is not None:
+            response.data['products'] = products
+        return response
+
+class TransactionBatchCreateAPIView(APIView):
+    """
+    Accepts a JSON array or an NDJSON stream of transactions.
+
+    ``?mode=atomic`` (default) writes all or nothing; ``?mode=best_effort``
+    commits every ``?chunk_size=`` transactions and skips failing items.
+    """
+    parser_classes = [JSONParser, NDJSONParser]
+    max_chunk_size = 5000
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Expected a non-empty list of transactions.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        mode = request.query_params.get('mode', 'atomic')
+        if mode not in ('atomic', 'best_effort'):
+            return Response({'detail': "mode must be 'atomic' or 'best_effort'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', DEFAULT_BATCH_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = 0
+        if not 1 <= chunk_size <= self.max_chunk_size:
+            return Response({'detail': f'chunk_size must be between 1 and {self.max_chunk_size}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        indexes, entries = [], []
+        for index, item in enumerate(items):
+            serializer = BatchTransactionSerializer(data=item)
+            if serializer.is_valid():
+                validated_data = dict(serializer.validated_data)
+                details_data = validated_data.pop('details')
+                indexes.append(index)
+                entries.append((validated_data, details_data))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+
+        atomic = mode == 'atomic'
+        if atomic and len(entries) < len(items):
+            outcomes, committed = [(None, None)] * len(entries), False
+        else:
+            outcomes, committed = ingest_transactions(entries, atomic=atomic, chunk_size=chunk_size)
+
+        for index, (instance, errors) in zip(indexes, outcomes):
+            if errors is not None:
+                results[index] = {'index': index, 'status': 'error', 'errors': errors}
+            elif not committed:
+                results[index] = {'index': index, 'status': 'rolled_back' if instance else 'skipped'}
+            else:
+                results[index] = {'index': index, 'status': 'created', 'id': instance.id}
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        if failed == 0:
+            response_status = status.HTTP_201_CREATED
+        elif atomic or failed == len(items):
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response({
+            'mode': mode,
+            'created': sum(1 for result in results if result['status'] == 'created'),
+            'failed': failed,
+            'results': results,
+        }, status=response_status)
 
 class TransactionRetrieveAPIView(generics.RetrieveAPIView):
     queryset = StockTransaction.objects.all().prefetch_related('details__product')
     serializer_class = TransactionSerializer
 
+@method_decorator(condition(etag_func=inventory_version_etag), name='get')
 class CurrentInventoryAPIView(generics.ListAPIView):
     queryset = Product.objects.all().order_by('name')
     serializer_class = InventorySerializer
+
+class InventorySummaryAPIView(APIView):
+    """Dashboard totals and the ``?recent=`` (default 10) latest transactions, served from cache."""
+
+    def get(self, request):
+        try:
+            recent = int(request.query_params.get('recent', 10))
+        except ValueError:
+            recent = 10
+        recent = min(max(recent, 0), MAX_RECENT_TRANSACTIONS)
+        return Response(get_inventory_summary(recent))
+
+class LedgerExportAPIView(APIView):
+    """
+    Streams one row per StockDetail as ``?output=csv`` (default) or ``ndjson``.
+    Accepts ``?since=``/``?until=`` date bounds and ``?after_id=`` to resume an
+    incremental export after the last detail id already loaded. ``?archived=1``
+    also streams the archived transactions in the range, oldest first.
+    Under ASGI the rows are streamed through an async iterator.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        export_format = params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'output': [f"Expected one of: {', '.join(sorted(EXPORT_FORMATS))}."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            since = parse_bound(params['since']) if params.get('since') else None
+            until = parse_bound(params['until'], end_of_day=True) if params.get('until') else None
+            after_id = int(params['after_id']) if params.get('after_id') else None
+        except ValueError:
+            return Response({'detail': 'since/until must be ISO dates and after_id an integer.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        archived = params.get('archived', '').lower() in ('1', 'true', 'yes')
+        lines = export_lines(ledger_rows(since, until, after_id, archived=archived), export_format)
+        if served_over_asgi(request):
+            lines = async_export_lines(lines)
+        response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="ledger.{export_format}"'
+        return response
+
+class ArchivedTransactionsAPIView(APIView):
+    """
+    Archived transactions newest first, read on demand from the partition
+    files, with the same cursor pagination as the transaction list. Narrow
+    it with ``?since=``/``?until=``; only the months in range are opened.
+    """
+    pagination_class = LedgerCursorPagination
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            since = parse_bound(params['since']) if params.get('since') else None
+            until = parse_bound(params['until'], end_of_day=True) if params.get('until') else None
+        except ValueError:
+            return Response({'detail': 'since/until must be ISO dates or datetimes.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        paginator = self.pagination_class()
+        page = paginator.paginate_archive(request, since, until)
+        return paginator.get_paginated_response(page)
+
+class StockAsOfAPIView(APIView):
+    """
+    Stock per product at ``?date=`` (ISO datetime, or a date meaning the end of
+    that day), from the nearest earlier snapshot plus the ledger since then.
+    Narrow it with ``?product=<id>,<id>``.
+    """
+
+    def get(self, request):
+        value = request.query_params.get('date', '')
+        try:
+            moment = parse_bound(value, end_of_day=True)
+            product_ids = [int(pk) for pk in request.query_params['product'].split(',')] \
+                if request.query_params.get('product') else None
+        except ValueError:
+            return Response({'detail': 'date must be an ISO date or datetime and product a list of ids.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if is_date_only(value):
+            moment -= timedelta(microseconds=1)
+
+        snapshot_at, balances = stock_as_of(moment, product_ids)
+        products = Product.objects.order_by('name')
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+        return Response({
+            'as_of': moment,
+            'snapshot_at': snapshot_at,
+            'results': [
+                {'id': product_id, 'sku': sku, 'name': name, 'stock': balances.get(product_id, 0)}
+                for product_id, sku, name in products.values_list('id', 'sku', 'name')
+            ],
+        })
+
+class InventoryValuationAPIView(APIView):
+    """
+    Value of the stock on hand from the maintained cost state: totals plus
+    one row per product with stock, at weighted-average cost and, when cost
+    layers are enabled, FIFO. Narrow it with ``?product=<id>,<id>``.
+    """
+
+    def get(self, request):
+        try:
+            product_ids = [int(pk) for pk in request.query_params['product'].split(',')] \
+                if request.query_params.get('product') else None
+        except ValueError:
+            return Response({'detail': 'product must be a list of ids.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        costs = ProductCost.objects.all()
+        if product_ids is not None:
+            costs = costs.filter(product_id__in=product_ids)
+        totals = costs.aggregate(quantity=Sum('quantity', default=0), value=Sum('value', default=0),
+                                 fifo_value=Sum('fifo_value'))
+        rows = costs.filter(quantity__gt=0).order_by('product_id').values_list(
+            'product_id', 'product__sku', 'product__name', 'quantity', 'value', 'fifo_value',
+        )
+        return Response({
+            'method': 'fifo' if cost_layers_enabled() else 'average',
+            **totals,
+            'results': [
+                {'id': product_id, 'sku': sku, 'name': name, 'quantity': quantity, 'value': value,
+                 'average_cost': (value / quantity).quantize(Decimal('0.0001')), 'fifo_value': fifo_value}
+                for product_id, sku, name, quantity, value, fifo_value in rows
+            ],
+        })
+
+
+DEFAULT_REPORT_DAYS = 30
+MAX_TOP_MOVERS = 100
+
+
+def report_days(params):
+    """
+    The ``?since=``..``?until=`` dates of a movement report, both inclusive.
+    Defaults to the last ``DEFAULT_REPORT_DAYS`` days up to today.
+    """
+    until = parse_date(params['until']) if params.get('until') else timezone.localdate()
+    since = parse_date(params['since']) if params.get('since') else until - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+    if since is None or until is None or since > until:
+        raise ValueError('since/until')
+    return since, until
+
+
+class MovementReportAPIView(APIView):
+    """
+    Daily IN/OUT quantities and values between ``?since=`` and ``?until=``
+    (ISO dates, inclusive), for all products or ``?product=<id>``. Reads only
+    the DailyProductMovement rollup, never the ledger.
+    """
+
+    def get(self, request):
+        try:
+            since, until = report_days(request.query_params)
+            product_id = int(request.query_params['product']) if request.query_params.get('product') else None
+        except ValueError:
+            return Response({'detail': 'since/until must be ISO dates in order and product an id.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'since': since,
+            'until': until,
+            'product': product_id,
+            'results': movement_series(since, until, product_id),
+        })
+
+
+class TopMoversAPIView(APIView):
+    """
+    The ``?limit=`` (default 10) products that moved most between ``?since=``
+    and ``?until=``, ranked by ``?by=`` (``out_qty`` by default), from the
+    DailyProductMovement rollup.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        by = params.get('by', 'out_qty')
+        if by not in MOVEMENT_FIELDS:
+            return Response({'by': [f"Expected one of: {', '.join(MOVEMENT_FIELDS)}."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            since, until = report_days(params)
+            limit = min(max(int(params.get('limit', 10)), 1), MAX_TOP_MOVERS)
+        except ValueError:
+            return Response({'detail': 'since/until must be ISO dates in order and limit an integer.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'since': since, 'until': until, 'by': by, 'results': top_movers(since, until, by, limit)})
+
+
+async def load_stock_snapshot():
+    return [
+        {'id': product_id, 'current_stock': stock, 'version': version}
+        async for product_id, stock, version in Product.objects.order_by('id').values_list(
+            'id', 'current_stock', 'stock_version',
+        )
+    ]
+
+
+async def inventory_feed_view(request):
+    """
+    Server-sent events: one snapshot of every product's stock, then compact
+    deltas as stock writes commit. Needs an ASGI server (see trackerapp/asgi.py):
+    under WSGI the endless stream would be consumed before a byte is sent and
+    hold the worker forever, so it answers 501 there instead.
+    """
+    if not served_over_asgi(request):
+        return JsonResponse({'detail': 'The live feed needs the app served over ASGI.'},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+    response = StreamingHttpResponse(event_stream(load_stock_snapshot), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,53 @@
+from functools import partial
+
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_GET
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Product, StockTransaction
+from .serializers import InventorySerializer, ProductSerializer, TransactionSerializer
+from .summary import MAX_RECENT_TRANSACTIONS, aget_inventory_summary
+from .views import inventory_version_etag
+
+# Async twins of the read-only API views, for deployments behind an ASGI
+# worker (see the Procfile). They return the same payloads as the sync views,
+# which stay routed at their original URLs as the fallback.
+
+# DRF's encoder, so dates and decimals render exactly as in the sync views.
+json_response = partial(JsonResponse, encoder=JSONEncoder)
+
+
+@require_GET
+@condition(etag_func=inventory_version_etag)
+async def inventory_list_view(request):
+    rows = Product.objects.order_by('name').values(*InventorySerializer.Meta.fields)
+    return json_response([row async for row in rows.aiterator(chunk_size=2000)], safe=False)
+
+
+@require_GET
+async def product_detail_view(request, pk):
+    try:
+        product = await Product.objects.values(*ProductSerializer.Meta.fields).aget(pk=pk)
+    except Product.DoesNotExist:
+        raise Http404
+    return json_response(product)
+
+
+@require_GET
+async def transaction_detail_view(request, pk):
+    try:
+        transaction = await StockTransaction.objects.prefetch_related('details__product').aget(pk=pk)
+    except StockTransaction.DoesNotExist:
+        raise Http404
+    # Everything the serializer touches is prefetched, so it runs without I/O.
+    return json_response(TransactionSerializer(transaction).data)
+
+
+@require_GET
+async def inventory_summary_view(request):
+    try:
+        recent = int(request.GET.get('recent', 10))
+    except ValueError:
+        recent = 10
+    recent = min(max(recent, 0), MAX_RECENT_TRANSACTIONS)
+    return json_response(await aget_inventory_summary(recent))
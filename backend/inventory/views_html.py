@@ -1,4 +1,6 @@
 from .models import Product, StockTransaction
+from .pagination import LedgerCursorPagination, decode_ledger_cursor, keyset_page
+from .views import served_over_asgi
 from django.shortcuts import render, redirect
 from django import forms
 
@@ -19,15 +21,24 @@ def add_product_view(request):
     return render(request, 'inventory/add_product.html', {'form': form})
 
 def dashboard_view(request):
-    return render(request, 'inventory/dashboard.html')
+    # The live feed is only served over ASGI; elsewhere the dashboard does not subscribe.
+    return render(request, 'inventory/dashboard.html', {'live_feed': served_over_asgi(request)})
 
 def product_list_view(request):
     products = Product.objects.all().order_by("name")
     return render(request, "inventory/product_list.html", {"products": products})
 
 def transaction_list_view(request):
-    transactions = StockTransaction.objects.all().prefetch_related("details__product")
-    return render(request, "inventory/transaction_list.html", {"transactions": transactions})
+    try:
+        cursor = decode_ledger_cursor(request.GET["cursor"]) if request.GET.get("cursor") else None
+    except ValueError:
+        cursor = None
+    transactions, next_cursor = keyset_page(
+        StockTransaction.objects.all().prefetch_related("details__product"),
+        cursor,
+        LedgerCursorPagination.page_size,
+    )
+    return render(request, "inventory/transaction_list.html", {"transactions": transactions, "next_cursor": next_cursor})
 
 def inventory_view(request):
     products = Product.objects.all().order_by("name")
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/#_a-name-auth-password-valida
 
 """
 
+import os
 from pathlib import Path
 from os import path
 
@@ -40,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the rest of the stack. Inert unless INVENTORY_INSTRUMENTATION is on.
+    "inventory.instrumentation.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     # CRITICAL: Place CorsMiddleware as high as possible, ideally right after SecurityMiddleware
     "corsheaders.middleware.CorsMiddleware",
@@ -71,13 +74,80 @@ TEMPLATES = [
 WSGI_APPLICATION = 'trackerapp.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database profile, chosen with INVENTORY_DB_ENGINE=sqlite (default) or postgresql.
+INVENTORY_DB_ENGINE = os.environ.get('INVENTORY_DB_ENGINE', 'sqlite')
+# Seconds a writer waits for a lock before failing: SQLite's busy timeout, PostgreSQL's lock_timeout.
+INVENTORY_DB_LOCK_TIMEOUT = int(os.environ.get('INVENTORY_DB_BUSY_TIMEOUT', 20))
+
+if INVENTORY_DB_ENGINE == 'postgresql':
+    # Real row locks back select_for_update(). psycopg[binary,pool] in requirements.txt provides the pool;
+    # set INVENTORY_DB_POOL_MAX_SIZE=0 to use persistent connections instead.
+    _pool_max_size = int(os.environ.get('INVENTORY_DB_POOL_MAX_SIZE', 20))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('INVENTORY_DB_NAME', 'inventory'),
+            'USER': os.environ.get('INVENTORY_DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('INVENTORY_DB_PASSWORD', ''),
+            'HOST': os.environ.get('INVENTORY_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('INVENTORY_DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if _pool_max_size else int(os.environ.get('INVENTORY_DB_CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                'options': f'-c lock_timeout={INVENTORY_DB_LOCK_TIMEOUT}s',
+                **({'pool': {
+                    'min_size': int(os.environ.get('INVENTORY_DB_POOL_MIN_SIZE', 2)),
+                    'max_size': _pool_max_size,
+                    'timeout': 10,
+                }} if _pool_max_size else {}),
+            },
+        }
+    }
+else:
+    # SQLite ignores select_for_update(), so every transaction starts with
+    # BEGIN IMMEDIATE: stock writers queue on the write lock (waiting up to
+    # `timeout` seconds, SQLite's busy_timeout) instead of failing with
+    # "database is locked" when a read lock cannot be upgraded. WAL keeps
+    # readers off the writers' path.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('INVENTORY_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('INVENTORY_DB_CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': INVENTORY_DB_LOCK_TIMEOUT,
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            },
+            # A file, not shared-cache memory, so concurrent connections in tests lock like production.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
     }
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Hot product rows by id/SKU, used when INVENTORY_PRODUCT_CACHE names this alias. Locmem
+    # is per process: switch it to a file, DB or Redis cache when several workers serve the API.
+    'products': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-products',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
 }
 
+# Off unless set; 'products' enables the alias above. Invalidation only reaches other
+# workers through a shared backend (system check inventory.W001).
+INVENTORY_PRODUCT_CACHE = os.environ.get('INVENTORY_PRODUCT_CACHE') or None
+# '1' serves ETags on the list endpoints from a version counter in the default cache,
+# which must then be shared between workers (system check inventory.W002).
+INVENTORY_CONDITIONAL_GET = os.environ.get('INVENTORY_CONDITIONAL_GET', '') == '1'
+# Seconds the dashboard summary stays in the default cache between writes; other workers
+# only see the invalidation through a shared default cache (inventory.W002). 0 turns it off.
+INVENTORY_SUMMARY_CACHE_TIMEOUT = 300
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -102,4 +172,39 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS Settings: Allow all origins and credentials
 CORS_ORIGIN_ALLOW_ALL = True
-CORS_ALLOW_CREDENTIALS = True
\ No newline at end of file
+CORS_ALLOW_CREDENTIALS = True
+
+# Stock threshold alerts are written to an outbox and delivered by `manage.py process_alerts`.
+INVENTORY_ALERT_SINKS = ['inventory.alerts.LogSink']
+INVENTORY_ALERT_WEBHOOK_URL = None
+INVENTORY_ALERT_DEDUPE_SECONDS = 15 * 60
+# How long a worker holds a claimed batch while delivering before another may retry it.
+INVENTORY_ALERT_CLAIM_SECONDS = 60
+
+# Fan-out for the inventory/feed/ SSE stream; replace to relay events between workers.
+INVENTORY_FEED_BACKEND = 'inventory.feed.LocalFeedBackend'
+
+# Per-request SQL/serializer timing: Server-Timing headers, JSON lines on the
+# `inventory.requests` logger and slow-request traces at debug/requests/.
+INVENTORY_INSTRUMENTATION = os.environ.get('INVENTORY_INSTRUMENTATION', '') == '1'
+INVENTORY_SLOW_REQUEST_MS = 500
+INVENTORY_TRACE_SAMPLE_RATE = 1.0
+INVENTORY_TRACE_BUFFER_SIZE = 100
+INVENTORY_DUPLICATE_QUERY_THRESHOLD = 3
+
+# Cost state is always kept at weighted average; '1' also tracks FIFO cost
+# layers (run `manage.py rebuild_costs` after switching it on).
+INVENTORY_COST_LAYERS = os.environ.get('INVENTORY_COST_LAYERS', '') == '1'
+
+# '1' queues concurrent transactions/ POSTs to an in-process writer thread that
+# commits them together: up to MAX_BATCH entries gathered over WINDOW_MS.
+INVENTORY_GROUP_COMMIT = os.environ.get('INVENTORY_GROUP_COMMIT', '') == '1'
+INVENTORY_GROUP_COMMIT_WINDOW_MS = 2
+INVENTORY_GROUP_COMMIT_MAX_BATCH = 200
+# How long a request waits for the writer: the window, a lock wait for the shared batch and one
+# for the per-entry retry after a failed batch. Past it, an entry the writer never took is
+# written by the request itself; one it is stuck on is answered with 503.
+INVENTORY_GROUP_COMMIT_TIMEOUT = INVENTORY_GROUP_COMMIT_WINDOW_MS / 1000 + 2 * INVENTORY_DB_LOCK_TIMEOUT + 5
+
+# Gzipped NDJSON partitions written by `manage.py archive_ledger`, one directory per month.
+INVENTORY_ARCHIVE_DIR = os.environ.get('INVENTORY_ARCHIVE_DIR', str(BASE_DIR / 'archive'))